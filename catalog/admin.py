@@ -1,40 +1,118 @@
 from django.contrib import admin
-from .models import Author, Genre, Book, BookInstance, Language
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html
+
+from . import autocomplete, holds
+from .forms import BookForm
+from .models import Author, Genre, Book, BookInstance, Hold, Language
+from .pagination import EstimatedCountPaginator
 # Register your models here.
 
+
+class LimitedInlineFormSet(BaseInlineFormSet):
+    """
+    Formset de inline que solo carga las primeras max_rows filas; el resto se
+    edita desde el listado filtrado (ver related_changelist_link)
+    """
+    max_rows = 20
+
+    def get_queryset(self):
+        if not hasattr(self, '_limited_queryset'):
+            queryset = super().get_queryset()
+            # La ordenacion del modelo (due_back) suele ser NULL: sin desempate por pk
+            # el GET y el POST podrian cortar filas distintas
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            self._limited_queryset = queryset.order_by(*ordering, 'pk')[:self.max_rows]
+        return self._limited_queryset
+
+
+def related_changelist_link(model, lookup, obj):
+    """
+    Enlace al listado del admin de model filtrado por obj, con el total de filas
+    """
+    if obj is None or obj.pk is None:
+        return '-'
+    total = model._default_manager.filter(**{lookup: obj.pk}).count()
+    opts = model._meta
+    url = reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+    return format_html('<a href="{}?{}={}">Ver todos ({})</a>', url, lookup, obj.pk, total)
+
+
 # admin.site.register(Book)
 # inline BookInstance para BookAdmin
 class BooksInstanceInline(admin.TabularInline):
     model = BookInstance
+    formset = LimitedInlineFormSet
     extra = 0
+    raw_id_fields = ('borrower',)
+    show_change_link = True
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('book')
 # Nueva clase BookAdmin
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
+    # Opciones de genero e idioma desde catalog.refdata
+    form = BookForm
     list_display = ('title', 'author', 'display_genre')
+    list_select_related = ('author',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    readonly_fields = ('copies',)
     inlines = [BooksInstanceInline]
 
+    def get_queryset(self, request):
+        # display_genre usa self.genre.all(): una sola consulta para toda la pagina
+        return super().get_queryset(request).prefetch_related('genre')
+
+    @admin.display(description='Copias')
+    def copies(self, obj):
+        return related_changelist_link(BookInstance, 'book__id__exact', obj)
+
 # admin.site.register(Author)
 
 
 # inline Books para Author
 class BooksInline(admin.TabularInline):
     model = Book
+    formset = LimitedInlineFormSet
     extra = 0
+    show_change_link = True
+    # Cada fila solo renderiza sus generos; el resto se busca (GenreAdmin.search_fields)
+    autocomplete_fields = ('genre',)
 # Nueva clase AuthorAdmin
 class AuthorAdmin(admin.ModelAdmin):
     list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death')
-    fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
+    # Busqueda por prefijo con los indices de catalog.autocomplete (tambien para autocomplete_fields)
+    search_fields = ('last_name', 'first_name')
+    fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death'), 'books']
+    readonly_fields = ('books',)
     inlines = [BooksInline]
+
+    @admin.display(description='Libros')
+    def books(self, obj):
+        return related_changelist_link(Book, 'author__id__exact', obj)
+
+    def get_search_results(self, request, queryset, search_term):
+        return autocomplete.filter_authors(queryset, search_term), False
 # Registrar la clase admin con el modelo asociado
 admin.site.register(Author, AuthorAdmin)
 
-admin.site.register(Genre)
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
 
 # admin.site.register(BookInstance)
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     list_display = ('book', 'status', 'due_back', 'id')
     list_filter = ('status', 'due_back')
+    # __str__ de BookInstance usa book.title
+    list_select_related = ('book',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    raw_id_fields = ('book', 'borrower')
 
     fieldsets = (
         ('Data', {
@@ -45,4 +123,23 @@ class BookInstanceAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ('book', 'patron', 'priority', 'requested_at', 'status', 'copy', 'pickup_by')
+    list_filter = ('status', 'priority')
+    list_select_related = ('book', 'patron', 'copy')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    raw_id_fields = ('book', 'patron', 'copy')
+    actions = ('cancel_holds',)
+
+    @admin.action(description='Cancelar las reservas seleccionadas')
+    def cancel_holds(self, request, queryset):
+        # Una a una: al cancelar una reserva lista su copia pasa a la siguiente de la cola
+        cancelled = 0
+        for hold in queryset.active().select_related('copy'):
+            holds.cancel(hold)
+            cancelled += 1
+        self.message_user(request, '%d reservas canceladas' % cancelled)
+
 admin.site.register(Language)
\ No newline at end of file
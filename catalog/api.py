@@ -0,0 +1,283 @@
+"""
+API JSON de solo lectura del catalogo: libros, autores, copias y prestamos.
+
+    GET /catalog/api/<recurso>/?fields=a,b&limit=N&cursor=...&<filtro>=valor
+    GET /catalog/api/<recurso>/<pk>/?fields=a,b
+
+Con fields= solo se leen esas columnas (.values()), y los JOIN solo se hacen si
+se pide un campo de la tabla relacionada. Las listas se paginan por cursor
+(catalog.pagination.KeysetPaginator).
+
+ETag y Last-Modified salen de las columnas de version de las filas pedidas
+(updated_at y, en los libros, el resumen de disponibilidad), que estan en la
+propia tabla, mas el updated_at de las tablas relacionadas de las que se pida
+algun campo. Antes de la consulta completa se leen solo esas columnas; si el
+cliente ya tiene esa version se responde 304 sin tocar nada mas. Los campos de
+tablas sin columna de version (el usuario de un prestamo) desactivan las
+respuestas condicionales.
+
+En las listas el ETag incluye ademas si hay pagina siguiente y anterior, y no se
+envia Last-Modified: borrar una fila de la pagina no cambia el updated_at
+maximo de las que quedan.
+"""
+import hashlib
+from calendar import timegm
+
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from . import refdata
+from .models import Author, Book, BookInstance
+from .pagination import InvalidCursor, KeysetPaginator
+
+
+class Resource:
+    """
+    Declaracion de un recurso: nombre del campo en la API -> lookup del ORM
+    """
+    model = None
+    fields = {}
+    default_fields = None
+    # Campo -> funcion que convierte el valor leido de la BD
+    transforms = {}
+    # Parametros de la querystring -> lookup para filtrar la lista
+    filters = {}
+    # Columnas de la propia tabla que cambian cuando cambia la representacion
+    version_fields = ('updated_at',)
+    # Campos que pueden cambiar sin que cambie updated_at: con ellos no se envia Last-Modified
+    untimed_fields = ()
+    # Campo leido con JOIN -> updated_at de la tabla relacionada
+    related_version_fields = {}
+    # Campos de tablas sin columna de version: con ellos no hay ETag ni Last-Modified
+    unversioned_fields = ()
+    permission = None
+    ordering = ('pk',)
+    default_limit = 20
+    max_limit = 100
+
+    def get_queryset(self):
+        return self.model._default_manager.order_by()
+
+    def parse_fields(self, value):
+        if not value:
+            return list(self.default_fields or self.fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError('Campos desconocidos: %s' % ', '.join(unknown))
+        return list(dict.fromkeys(names))
+
+    def get_version_fields(self, fields):
+        """
+        Columnas de version para los campos pedidos: las propias y las de las tablas relacionadas
+        """
+        related = [self.related_version_fields[name] for name in fields if name in self.related_version_fields]
+        return self.version_fields + tuple(dict.fromkeys(related))
+
+    def etag_salt(self, fields):
+        return ''
+
+
+class BookResource(Resource):
+    model = Book
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'summary': 'summary',
+        'isbn': 'isbn',
+        'author': 'author_id',
+        'author_name': 'author__last_name',
+        'language': 'language_id',
+        'copies_total': 'copies_total',
+        'copies_available': 'copies_available',
+        'next_due_back': 'next_due_back',
+        'updated_at': 'updated_at',
+    }
+    default_fields = ('id', 'title', 'isbn', 'author', 'copies_available', 'updated_at')
+    # El nombre del idioma sale de catalog.refdata, sin JOIN
+    transforms = {'language': refdata.language_name}
+    filters = {'author': 'author_id'}
+    related_version_fields = {'author_name': 'author__updated_at'}
+    # El resumen de disponibilidad se actualiza con UPDATE sin tocar updated_at
+    version_fields = ('updated_at',) + Book.AVAILABILITY_FIELDS
+    untimed_fields = Book.AVAILABILITY_FIELDS
+
+
+class AuthorResource(Resource):
+    model = Author
+    fields = {
+        'id': 'id',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'date_of_birth': 'date_of_birth',
+        'date_of_death': 'date_of_death',
+        'updated_at': 'updated_at',
+    }
+
+
+class CopyResource(Resource):
+    model = BookInstance
+    fields = {
+        'id': 'id',
+        'book': 'book_id',
+        'imprint': 'imprint',
+        'status': 'status',
+        'due_back': 'due_back',
+        'updated_at': 'updated_at',
+    }
+    filters = {'book': 'book_id', 'status': 'status'}
+
+
+class LoanResource(Resource):
+    model = BookInstance
+    fields = {
+        'id': 'id',
+        'book': 'book_id',
+        'title': 'book__title',
+        'borrower': 'borrower__username',
+        'due_back': 'due_back',
+        'is_overdue': 'is_overdue',
+        'days_overdue': 'days_overdue',
+        'updated_at': 'updated_at',
+    }
+    filters = {'borrower': 'borrower__username'}
+    untimed_fields = ('is_overdue', 'days_overdue')
+    related_version_fields = {'title': 'book__updated_at'}
+    # auth.User no tiene updated_at
+    unversioned_fields = ('borrower',)
+    permission = 'catalog.can_mark_returned'
+    ordering = ('due_back', 'pk')
+
+    def get_queryset(self):
+        return BookInstance.objects.order_by().on_loan().with_overdue()
+
+    def etag_salt(self, fields):
+        # El retraso cambia cada dia aunque la fila no cambie
+        return timezone.localdate().isoformat() if set(fields) & set(self.untimed_fields) else ''
+
+
+RESOURCES = {
+    'books': BookResource(),
+    'authors': AuthorResource(),
+    'copies': CopyResource(),
+    'loans': LoanResource(),
+}
+
+
+def _get_resource(request, name):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        raise Http404('Recurso desconocido: %s' % name)
+    if resource.permission and not request.user.has_perm(resource.permission):
+        raise PermissionDenied
+    return resource
+
+
+def _conditional_response(request, resource, fields, versions, build, page_links=None):
+    """
+    Responde 304 si el cliente ya tiene esta version; si no, llama a build().
+
+    page_links es (has_next, has_previous) en las listas: forma parte del ETag y
+    sin Last-Modified.
+    """
+    if set(fields) & set(resource.unversioned_fields):
+        return build()
+    state = (fields, resource.etag_salt(fields), versions, page_links)
+    etag = quote_etag(hashlib.md5(repr(state).encode(), usedforsecurity=False).hexdigest())
+    last_modified = None
+    # versions son tuplas (pk, *resource.get_version_fields(fields))
+    if versions and page_links is None and not set(fields) & set(resource.untimed_fields):
+        names = ('pk',) + resource.get_version_fields(fields)
+        timed = [index for index, name in enumerate(names) if name.split('__')[-1] == 'updated_at']
+        # Un JOIN sin fila relacionada (libro sin autor) da None
+        timestamps = [version[index] for version in versions for index in timed if version[index] is not None]
+        last_modified = timegm(max(timestamps).utctimetuple())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build()
+    response.headers.setdefault('ETag', etag)
+    if last_modified is not None:
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
+
+
+def _ordering_columns(resource):
+    # El cursor de KeysetPaginator necesita estas columnas en cada fila
+    return [resource.model._meta.pk.attname if name == 'pk' else name.lstrip('-') for name in resource.ordering]
+
+
+def _rows(resource, fields, rows):
+    identity = lambda value: value  # noqa: E731
+    convert = [(name, resource.fields[name], resource.transforms.get(name, identity)) for name in fields]
+    return [{name: function(row[lookup]) for name, lookup, function in convert} for row in rows]
+
+
+@require_safe
+def resource_list(request, resource):
+    resource = _get_resource(request, resource)
+    try:
+        fields = resource.parse_fields(request.GET.get('fields'))
+        limit = min(int(request.GET.get('limit', resource.default_limit)), resource.max_limit)
+        if limit < 1:
+            raise ValueError('limit debe ser positivo')
+        queryset = resource.get_queryset().filter(**{
+            lookup: request.GET[param] for param, lookup in resource.filters.items() if param in request.GET
+        })
+        cursor = request.GET.get('cursor')
+
+        # Version de las filas de la pagina: solo las columnas de ordenacion y de version
+        version_fields = resource.get_version_fields(fields)
+        probe = KeysetPaginator(queryset.values(*_ordering_columns(resource), *version_fields), limit, resource.ordering)
+        probe_page = probe.page(cursor)
+        versions = [(row['id'],) + tuple(row[name] for name in version_fields) for row in probe_page]
+        page_links = (probe_page.has_next(), probe_page.has_previous())
+    except (ValueError, ValidationError, InvalidCursor) as e:
+        return HttpResponseBadRequest(str(e))
+
+    def build():
+        lookups = dict.fromkeys(_ordering_columns(resource) + [resource.fields[name] for name in fields])
+        page = KeysetPaginator(queryset.values(*lookups), limit, resource.ordering).page(cursor)
+        url = reverse('api-list', args=[request.resolver_match.kwargs['resource']])
+
+        def link(cursor):
+            if cursor is None:
+                return None
+            query = request.GET.copy()
+            query['cursor'] = cursor
+            return request.build_absolute_uri('%s?%s' % (url, query.urlencode()))
+
+        return JsonResponse({
+            'results': _rows(resource, fields, page),
+            'next': link(page.next_cursor),
+            'previous': link(page.previous_cursor),
+        })
+
+    return _conditional_response(request, resource, fields, versions, build, page_links)
+
+
+@require_safe
+def resource_detail(request, resource, pk):
+    resource = _get_resource(request, resource)
+    try:
+        fields = resource.parse_fields(request.GET.get('fields'))
+        pk = resource.model._meta.pk.to_python(pk)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    except ValidationError:
+        raise Http404('No existe %s' % pk)
+    queryset = resource.get_queryset().filter(pk=pk)
+
+    versions = [tuple(row) for row in queryset.values_list('pk', *resource.get_version_fields(fields))]
+    if not versions:
+        raise Http404('No existe %s' % pk)
+
+    def build():
+        row = queryset.values(*{resource.fields[name]: None for name in fields}).get()
+        return JsonResponse(_rows(resource, fields, [row])[0])
+
+    return _conditional_response(request, resource, fields, versions, build)
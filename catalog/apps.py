@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'catalog'
+
+    def ready(self):
+        # Conecta los receptores de señales (contadores, etc.) y registra las comprobaciones
+        from . import checks, signals  # noqa: F401
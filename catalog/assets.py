@@ -0,0 +1,131 @@
+"""
+Ficheros estaticos propios y de terceros (Bootstrap) servidos desde el propio sitio.
+
+Las librerias de terceros estan en catalog/static/vendor/ (en el repositorio).
+El comando vendor_static las descarga de VENDOR_ASSETS y comprueba su hash, para
+añadir o actualizar una. Si falta alguna, vendor_url() devuelve la URL del CDN.
+
+serve() sirve STATIC_ROOT (lo que deja collectstatic con
+catalog.storage.CompressedManifestStaticFilesStorage):
+
+    - los ficheros con hash en el nombre con Cache-Control de un año e immutable:
+      el navegador no vuelve a preguntar por ellos
+    - el resto con revalidacion (Last-Modified / If-Modified-Since)
+    - la variante .br o .gz precomprimida si el cliente la acepta
+    - con FileResponse, que el servidor WSGI envia con wsgi.file_wrapper
+      (sendfile en gunicorn y uWSGI), o solo con la cabecera X-Accel-Redirect
+      si hay un nginx delante (CATALOG_STATIC_ACCEL_REDIRECT)
+"""
+import functools
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.templatetags.static import static
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+BOOTSTRAP = 'https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/'
+
+# Ruta dentro de static/ -> (URL de origen, hash SRI publicado o None)
+VENDOR_ASSETS = {
+    'vendor/bootstrap/3.3.7/css/bootstrap.min.css': (
+        BOOTSTRAP + 'css/bootstrap.min.css',
+        'sha384-BVYiiSIFeK1dGmJRAkycuHAHRg32OmUcww7on3RYdg4Va+PmSTsz/K68vbdEjh4u',
+    ),
+    # bootstrap.min.css termina con sourceMappingURL: ManifestStaticFilesStorage lo sigue
+    'vendor/bootstrap/3.3.7/css/bootstrap.min.css.map': (BOOTSTRAP + 'css/bootstrap.min.css.map', None),
+    'vendor/bootstrap/3.3.7/js/bootstrap.min.js': (
+        BOOTSTRAP + 'js/bootstrap.min.js',
+        'sha384-Tc5IQib027qvyjSMfHjOMaLkfuWVxZxUPnCJA7l2mCWNIpG9mGCD8wGNIcPD7Txa',
+    ),
+    # bootstrap.min.css las referencia con url(../fonts/...): collectstatic las necesita
+    **{
+        'vendor/bootstrap/3.3.7/fonts/glyphicons-halflings-regular.' + extension: (
+            BOOTSTRAP + 'fonts/glyphicons-halflings-regular.' + extension, None,
+        )
+        for extension in ('eot', 'svg', 'ttf', 'woff', 'woff2')
+    },
+}
+
+# Nombres que genera ManifestStaticFilesStorage: nombre.<12 hex>.extension
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# Variantes precomprimidas por orden de preferencia
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+@functools.lru_cache(maxsize=None)
+def _is_vendored(path):
+    if settings.DEBUG:
+        return finders.find(path) is not None
+    return staticfiles_storage.exists(path)
+
+
+def vendor_url(path):
+    """
+    URL del fichero de terceros: el propio si esta descargado, si no el del CDN
+    """
+    if _is_vendored(path):
+        return static(path)
+    return VENDOR_ASSETS[path][0]
+
+
+def _max_age():
+    return getattr(settings, 'CATALOG_STATIC_MAX_AGE', 365 * 24 * 60 * 60)
+
+
+def _negotiate(request, fullpath):
+    """
+    (fichero a enviar, Content-Encoding o None) segun Accept-Encoding
+    """
+    accepted = {
+        value.split(';')[0].strip().lower()
+        for value in request.headers.get('Accept-Encoding', '').split(',')
+    }
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(fullpath + suffix):
+            return fullpath + suffix, encoding
+    return fullpath, None
+
+
+@require_safe
+def serve(request, path):
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except (SuspiciousFileOperation, TypeError):
+        raise Http404('No existe %s' % path)
+    if not os.path.isfile(fullpath):
+        raise Http404('No existe %s' % path)
+
+    filename, encoding = _negotiate(request, fullpath)
+    stat = os.stat(filename)
+    immutable = HASHED_NAME.search(path) is not None
+    if not immutable and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    accel_prefix = getattr(settings, 'CATALOG_STATIC_ACCEL_REDIRECT', None)
+    if accel_prefix:
+        # nginx envia el fichero (interno) con sendfile; Django solo pone las cabeceras
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + os.path.relpath(filename, settings.STATIC_ROOT)
+    else:
+        response = FileResponse(open(filename, 'rb'), content_type=content_type)
+        response['Content-Length'] = stat.st_size
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if immutable:
+        response['Cache-Control'] = 'public, max-age=%d, immutable' % _max_age()
+    else:
+        response['Cache-Control'] = 'public, no-cache'
+    return response
@@ -0,0 +1,140 @@
+"""
+Versiones asincronas (ASGI) de las vistas de solo lectura del catalogo.
+
+Reutilizan las vistas de catalog/views.py (plantillas, plan de carga de
+relaciones, ordenacion, permisos) y solo cambian como se obtienen los datos:
+ORM asincrono (acount, aget, iteracion asincrona) en lugar de llamadas
+bloqueantes. La plantilla se devuelve como TemplateResponse, que el manejador
+ASGI renderiza fuera del bucle de eventos (el contexto puede tocar la sesion
+o el usuario de forma perezosa).
+
+Se activan con CATALOG_ASYNC_VIEWS = True (ver catalog/urls.py).
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.paginator import InvalidPage
+from django.http import Http404
+from django.template.response import TemplateResponse
+
+from . import routers, views, visits
+from .counters import aget_counters
+from .pagination import KeysetPaginator
+
+
+@routers.read_from_replica
+async def index(request):
+    """
+    Pagina de inicio: los contadores, si no estan en cache, se cuentan a la vez
+    """
+    counters = await aget_counters()
+    num_visits = visits.visitor_count(request)
+
+    def count_visit():
+        visits.buffer.add()
+        return visits.buffer.total()
+
+    # Puede volcar a la cache (red si no es LocMem): fuera del bucle de eventos
+    total = await sync_to_async(count_visit)()
+
+    response = TemplateResponse(
+        request,
+        'index.html',
+        context={**counters, 'num_visits': num_visits, 'num_visits_total': total},
+    )
+    visits.remember_visitor_count(response, num_visits)
+    return response
+
+
+class AsyncAccessMixin:
+    """
+    dispatch asincrono: resuelve el usuario con request.auser() y aplica
+    LoginRequiredMixin / PermissionRequiredMixin si la vista base los usa
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # El usuario ya resuelto: ni los permisos ni la plantilla vuelven a consultarlo
+        request.user = await request.auser()
+        if isinstance(self, LoginRequiredMixin) and not request.user.is_authenticated:
+            return self.handle_no_permission()
+        if isinstance(self, PermissionRequiredMixin) and not await sync_to_async(self.has_permission)():
+            return self.handle_no_permission()
+        handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+        return await handler(request, *args, **kwargs)
+
+
+class AsyncListMixin(AsyncAccessMixin):
+    """
+    get() asincrono para las ListView con KeysetPaginationMixin
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        page_size = self.get_paginate_by(self.object_list)
+        if self.page_kwarg in request.GET:
+            # Enlaces antiguos con ?page=N: Paginator sincrono
+            paginator, page, object_list, is_paginated = await sync_to_async(self.paginate_queryset)(self.object_list, page_size)
+        else:
+            paginator = KeysetPaginator(self.object_list, page_size, self.get_keyset_ordering())
+            try:
+                page = await paginator.apage(request.GET.get(self.cursor_kwarg))
+            except InvalidPage as e:
+                raise Http404('Cursor no valido: %s' % e)
+            object_list, is_paginated = page.object_list, page.has_other_pages()
+
+        context = {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': is_paginated,
+            'object_list': object_list,
+            'view': self,
+        }
+        context_object_name = self.get_context_object_name(self.object_list)
+        if context_object_name:
+            context[context_object_name] = object_list
+        if self.extra_context:
+            context.update(self.extra_context)
+        return self.render_to_response(context)
+
+
+class AsyncDetailMixin(AsyncAccessMixin):
+    """
+    get() asincrono para las DetailView con FragmentCacheMixin
+    """
+
+    async def get(self, request, *args, **kwargs):
+        pk = self.kwargs[self.pk_url_kwarg]
+        if await sync_to_async(self.lookup_fragment)() is not None:
+            queryset = self.model._default_manager.all()
+        else:
+            queryset = self.get_queryset()
+        try:
+            self.object = await queryset.aget(pk=pk)
+        except self.model.DoesNotExist:
+            raise Http404('No %s encontrado con pk %s' % (self.model._meta.verbose_name, pk))
+        if hasattr(self, 'load_reference_data'):
+            self.object = await sync_to_async(self.load_reference_data)(self.object)
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+
+class BookListView(AsyncListMixin, views.BookListView):
+    pass
+
+
+class BookDetailView(AsyncDetailMixin, views.BookDetailView):
+    pass
+
+
+class AuthorListView(AsyncListMixin, views.AuthorListView):
+    pass
+
+
+class AuthorDetailView(AsyncDetailMixin, views.AuthorDetailView):
+    pass
+
+
+class LoanedBooksByUserListView(AsyncListMixin, views.LoanedBooksByUserListView):
+    pass
+
+
+class LoanedBooksLibrarianView(AsyncListMixin, views.LoanedBooksLibrarianView):
+    pass
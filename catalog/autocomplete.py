@@ -0,0 +1,74 @@
+"""
+Busqueda de autores por prefijo para los selectores con autocompletado.
+
+Los formularios de libro ya no cargan todos los autores en un <select>: el
+widget (catalog.widgets.AutocompleteSelect) pide sugerencias a la vista
+author_autocomplete, que devuelve como mucho una pagina.
+
+El prefijo se busca como un rango (>= prefijo y < prefijo siguiente) sobre las
+columnas last_name_key y first_name_key de Author, que guardan el nombre en
+minusculas y sin acentos (catalog.utils.fold). Termino y columna se normalizan
+igual en Python: LOWER() de SQLite solo cambia las letras ASCII y no encontraria
+"Álvarez" buscando "álv". El rango usa los indices author_last_name_key_idx y
+author_first_name_key_idx en lugar de recorrer la tabla como LIKE '%...%'.
+"""
+import re
+
+from django.db.models import Q
+
+from .models import Author
+from .utils import fold
+
+MAX_RESULTS = 50
+
+
+def _words(term):
+    return [word for word in re.split(r'[\s,]+', fold(term)) if word]
+
+
+def _prefix(field, prefix):
+    """
+    field empieza por prefix (ya normalizado), como rango del indice
+    """
+    following = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': following})
+
+
+def authors_queryset(queryset=None):
+    return Author.objects.all() if queryset is None else queryset
+
+
+def filter_authors(queryset, term):
+    """
+    Autores cuyo apellido (o nombre) empieza por la primera palabra de term; con
+    dos palabras, apellido y nombre ("cervantes mig")
+    """
+    words = _words(term)
+    if not words:
+        return queryset
+    if len(words) > 1:
+        return queryset.filter(_prefix('last_name_key', words[0]) & _prefix('first_name_key', words[1]))
+    word = words[0]
+    return queryset.filter(_prefix('last_name_key', word) | _prefix('first_name_key', word))
+
+
+def search_authors(term, limit=20):
+    """
+    Como mucho limit autores para term, primero por apellido y luego por nombre.
+    Devuelve (autores, hay_mas). Cada consulta recorre un indice en orden y se
+    corta en limit + 1 filas, asi que no depende del tamaño de la tabla.
+    """
+    words = _words(term)
+    limit = max(1, min(limit, MAX_RESULTS))
+    if not words:
+        return [], False
+    authors = authors_queryset().only('id', 'first_name', 'last_name')
+    last = words[0]
+    by_last = authors.filter(_prefix('last_name_key', last))
+    if len(words) > 1:
+        by_last = by_last.filter(_prefix('first_name_key', words[1]))
+    found = list(by_last.order_by('last_name_key', 'first_name_key', 'pk')[:limit + 1])
+    if len(words) == 1 and len(found) <= limit:
+        by_first = authors.filter(_prefix('first_name_key', last)).exclude(pk__in=[author.pk for author in found])
+        found += by_first.order_by('first_name_key', 'pk')[:limit + 1 - len(found)]
+    return found[:limit], len(found) > limit
@@ -0,0 +1,61 @@
+"""
+Resumen de disponibilidad de cada libro guardado en el propio Book
+(copies_total, copies_available, next_due_back).
+
+Se recalcula con un UPDATE cuyas subconsultas cuentan las copias del libro, de
+modo que el valor escrito sale de la misma sentencia y no de lecturas previas
+que otra peticion podria haber dejado obsoletas. Las señales lo llaman dentro
+de la transaccion que guarda o borra la copia; rebuild() lo recalcula todo.
+"""
+from django.db.models import Count, IntegerField, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .utils import batched
+
+
+def _copies_aggregate(aggregate, output_field=None):
+    from .models import BookInstance
+
+    copies = (
+        BookInstance.objects.filter(book=OuterRef('pk'))
+        .order_by()
+        .values('book')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Subquery(copies, output_field=output_field)
+
+
+def summary_expressions():
+    """
+    Expresiones SQL con el valor real de cada campo de disponibilidad
+    """
+    return {
+        'copies_total': Coalesce(_copies_aggregate(Count('pk')), 0, output_field=IntegerField()),
+        'copies_available': Coalesce(_copies_aggregate(Count('pk', filter=Q(status='a'))), 0, output_field=IntegerField()),
+        'next_due_back': _copies_aggregate(Min('due_back', filter=Q(status='o'))),
+    }
+
+
+def refresh(*book_ids):
+    """
+    Recalcula el resumen de los libros indicados (se ignoran los None)
+    """
+    from .models import Book
+
+    book_ids = {pk for pk in book_ids if pk is not None}
+    if not book_ids:
+        return 0
+    return Book.objects.filter(pk__in=book_ids).update(**summary_expressions())
+
+
+def rebuild(batch_size=5000):
+    """
+    Recalcula el resumen de todos los libros por lotes; devuelve cuantos se han tocado
+    """
+    from .models import Book
+
+    updated = 0
+    for batch in batched(Book.objects.values_list('pk', flat=True).order_by('pk').iterator(), batch_size):
+        updated += refresh(*batch)
+    return updated
@@ -0,0 +1,727 @@
+"""
+Utilidades para los benchmarks del catalogo (comandos bench_*).
+
+Los benchmarks nunca tocan la base de datos real: trabajan sobre una base de
+datos de pruebas creada igual que la del test runner y destruida al terminar.
+
+Ademas de generar datos, aqui esta el arnes de bench_catalog: recorre todas las
+rutas de catalog/urls.py con el cliente de pruebas (latencia y consultas por
+peticion) y con un generador de carga concurrente contra un servidor WSGI real,
+y produce resultados en JSON comparables entre commits.
+"""
+import asyncio
+import datetime
+import http.client
+import importlib
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, get_internal_wsgi_application
+from django.db import connection
+from django.test import AsyncClient, Client, RequestFactory, override_settings
+from django.test.testcases import QuietWSGIRequestHandler
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, clear_url_caches, reverse
+from django.utils import timezone
+
+from . import availability, counters, holds, refdata, search
+from .models import Author, Book, BookInstance, Genre, Hold, Language
+from .utils import batched
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Tamaños de los datos generados por bench_catalog --dataset
+DATASETS = {
+    '1k': {'num_instances': 1000, 'num_books': 200, 'num_users': 50},
+    '10k': {'num_instances': 10000, 'num_books': 2000, 'num_users': 200},
+    '100k': {'num_instances': 100000, 'num_books': 20000, 'num_users': 1000},
+    '1m': {'num_instances': 1000000, 'num_books': 100000, 'num_users': 10000},
+}
+
+
+@contextmanager
+def benchmark_database(db_file=None, verbosity=0):
+    """
+    Crea una base de datos de pruebas vacia (con migraciones) y la destruye al salir
+    """
+    old_name = connection.settings_dict['NAME']
+    if db_file:
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = db_file
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def seed_loans(num_instances, num_books=10000, num_users=1000, batch_size=10000, seed=0):
+    """
+    Rellena la BD con autores, libros, usuarios y num_instances copias con una
+    mezcla realista de estados. Devuelve la lista de ids de los usuarios creados.
+    """
+    rng = random.Random(seed)
+    today = datetime.date.today()
+
+    language = Language.objects.create(name='Bench')
+    authors = Author.objects.bulk_create(
+        Author(first_name='Author', last_name='Bench %s' % num) for num in range(max(num_books // 10, 1))
+    )
+    for batch in batched(range(num_books), batch_size):
+        Book.objects.bulk_create(
+            Book(title='Book %s' % num, summary='Summary', isbn='%013d' % num, author=rng.choice(authors), language=language)
+            for num in batch
+        )
+    book_ids = list(Book.objects.values_list('id', flat=True))
+
+    User.objects.bulk_create(
+        User(username='bench%s' % num, password='!') for num in range(num_users)
+    )
+    user_ids = list(User.objects.filter(username__startswith='bench').values_list('id', flat=True))
+
+    def instances():
+        for _ in range(num_instances):
+            status = rng.choices('oamr', weights=(30, 40, 20, 10))[0]
+            on_loan = status == 'o'
+            yield BookInstance(
+                book_id=rng.choice(book_ids),
+                imprint='Bench imprint',
+                status=status,
+                due_back=today + datetime.timedelta(days=rng.randint(-60, 60)) if on_loan else None,
+                borrower_id=rng.choice(user_ids) if on_loan else None,
+            )
+
+    for batch in batched(instances(), batch_size):
+        BookInstance.objects.bulk_create(batch)
+    # bulk_create no envia señales
+    availability.rebuild()
+    return user_ids
+
+
+def seed_holds(num_holds, user_ids, batch_size=10000, urgent=0.1, seed=0):
+    """
+    Crea num_holds reservas en espera repartidas entre los libros sin copias
+    disponibles (como mucho una por libro y usuario), con peticiones de los
+    ultimos 30 dias. Como en produccion, ninguna cola tiene copias sin asignar.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    book_ids = list(Book.objects.filter(copies_available=0).order_by('pk').values_list('pk', flat=True))
+    if num_holds > len(book_ids) * len(user_ids):
+        raise ValueError('No hay bastantes libros y usuarios para %s reservas' % num_holds)
+
+    def rows():
+        for num in range(num_holds):
+            yield Hold(
+                book_id=book_ids[num % len(book_ids)],
+                patron_id=user_ids[num // len(book_ids)],
+                priority=Hold.URGENT if rng.random() < urgent else Hold.NORMAL,
+                requested_at=now - datetime.timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+            )
+
+    for batch in batched(rows(), batch_size):
+        Hold.objects.bulk_create(batch)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def bench_hold_returns(num_returns):
+    """
+    Devuelve num_returns copias prestadas de libros con reservas en espera, cada
+    una con save() como el resto de la aplicacion (la señal asigna la copia).
+    Devuelve el resumen de latencias y consultas por devolucion.
+    """
+    waiting = Hold.objects.waiting().values('book_id')
+    copies = list(BookInstance.objects.filter(status='o', book_id__in=waiting).order_by('pk')[:num_returns])
+    latencies, queries, errors = [], [], 0
+    for copy in copies:
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            copy.status = 'a'
+            copy.borrower = None
+            copy.due_back = None
+            copy.save()
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx))
+        errors += copy.status != 'r'
+    return summarize(latencies, queries, errors)
+
+
+def bench_hold_placement(num_holds, user):
+    """
+    Latencia de holds.place() para un usuario sin reservas en num_holds libros
+    sin copias disponibles (la reserva queda en espera)
+    """
+    latencies, queries = [], []
+    for book in Book.objects.filter(copies_available=0).order_by('pk')[:num_holds]:
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            holds.place(book, user)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx))
+    return summarize(latencies, queries)
+
+
+def time_call(func, repeat=5):
+    """
+    Ejecuta func repeat veces y devuelve la mediana en milisegundos
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def seed_catalog(num_instances, num_books, num_users, num_genres=20, seed=0):
+    """
+    seed_loans mas generos y los datos derivados (buscador, contadores) para que
+    todas las paginas del catalogo tengan contenido. Devuelve los ids de usuario.
+    """
+    rng = random.Random(seed)
+    user_ids = seed_loans(num_instances, num_books=num_books, num_users=num_users, seed=seed)
+    genres = Genre.objects.bulk_create(Genre(name='Genre %s' % num) for num in range(num_genres))
+    Through = Book.genre.through
+    rows = (
+        Through(book_id=book_id, genre_id=genre.pk)
+        for book_id in Book.objects.values_list('pk', flat=True).iterator()
+        for genre in rng.sample(genres, min(2, len(genres)))
+    )
+    for batch in batched(rows, 10000):
+        Through.objects.bulk_create(batch)
+    search.rebuild()
+    counters.recount()
+    refdata.genres.invalidate()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return user_ids
+
+
+# Silabas del vocabulario sintetico de bench_search
+SYLLABLES = (
+    'ca', 'ba', 'lle', 'ro', 'man', 'cha', 'qui', 'jo', 'te', 'dul', 'ci', 'ne', 'a', 'hi',
+    'dal', 'go', 'ven', 'tu', 'ra', 'es', 'pa', 'ña', 'mo', 'li', 'no', 'vien', 'to', 'sol',
+)
+
+
+def search_vocabulary(size, rng):
+    """
+    size palabras distintas de dos a cuatro silabas, en un orden reproducible
+    """
+    words = {}
+    while len(words) < size:
+        words[''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))] = None
+    return list(words)
+
+
+def seed_search_books(num_books, vocabulary_size=5000, batch_size=10000, seed=0):
+    """
+    Libros con titulo, resumen y autor generados de un vocabulario con frecuencias
+    de Zipf (pocas palabras muy comunes y muchas raras), para medir el buscador.
+    Devuelve el vocabulario de la palabra mas frecuente a la menos.
+    """
+    rng = random.Random(seed)
+    vocabulary = search_vocabulary(vocabulary_size, rng)
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def text(min_words, max_words):
+        return ' '.join(rng.choices(vocabulary, cum_weights=weights, k=rng.randint(min_words, max_words)))
+
+    language = Language.objects.create(name='Bench')
+    authors = Author.objects.bulk_create(
+        Author(first_name=text(1, 1).title(), last_name=text(1, 2).title()) for _ in range(max(num_books // 10, 1))
+    )
+    for batch in batched(range(num_books), batch_size):
+        Book.objects.bulk_create(
+            Book(title=text(2, 6).capitalize(), summary=text(20, 60), isbn='%013d' % num, author=rng.choice(authors), language=language)
+            for num in batch
+        )
+    return vocabulary
+
+
+def search_queries(vocabulary):
+    """
+    Consultas de bench_search: terminos de distinta frecuencia, un prefijo y dos terminos
+    """
+    common, medium, rare = vocabulary[0], vocabulary[len(vocabulary) // 50], vocabulary[-1]
+    return {
+        'comun': common,
+        'media': medium,
+        'rara': rare,
+        'prefijo': medium[:3],
+        'dos terminos': '%s %s' % (common, medium),
+    }
+
+
+def bench_search(backend, queries, repeat=20, page_size=10):
+    """
+    Por consulta, latencias de contar los resultados y leer la primera pagina
+    (lo mismo que hace BookSearchView) y numero de resultados (hasta
+    search.max_count())
+    """
+    results = {}
+    for label, query in queries.items():
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = search.SearchResults(query, backend=backend)
+            count = found.count()
+            found[:page_size]
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[label] = dict(summarize(latencies), query=query, results=count, truncated=found.truncated)
+    return results
+
+
+def bench_search_updates(backend, book_ids):
+    """
+    Latencias de reindexar un libro (lo que hace la señal post_save de Book)
+    """
+    latencies = []
+    for pk in book_ids:
+        start = time.perf_counter()
+        backend.index([pk])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies)
+
+
+def percentile(values, pct):
+    """
+    Percentil por el metodo del rango mas cercano (values no tiene que estar ordenado)
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies, queries=None, errors=0):
+    """
+    Resumen de una serie de latencias en milisegundos
+    """
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'mean_ms': statistics.fmean(latencies) if latencies else None,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+    }
+    if queries is not None:
+        summary['queries'] = max(queries) if queries else None
+    return summary
+
+
+def peak_rss_mb():
+    """
+    Memoria residente maxima del proceso en MB (None si no se puede medir)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux da KB y macOS bytes
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+# Rutas que solo aceptan POST: no se miden con peticiones GET
+POST_ONLY_ROUTES = {'book-hold'}
+
+
+def memory_mb():
+    """
+    {'rss', 'pss', 'private'} del proceso actual en MB (Linux, /proc/self/smaps_rollup),
+    o None. private es la memoria que no comparte con ningun otro proceso.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            values = {line.split(':')[0]: int(line.split()[1]) for line in f if line.endswith('kB\n')}
+    except OSError:
+        return None
+    return {
+        'rss': values['Rss'] / 1024,
+        'pss': values['Pss'] / 1024,
+        'private': (values['Private_Clean'] + values['Private_Dirty']) / 1024,
+    }
+
+
+def _serve_routes(routes, username, requests):
+    # La aplicacion WSGI del proyecto (la de locallibrary.wsgi), no el manejador del cliente de pruebas
+    application = get_internal_wsgi_application()
+    client = Client()
+    client.force_login(User.objects.get(username=username))
+    cookie = '; '.join('%s=%s' % (name, morsel.value) for name, morsel in client.cookies.items())
+    factory = RequestFactory()
+
+    def get(url):
+        start = time.perf_counter()
+        body = application(factory.get(url, headers={'cookie': cookie}).environ, lambda status, headers, exc_info=None: None)
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return (time.perf_counter() - start) * 1000
+
+    first = {name: get(url) for name, url in routes.items()}
+    latencies = [get(url) for _ in range(requests) for url in routes.values()]
+    return {
+        'first_request_ms': first,
+        'first_requests_total_ms': sum(first.values()),
+        'warm': summarize(latencies),
+        'worker_memory': memory_mb(),
+    }
+
+
+def worker_probe(routes, username, requests=20):
+    """
+    Desde un proceso con la aplicacion ya cargada, hace fork de un worker (como
+    gunicorn --preload) que pide cada ruta una vez (primera peticion) y luego
+    requests veces mas, y mide su memoria al terminar
+    """
+    master_memory = memory_mb()
+    if not hasattr(os, 'fork'):
+        return dict(_serve_routes(routes, username, requests), master_memory=master_memory)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            with os.fdopen(write_fd, 'w') as pipe:
+                json.dump(_serve_routes(routes, username, requests), pipe)
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        data = pipe.read()
+    os.waitpid(pid, 0)
+    if not data:
+        raise RuntimeError('El worker de prueba ha fallado')
+    return dict(json.loads(data), master_memory=master_memory)
+
+
+# Proceso nuevo: carga locallibrary.wsgi (con o sin calentamiento) contra la BD de
+# pruebas y ejecuta worker_probe. Argumentos: BD, rutas (JSON), usuario, peticiones
+STARTUP_PROBE = '''
+import json, os, sys, time
+start = time.perf_counter()
+os.environ['DJANGO_SETTINGS_MODULE'] = 'locallibrary.settings'
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = sys.argv[1]
+settings.ALLOWED_HOSTS = ['testserver']
+from locallibrary.wsgi import application
+startup_ms = (time.perf_counter() - start) * 1000
+from catalog import bench
+result = bench.worker_probe(json.loads(sys.argv[2]), sys.argv[3], int(sys.argv[4]))
+print(json.dumps(dict(result, startup_ms=startup_ms)))
+'''
+
+
+def bench_startup(db_file, routes, username, warmup=True, requests=20):
+    """
+    Arranca la aplicacion en un proceso nuevo (DEBUG desactivado) y devuelve el
+    resultado de worker_probe mas startup_ms (importar locallibrary.wsgi)
+    """
+    flag = '1' if warmup else '0'
+    env = dict(
+        os.environ,
+        DJANGO_DEBUG='False',
+        CATALOG_WARMUP=flag,
+        CATALOG_PRECOMPILE_TEMPLATES=flag,
+        # Sin collectstatic no hay manifest de los ficheros estaticos
+        DJANGO_STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+        # Un solo worker, y cada arranque con la cache vacia
+        DJANGO_CACHE_BACKEND='django.core.cache.backends.locmem.LocMemCache',
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', STARTUP_PROBE, str(db_file), json.dumps(routes), username, str(requests)],
+        capture_output=True, text=True, check=True, env=env, cwd=str(settings.BASE_DIR),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def catalog_routes(user=None):
+    """
+    {nombre: url} de todas las rutas GET de catalog/urls.py, con argumentos tomados
+    de los datos existentes. Las rutas cuyos argumentos no se pueden rellenar se omiten.
+    """
+    from . import urls
+
+    book = Book.objects.order_by('pk').first()
+    author = Author.objects.order_by('pk').first()
+    loan = BookInstance.objects.filter(status='o').order_by('pk').first()
+    samples = {'book': book, 'author': author, 'bookinstance': loan}
+    extra = {'book-search': '?q=book'}
+    # Rutas cuyos argumentos no dependen del nombre de la ruta
+    fixed = {'api-list': {'resource': 'books'}}
+    if book is not None:
+        fixed['api-detail'] = {'resource': 'books', 'pk': book.pk}
+
+    routes = {}
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in POST_ONLY_ROUTES:
+            continue
+        if pattern.name in fixed:
+            routes[pattern.name] = reverse(pattern.name, kwargs=fixed[pattern.name])
+            continue
+        kwargs = {}
+        for name, converter in pattern.pattern.converters.items():
+            kind = 'bookinstance' if type(converter).__name__ == 'UUIDConverter' else pattern.name.split('-')[0]
+            obj = samples.get(kind)
+            if obj is None:
+                break
+            kwargs[name] = obj.pk
+        else:
+            routes[pattern.name] = reverse(pattern.name, kwargs=kwargs) + extra.get(pattern.name, '')
+    return routes
+
+
+def bench_user(num_loans=10):
+    """
+    Superusuario para las rutas protegidas, con algunos prestamos a su nombre (my-borrowed)
+    """
+    user = User.objects.create_superuser('bench-admin', 'bench@example.com', None)
+    loans = BookInstance.objects.filter(status='o').values_list('pk', flat=True)[:num_loans]
+    BookInstance.objects.filter(pk__in=list(loans)).update(borrower=user)
+    return user
+
+
+def _consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+
+
+def bench_client(client, routes, iterations=50):
+    """
+    Pide cada ruta iterations veces (tras una peticion de calentamiento) con el
+    cliente de pruebas. Devuelve {nombre: resumen} con latencias y consultas.
+    """
+    results = {}
+    for name, url in routes.items():
+        _consume(client.get(url))
+        latencies, queries, errors = [], [], 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = client.get(url)
+                _consume(response)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(ctx))
+            errors += response.status_code >= 400
+        results[name] = dict(summarize(latencies, queries, errors), url=url, status=response.status_code)
+    return results
+
+
+@contextmanager
+def wsgi_server():
+    """
+    Sirve el proyecto con el servidor WSGI multihilo de Django en un puerto libre
+    """
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def bench_load(routes, concurrency=8, duration=10.0, cookies=''):
+    """
+    Generador de carga: concurrency hilos piden las rutas en turno rotatorio contra
+    un servidor WSGI real durante duration segundos. Devuelve
+    ({nombre: resumen}, {peticiones por segundo totales, ...}).
+    """
+    names = list(routes)
+    samples = {name: [] for name in names}
+    errors = dict.fromkeys(names, 0)
+    lock = threading.Lock()
+
+    with wsgi_server() as (host, port):
+        deadline = time.perf_counter() + duration
+
+        def worker(offset):
+            local = {name: [] for name in names}
+            local_errors = dict.fromkeys(names, 0)
+            for name in itertools.islice(itertools.cycle(names), offset, None):
+                if time.perf_counter() >= deadline:
+                    break
+                start = time.perf_counter()
+                try:
+                    conn = http.client.HTTPConnection(host, port, timeout=60)
+                    conn.request('GET', routes[name], headers={'Cookie': cookies})
+                    response = conn.getresponse()
+                    response.read()
+                    conn.close()
+                    local_errors[name] += response.status >= 400
+                except (OSError, http.client.HTTPException):
+                    local_errors[name] += 1
+                local[name].append((time.perf_counter() - start) * 1000)
+            with lock:
+                for name in names:
+                    samples[name].extend(local[name])
+                    errors[name] += local_errors[name]
+
+        threads = [threading.Thread(target=worker, args=(num,)) for num in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    results = {name: summarize(samples[name], errors=errors[name]) for name in names}
+    total = sum(len(values) for values in samples.values())
+    return results, {'concurrency': concurrency, 'seconds': elapsed, 'requests': total, 'requests_per_second': total / elapsed}
+
+
+def run_metadata(**extra):
+    """
+    Datos del entorno para poder comparar resultados entre commits y maquinas
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict({
+        'commit': commit,
+        'created': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+    }, **extra)
+
+
+def compare_results(old, new, metrics=('p50_ms', 'p95_ms', 'p99_ms', 'queries')):
+    """
+    Filas (modo, ruta, metrica, antes, despues, cambio en %) entre dos resultados de bench_catalog
+    """
+    rows = []
+    for mode in ('client', 'load'):
+        old_routes, new_routes = old.get(mode) or {}, new.get(mode) or {}
+        for name in sorted(set(old_routes) & set(new_routes)):
+            for metric in metrics:
+                before, after = old_routes[name].get(metric), new_routes[name].get(metric)
+                if before is None or after is None:
+                    continue
+                change = (after - before) / before * 100 if before else None
+                rows.append((mode, name, metric, before, after, change))
+    return rows
+
+
+# Rutas servidas por catalog/async_views.py con CATALOG_ASYNC_VIEWS
+ASYNC_ROUTES = ('index', 'books', 'book-detail', 'authors', 'author-detail', 'my-borrowed', 'loanedbooks')
+
+
+@contextmanager
+def use_async_views(enabled=True):
+    """
+    Recarga las URLs con CATALOG_ASYNC_VIEWS activado (o no) y las restaura al salir
+    """
+    from . import urls
+
+    def reload(value):
+        with override_settings(CATALOG_ASYNC_VIEWS=value):
+            importlib.reload(urls)
+            importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    previous = getattr(settings, 'CATALOG_ASYNC_VIEWS', False)
+    reload(enabled)
+    try:
+        yield
+    finally:
+        reload(previous)
+
+
+def bench_sync_throughput(routes, user, concurrency=32, duration=10.0):
+    """
+    concurrency hilos, cada uno con su Client (manejador WSGI), pidiendo las rutas en turno
+    """
+    names = list(routes)
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        client = Client()
+        client.force_login(user)
+        local, local_errors = [], 0
+        try:
+            for name in itertools.islice(itertools.cycle(names), offset, None):
+                if time.perf_counter() >= deadline:
+                    break
+                start = time.perf_counter()
+                local_errors += client.get(routes[name]).status_code >= 400
+                local.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+            with lock:
+                samples.extend(local)
+                errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(num,)) for num in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return dict(summarize(samples, errors=sum(errors)), requests_per_second=len(samples) / elapsed, concurrency=concurrency)
+
+
+def bench_async_throughput(routes, user, concurrency=32, duration=10.0):
+    """
+    concurrency tareas en un bucle de eventos, cada una con su AsyncClient (manejador ASGI)
+    """
+    names = list(routes)
+
+    async def worker(offset, deadline, samples):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        errors = 0
+        for name in itertools.islice(itertools.cycle(names), offset, None):
+            if time.perf_counter() >= deadline:
+                break
+            start = time.perf_counter()
+            errors += (await client.get(routes[name])).status_code >= 400
+            samples.append((time.perf_counter() - start) * 1000)
+        return errors
+
+    async def run():
+        samples = []
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        errors = await asyncio.gather(*(worker(num, deadline, samples) for num in range(concurrency)))
+        return samples, sum(errors), time.perf_counter() - start
+
+    samples, errors, elapsed = asyncio.run(run())
+    return dict(summarize(samples, errors=errors), requests_per_second=len(samples) / elapsed, concurrency=concurrency)
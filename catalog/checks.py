@@ -0,0 +1,33 @@
+"""
+Comprobaciones de la configuracion (manage.py check).
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends de cache que no comparten los datos entre procesos
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Contadores, versiones de fragmentos y de datos de referencia se mantienen
+    desde las señales del proceso que escribe: con varios workers la cache tiene
+    que ser compartida
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if not getattr(settings, 'CATALOG_SHARED_CACHE_REQUIRED', False) or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        'La cache por defecto (%s) no se comparte entre procesos: los contadores y '
+        'las versiones de la cache de fragmentos de cada worker no verian los cambios '
+        'hechos en los demas.' % backend,
+        hint=(
+            'Usa una cache compartida (DJANGO_CACHE_BACKEND: FileBasedCache, RedisCache, '
+            'memcached...). Si solo hay un proceso, CATALOG_SHARED_CACHE_REQUIRED=0.'
+        ),
+        id='catalog.E001',
+    )]
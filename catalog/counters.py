@@ -0,0 +1,118 @@
+"""
+Contadores de la pagina de inicio guardados en cache.
+
+Los valores se calculan una vez con COUNT (recount) y despues se mantienen
+de forma incremental desde las señales de catalog/signals.py. Si falta alguna
+clave en la cache (expirada, borrada o invalidada) se vuelve a contar todo.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+KEY_PREFIX = 'catalog:counters:'
+
+COUNTERS = (
+    'num_books',
+    'num_instances',
+    'num_instances_available',
+    'num_authors',
+    'num_generos',
+    'num_libros_con_y',
+)
+
+
+def _key(name):
+    return KEY_PREFIX + name
+
+
+def _timeout():
+    # Expiracion de seguridad: aunque se pierda algun incremento se reconcilia solo
+    return getattr(settings, 'CATALOG_COUNTERS_TIMEOUT', 60 * 60)
+
+
+def title_has_y(title):
+    """
+    Mismo criterio que el filtro title__icontains=' y ' usado al recontar
+    """
+    return ' y ' in (title or '').lower()
+
+
+def _count_querysets():
+    from .models import Author, Book, BookInstance, Genre
+
+    # Del primario: las señales ajustan lo que quede en cache a partir de aqui,
+    # asi que una cuenta atrasada de una replica no se corregiria hasta que expire
+    querysets = {
+        'num_books': Book.objects.all(),
+        'num_instances': BookInstance.objects.all(),
+        'num_instances_available': BookInstance.objects.filter(status__exact='a'),
+        'num_authors': Author.objects.all(),
+        'num_generos': Genre.objects.all(),
+        'num_libros_con_y': Book.objects.filter(title__icontains=' y '),
+    }
+    return {name: queryset.using(DEFAULT_DB_ALIAS) for name, queryset in querysets.items()}
+
+
+def recount():
+    """
+    Recalcula todos los contadores contra la base de datos y los guarda en cache
+    """
+    values = {name: queryset.count() for name, queryset in _count_querysets().items()}
+    cache.set_many({_key(name): value for name, value in values.items()}, _timeout())
+    return values
+
+
+async def arecount():
+    """
+    recount() para vistas asincronas
+    """
+    # acount() pasa por sync_to_async(thread_sensitive=True): todas las consultas
+    # van al mismo hilo una detras de otra, asi que asyncio.gather no las
+    # paralelizaria. Se hacen todas en un solo salto a ese hilo
+    return await sync_to_async(recount)()
+
+
+def get_counters():
+    """
+    Devuelve un diccionario con todos los contadores, sin consultas si estan en cache
+    """
+    cached = cache.get_many([_key(name) for name in COUNTERS])
+    if len(cached) != len(COUNTERS):
+        return recount()
+    return {name: cached[_key(name)] for name in COUNTERS}
+
+
+async def aget_counters():
+    cached = await cache.aget_many([_key(name) for name in COUNTERS])
+    if len(cached) != len(COUNTERS):
+        return await arecount()
+    return {name: cached[_key(name)] for name in COUNTERS}
+
+
+def _apply(deltas):
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            if delta > 0:
+                cache.incr(_key(name), delta)
+            else:
+                cache.decr(_key(name), -delta)
+        except ValueError:
+            # La clave no existe: el siguiente get_counters() hara el recuento
+            pass
+
+
+def adjust(**deltas):
+    """
+    Suma los deltas indicados (p. ej. num_books=1) cuando la transaccion se confirma
+    """
+    transaction.on_commit(lambda: _apply(deltas))
+
+
+def invalidate():
+    """
+    Borra los contadores para forzar un recuento en la siguiente lectura
+    """
+    transaction.on_commit(lambda: cache.delete_many([_key(name) for name in COUNTERS]))
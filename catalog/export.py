@@ -0,0 +1,178 @@
+"""
+Exportacion del catalogo completo (libros con autor, idioma, generos y copias).
+
+Todo son generadores: los libros se leen con .iterator(chunk_size=...) y sus
+relaciones se precargan por bloques, y cada formato produce el texto linea a
+linea. Sirve tanto para StreamingHttpResponse como para escribir a un fichero
+sin cargar el catalogo en memoria.
+
+Con since solo se exportan los libros modificados desde esa fecha (tambien sus
+generos, el nombre de un genero o idioma y el borrado de su autor, genero o
+idioma, ver catalog/signals.py), con el autor o alguna copia modificados, y de
+cada libro solo las copias modificadas. Detras van los libros y copias
+borrados desde esa fecha (catalog.models.Tombstone), con deleted.
+
+updated_at se fija antes del commit: una transaccion que confirma despues de
+empezar una exportacion puede llevar una fecha anterior. Por eso la marca para
+la siguiente exportacion (next_since) es el inicio de esta menos un margen, y el
+cliente debe aceptar recibir otra vez algunos registros.
+"""
+import csv
+import datetime
+import itertools
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import refdata
+from .models import Book, BookInstance, Tombstone
+from .utils import batched
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'ndjson': 'application/x-ndjson',
+}
+
+CSV_COLUMNS = (
+    'book_id', 'title', 'isbn', 'author', 'language', 'genres', 'book_updated_at',
+    'copy_id', 'imprint', 'status', 'due_back', 'copy_updated_at', 'deleted',
+)
+
+
+def next_since(started):
+    """
+    since para la siguiente exportacion incremental de una que empezo en started
+    """
+    # Margen para las transacciones que seguian abiertas al empezar
+    return started - datetime.timedelta(seconds=getattr(settings, 'CATALOG_EXPORT_SINCE_MARGIN', 300))
+
+
+def parse_since(value):
+    """
+    Fecha (AAAA-MM-DD) o fecha y hora ISO 8601; None si no se indica
+    """
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError('Fecha no valida: %r' % value)
+        since = datetime.datetime.combine(date, datetime.time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def books_queryset(since=None):
+    copies = BookInstance.objects.order_by('pk')
+    books = Book.objects.select_related('author').order_by('pk')
+    if since is not None:
+        copies = copies.filter(updated_at__gte=since)
+        books = books.filter(
+            Q(updated_at__gte=since)
+            | Q(author__updated_at__gte=since)
+            | Q(pk__in=BookInstance.objects.filter(updated_at__gte=since).values('book_id'))
+        )
+    # Generos e idiomas salen de catalog.refdata
+    return books.prefetch_related(Prefetch('bookinstance_set', queryset=copies))
+
+
+def iter_records(since=None, chunk_size=2000):
+    """
+    Un diccionario por libro con sus copias anidadas
+    """
+    books = books_queryset(since).iterator(chunk_size=chunk_size)
+    for book in itertools.chain.from_iterable(refdata.prefetch_genres(chunk) for chunk in batched(books, chunk_size)):
+        yield {
+            'id': book.pk,
+            'title': book.title,
+            'summary': book.summary,
+            'isbn': book.isbn,
+            'author': str(book.author) if book.author else None,
+            'language': refdata.language_name(book.language_id),
+            'genres': [genre.name for genre in book.genre.all()],
+            'updated_at': book.updated_at,
+            'copies': [
+                {
+                    'id': copy.pk,
+                    'imprint': copy.imprint,
+                    'status': copy.status,
+                    'due_back': copy.due_back,
+                    'updated_at': copy.updated_at,
+                }
+                for copy in book.bookinstance_set.all()
+            ],
+        }
+    if since is not None:
+        yield from iter_deletions(since, chunk_size)
+
+
+def iter_deletions(since, chunk_size=2000):
+    """
+    Un diccionario por libro o copia borrados desde since
+    """
+    for tombstone in Tombstone.objects.filter(deleted_at__gte=since).order_by('deleted_at', 'pk').iterator(chunk_size=chunk_size):
+        if tombstone.kind == Tombstone.BOOK:
+            yield {'id': tombstone.book_id, 'deleted': Tombstone.BOOK, 'deleted_at': tombstone.deleted_at}
+        else:
+            yield {
+                'id': tombstone.object_id,
+                'book_id': tombstone.book_id,
+                'deleted': Tombstone.COPY,
+                'deleted_at': tombstone.deleted_at,
+            }
+
+
+class Echo:
+    """
+    Objeto con write() que devuelve lo escrito, para usar csv.writer en un generador
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    """
+    Una fila por copia; los libros sin copias salen una vez con las columnas de copia vacias.
+    Un borrado es una fila con deleted, el id del libro o de la copia y la fecha
+    del borrado en su columna de updated_at.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records:
+        if record.get('deleted') == Tombstone.BOOK:
+            yield writer.writerow([record['id']] + [''] * 5 + [record['deleted_at'].isoformat()] + [''] * 5 + [Tombstone.BOOK])
+            continue
+        if record.get('deleted') == Tombstone.COPY:
+            yield writer.writerow(
+                [record['book_id'] or ''] + [''] * 6 + [record['id']] + [''] * 3 + [record['deleted_at'].isoformat(), Tombstone.COPY]
+            )
+            continue
+        book = [
+            record['id'], record['title'], record['isbn'], record['author'] or '', record['language'] or '',
+            '|'.join(record['genres']), record['updated_at'].isoformat(),
+        ]
+        if not record['copies']:
+            yield writer.writerow(book + [''] * 6)
+        for copy in record['copies']:
+            yield writer.writerow(book + [
+                copy['id'], copy['imprint'], copy['status'],
+                copy['due_back'].isoformat() if copy['due_back'] else '', copy['updated_at'].isoformat(), '',
+            ])
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def export_lines(format, since=None, chunk_size=2000):
+    records = iter_records(since=since, chunk_size=chunk_size)
+    return csv_lines(records) if format == 'csv' else jsonl_lines(records)
@@ -2,8 +2,27 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.forms import ModelForm
-from .models import BookInstance
+from django.forms.models import ModelChoiceIterator, ModelChoiceIteratorValue
+from django.contrib.auth.models import User
+from .models import Book, BookInstance
+from . import loans, refdata
+from .widgets import AutocompleteSelect
 import datetime
+import re
+import uuid
+
+
+def validate_renewal_date(data):
+    """
+    Fecha de devolucion entre hoy y dentro de 4 semanas (renovaciones y prestamos)
+    """
+    #Verificar que la fecha no haya pasado
+    if data < datetime.date.today():
+        raise ValidationError(_('Fecha no valida - Pasada fecha de renovación'))
+
+    #Verificar que la fecha no supera las 4 semanas
+    if data > datetime.date.today() + datetime.timedelta(weeks = 4):
+        raise ValidationError(_('Fecha no valida - La renovación no puede ser superior a 4 semanas'))
 
 
 class RenewBookForm(forms.Form):
@@ -11,16 +30,59 @@ class RenewBookForm(forms.Form):
 
     def clean_renewal_date(self):
         data = self.cleaned_data['renewal_date']
+        validate_renewal_date(data)
+        return data
+
+
+class BatchLoanForm(forms.Form):
+    """
+    Prestar, devolver o renovar varias copias a la vez (una por linea o separadas
+    por espacios o comas, p. ej. leidas con un lector de codigos)
+    """
+    MAX_COPIES = 200
+
+    action = forms.ChoiceField(choices=loans.ACTIONS)
+    copies = forms.CharField(widget=forms.Textarea(attrs={'rows': 8}), help_text='Ids de las copias')
+    borrower = forms.CharField(required=False, help_text='Nombre de usuario (solo para prestar)')
+    due_back = forms.DateField(required=False, help_text='Introduce una fecha entre hoy y dentro de 4 semanas (prestar y renovar)')
 
-        #Verificar que la fecha no haya pasado
-        if data < datetime.date.today():
-            raise ValidationError(_('Fecha no valida - Pasada fecha de renovación'))
-        
-        #Verificar que la fecha no supera las 4 semanas
-        if data > datetime.date.today() + datetime.timedelta(weeks = 4):
-            raise ValidationError(_('Fecha no valida - La renovación no puede ser superior a 4 semanas'))
-        
+    def clean_copies(self):
+        ids, invalid = [], []
+        for value in re.split(r'[\s,;]+', self.cleaned_data['copies'].strip()):
+            try:
+                ids.append(uuid.UUID(value))
+            except ValueError:
+                invalid.append(value)
+        if invalid:
+            raise ValidationError(_('Ids no validos: %(ids)s'), params={'ids': ', '.join(invalid)})
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > self.MAX_COPIES:
+            raise ValidationError(_('Como mucho %(max)s copias por operacion'), params={'max': self.MAX_COPIES})
+        return ids
+
+    def clean_borrower(self):
+        username = self.cleaned_data['borrower'].strip()
+        if not username:
+            return None
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise ValidationError(_('No existe el usuario %(username)s'), params={'username': username})
+
+    def clean_due_back(self):
+        data = self.cleaned_data['due_back']
+        if data is not None:
+            validate_renewal_date(data)
         return data
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action == loans.CHECK_OUT and not cleaned_data.get('borrower') and 'borrower' not in self.errors:
+            self.add_error('borrower', _('Indica a quien se prestan las copias'))
+        if action in (loans.CHECK_OUT, loans.RENEW) and not cleaned_data.get('due_back') and 'due_back' not in self.errors:
+            self.add_error('due_back', _('Indica la fecha de devolución'))
+        return cleaned_data
     
 # Lo mismo pero con ModelForm
 # class RenewBookModelForm(ModelForm):
@@ -42,4 +104,93 @@ class RenewBookForm(forms.Form):
 #         model = BookInstance
 #         fields = ['due_back',]
 #         labels = { 'due_back': _('Renewal date'), }
-#         help_texts = { 'due_back': _('Enter a date between now and 4 weeks (default 3).'), }
\ No newline at end of file
+#         help_texts = { 'due_back': _('Enter a date between now and 4 weeks (default 3).'), }
+
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    """
+    Opciones tomadas de catalog.refdata en lugar de recorrer el queryset
+    """
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.table.all():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.table.all()) + (self.field.empty_label is not None)
+
+
+class ReferenceChoiceMixin:
+    """
+    ModelChoiceField / ModelMultipleChoiceField sobre Genre o Language que
+    construyen las opciones y validan los ids con la cache de catalog.refdata
+    """
+    iterator = ReferenceChoiceIterator
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(queryset, **kwargs)
+        self.table = refdata.table_for(queryset.model)
+
+    def lookup(self, value):
+        if isinstance(value, ModelChoiceIteratorValue):
+            value = value.value
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            return self.table.get(self.queryset.model._meta.pk.to_python(value))
+        except ValidationError:
+            return None
+
+
+class ReferenceChoiceField(ReferenceChoiceMixin, forms.ModelChoiceField):
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        obj = self.lookup(value)
+        if obj is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+        return obj
+
+
+class ReferenceMultipleChoiceField(ReferenceChoiceMixin, forms.ModelMultipleChoiceField):
+
+    def _check_values(self, value):
+        try:
+            value = list(dict.fromkeys(value))
+        except TypeError:
+            raise ValidationError(self.error_messages['invalid_list'], code='invalid_list')
+        objects = []
+        for item in value:
+            obj = self.lookup(item)
+            if obj is None:
+                raise ValidationError(self.error_messages['invalid_pk_value'], code='invalid_pk_value', params={'pk': item})
+            objects.append(obj)
+        return objects
+
+
+class BookForm(ModelForm):
+    """
+    Formulario de libro (vistas y admin) con genero e idioma resueltos desde
+    memoria y autor con autocompletado
+    """
+
+    class Meta:
+        model = Book
+        fields = '__all__'
+        field_classes = {
+            'genre': ReferenceMultipleChoiceField,
+            'language': ReferenceChoiceField,
+        }
+        # Los autores pueden ser cientos de miles: sugerencias en lugar de un <select>
+        widgets = {
+            'author': AutocompleteSelect('author-autocomplete'),
+        }
+
+    def __init__(self, *args, **kwargs):
+        instance = kwargs.get('instance')
+        if instance is not None and instance.pk is not None:
+            # Los generos iniciales salen de la tabla intermedia, sin JOIN con Genre
+            refdata.prefetch_genres([instance])
+        super().__init__(*args, **kwargs)
@@ -0,0 +1,107 @@
+"""
+Cache de fragmentos HTML de las paginas de detalle.
+
+La clave de cada fragmento incluye las versiones de los datos que muestra
+(p. ej. book_detail depende del libro y de las versiones globales de generos e
+idiomas). Las señales de catalog/signals.py cambian la version al guardar o
+borrar, asi que un fragmento obsoleto nunca se vuelve a leer: simplemente deja
+de usarse y expira.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import routers
+
+KEY_PREFIX = 'catalog:fragment:'
+VERSION_PREFIX = 'catalog:fragment-version:'
+STATS_PREFIX = 'catalog:fragment-stats:'
+
+# Fragmento -> datos de los que depende. El primero es por objeto (usa su pk),
+# el resto son versiones globales de toda la tabla.
+FRAGMENTS = {
+    'book_detail': ('book', 'genre', 'language'),
+    'author_detail': ('author',),
+}
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_FRAGMENT_TIMEOUT', 60 * 60 * 24)
+
+
+def _version_key(kind, pk=None):
+    return f'{VERSION_PREFIX}{kind}' if pk is None else f'{VERSION_PREFIX}{kind}:{pk}'
+
+
+def _new_version():
+    # Valores unicos en lugar de un contador: si la version se pierde de la cache
+    # nunca se reutiliza una antigua con fragmentos obsoletos
+    return uuid.uuid4().hex[:12]
+
+
+def fragment_key(name, pk):
+    """
+    Clave del fragmento name del objeto pk con las versiones actuales
+    """
+    object_kind, *global_kinds = FRAGMENTS[name]
+    version_keys = [_version_key(object_kind, pk)] + [_version_key(kind) for kind in global_kinds]
+    versions = cache.get_many(version_keys)
+    missing = {key: _new_version() for key in version_keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return KEY_PREFIX + ':'.join([name, str(pk)] + [versions[key] for key in version_keys])
+
+
+def _record(name, outcome):
+    key = f'{STATS_PREFIX}{name}:{outcome}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def get(name, key):
+    """
+    HTML en cache o None; cuenta el acierto o fallo
+    """
+    html = cache.get(key)
+    _record(name, 'miss' if html is None else 'hit')
+    return html
+
+
+def store(key, html):
+    state = routers.current_state.get()
+    if state is not None and state.read_database() is not None:
+        # Renderizado con datos de una replica, quiza atrasada respecto a la
+        # version actual de la clave: se sirve, pero no se guarda. Las vistas con
+        # FragmentCacheMixin leen del primario cuando el fragmento falta
+        return
+    cache.set(key, html, _timeout())
+
+
+def bump(kind, *pks):
+    """
+    Invalida los fragmentos que dependen de kind (de los objetos pks, o de toda la
+    tabla si no se indican) cuando se confirme la transaccion
+    """
+    keys = [_version_key(kind, pk) for pk in pks if pk is not None] if pks else [_version_key(kind)]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: _new_version() for key in keys}, None))
+
+
+def stats():
+    """
+    {fragmento: {'hit': n, 'miss': n, 'ratio': aciertos/total}}
+    """
+    keys = [f'{STATS_PREFIX}{name}:{outcome}' for name in FRAGMENTS for outcome in ('hit', 'miss')]
+    values = cache.get_many(keys)
+    result = {}
+    for name in FRAGMENTS:
+        hit = values.get(f'{STATS_PREFIX}{name}:hit', 0)
+        miss = values.get(f'{STATS_PREFIX}{name}:miss', 0)
+        result[name] = {'hit': hit, 'miss': miss, 'ratio': hit / (hit + miss) if hit + miss else 0.0}
+    return result
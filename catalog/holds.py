@@ -0,0 +1,150 @@
+"""
+Cola de reservas (Hold) de cada libro.
+
+Las reservas en espera de un libro se atienden por prioridad y, a igual
+prioridad, por fecha de peticion. El indice parcial hold_queue_idx (book,
+priority, requested_at, id) WHERE status='w' guarda cada cola ya ordenada, asi
+que sacar la siguiente reserva es leer la primera entrada de un rango del
+indice: O(log n) sea cual sea el numero de reservas pendientes.
+
+Cuando una copia pasa a disponible (señal post_save de BookInstance, o
+devoluciones por lotes en catalog/loans.py) se asigna a la primera reserva en
+espera: la copia pasa a 'r' (Reserved) a nombre del usuario y la reserva a
+lista para recoger con una fecha limite. Todo en una transaccion corta.
+
+Las copias se guardan con save(), de modo que las señales mantienen los datos
+derivados (disponibilidad, contadores, cache de fragmentos) como siempre.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import BookInstance, Hold
+
+
+class HoldError(Exception):
+    pass
+
+
+def _pickup_days():
+    return getattr(settings, 'CATALOG_HOLD_PICKUP_DAYS', 3)
+
+
+def place(book, patron, priority=Hold.NORMAL):
+    """
+    Añade una reserva a la cola del libro; si hay copias disponibles se asigna ya
+    """
+    with transaction.atomic():
+        if Hold.objects.active().filter(book=book, patron=patron).exists():
+            raise HoldError('Ya hay una reserva activa de %s para %s' % (book, patron))
+        try:
+            with transaction.atomic():
+                hold = Hold.objects.create(book=book, patron=patron, priority=priority)
+        except IntegrityError:
+            # Otra peticion (p. ej. un doble clic) la ha creado despues de comprobarlo
+            raise HoldError('Ya hay una reserva activa de %s para %s' % (book, patron))
+        if allocate(book.pk):
+            hold.refresh_from_db()
+    return hold
+
+
+def allocate_copy(copy):
+    """
+    Da la copia (disponible) a la primera reserva en espera de su libro.
+    Devuelve la reserva atendida o None si la cola esta vacia.
+    """
+    if copy.status != 'a' or copy.book_id is None:
+        return None
+    with transaction.atomic():
+        hold = Hold.objects.queue(copy.book_id).select_for_update().first()
+        if hold is None:
+            return None
+        # La copia puede haber cambiado en otra transaccion desde que se leyo
+        if not BookInstance.objects.select_for_update().filter(pk=copy.pk, status='a').exists():
+            return None
+        hold.status = Hold.READY
+        hold.copy = copy
+        hold.pickup_by = timezone.now() + datetime.timedelta(days=_pickup_days())
+        hold.save(update_fields=['status', 'copy', 'pickup_by', 'updated_at'])
+
+        copy.status = 'r'
+        copy.borrower_id = hold.patron_id
+        # Si no se recoge antes, vuelve a circular
+        copy.due_back = timezone.localdate(hold.pickup_by)
+        copy.save(update_fields=['status', 'borrower', 'due_back', 'updated_at'])
+    return hold
+
+
+def allocate(*book_ids):
+    """
+    Asigna las copias disponibles de esos libros a sus colas; devuelve las reservas atendidas
+    """
+    waiting = Hold.objects.waiting().filter(book_id__in=book_ids).values('book_id').distinct()
+    allocated, exhausted = [], set()
+    for copy in BookInstance.objects.filter(book_id__in=waiting, status='a').order_by('book_id', 'pk'):
+        # Cuando la cola de un libro se vacia, el resto de sus copias se quedan disponibles
+        if copy.book_id in exhausted:
+            continue
+        hold = allocate_copy(copy)
+        if hold is None:
+            exhausted.add(copy.book_id)
+        else:
+            allocated.append(hold)
+    return allocated
+
+
+def _release(hold, status):
+    """
+    Cierra una reserva lista sin recoger y devuelve la copia a circulacion (la
+    señal de la copia la asigna a la siguiente reserva, si la hay)
+    """
+    copy = hold.copy
+    hold.status = status
+    hold.save(update_fields=['status', 'updated_at'])
+    if copy is not None and copy.status == 'r':
+        copy.status = 'a'
+        copy.borrower = None
+        copy.due_back = None
+        copy.save(update_fields=['status', 'borrower', 'due_back', 'updated_at'])
+
+
+def cancel(hold):
+    with transaction.atomic():
+        if hold.status == Hold.READY:
+            _release(hold, Hold.CANCELLED)
+        elif hold.status == Hold.WAITING:
+            hold.status = Hold.CANCELLED
+            hold.save(update_fields=['status', 'updated_at'])
+        else:
+            raise HoldError('La reserva ya esta cerrada')
+
+
+def fulfil(hold, due_back):
+    """
+    El usuario recoge la copia reservada: pasa a prestada hasta due_back
+    """
+    if hold.status != Hold.READY:
+        raise HoldError('La reserva no esta lista para recoger')
+    with transaction.atomic():
+        copy = hold.copy
+        copy.status = 'o'
+        copy.due_back = due_back
+        copy.save(update_fields=['status', 'due_back', 'updated_at'])
+        hold.status = Hold.FULFILLED
+        hold.save(update_fields=['status', 'updated_at'])
+
+
+def expire(now=None):
+    """
+    Caduca las reservas listas cuyo plazo de recogida ha pasado; devuelve cuantas
+    """
+    now = now or timezone.now()
+    expired = 0
+    for hold in Hold.objects.filter(status=Hold.READY, pickup_by__lt=now).select_related('copy').iterator():
+        # Una transaccion por reserva: cada una libera su copia y atiende la siguiente
+        with transaction.atomic():
+            _release(hold, Hold.EXPIRED)
+        expired += 1
+    return expired
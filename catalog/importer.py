@@ -0,0 +1,208 @@
+"""
+Importacion masiva del catalogo desde CSV o JSONL.
+
+Cada fila es un libro. Las columnas / claves reconocidas son:
+
+    title, summary, isbn, author_first_name, author_last_name, language,
+    genres   -- en CSV separados por '|', en JSONL tambien una lista
+    copies   -- numero de copias (por defecto 1); en JSONL tambien una lista de
+                objetos {imprint, status, due_back}
+    imprint, status, due_back -- valores de las copias cuando copies es un numero
+
+La entrada se procesa como una cadena de generadores (lectura -> normalizacion
+-> lotes) y cada lote se escribe con bulk_create en su propia transaccion, asi
+que la memoria no crece con el tamaño del fichero.
+"""
+import csv
+import datetime
+import json
+import time
+from collections import namedtuple
+
+from django.db import transaction
+
+from . import counters, fragments, refdata, search
+from .models import Author, Book, BookInstance, Genre, Language
+from .utils import batched
+
+BookRecord = namedtuple('BookRecord', 'line title summary isbn author language genres copies')
+CopyRecord = namedtuple('CopyRecord', 'imprint status due_back')
+
+STATUSES = {code for code, _ in BookInstance.LOAN_STATUS}
+
+
+class CatalogImportError(ValueError):
+    """
+    Fila que no se puede importar (lleva el numero de linea en el mensaje)
+    """
+
+
+def read_rows(stream, format):
+    """
+    Genera (dict, numero de linea) a partir de un fichero CSV o JSONL abierto
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield row, reader.line_num
+    else:
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise CatalogImportError('Linea %s: JSON no valido (%s)' % (number, e))
+                if not isinstance(row, dict):
+                    raise CatalogImportError('Linea %s: se esperaba un objeto JSON' % number)
+                yield row, number
+
+
+def _copies(row, line):
+    copies = row.get('copies', 1)
+    if isinstance(copies, list):
+        return tuple(_copy(copy, line) for copy in copies)
+    try:
+        count = int(copies or 0)
+    except (ValueError, TypeError):
+        raise CatalogImportError('Linea %s: copies debe ser un numero' % line)
+    return (_copy(row, line),) * count
+
+
+def _copy(values, line):
+    if not isinstance(values, dict):
+        raise CatalogImportError('Linea %s: cada copia debe ser un objeto' % line)
+    status = values.get('status') or 'a'
+    if status not in STATUSES:
+        raise CatalogImportError('Linea %s: status %r no valido' % (line, status))
+    due_back = values.get('due_back') or None
+    if due_back:
+        try:
+            due_back = datetime.date.fromisoformat(due_back)
+        except (ValueError, TypeError):
+            raise CatalogImportError('Linea %s: due_back debe ser AAAA-MM-DD' % line)
+    return CopyRecord(values.get('imprint') or '', status, due_back)
+
+
+def normalize(rows):
+    """
+    Convierte las filas en BookRecord validados
+    """
+    for row, line in rows:
+        try:
+            record = _record(row, line)
+        except (TypeError, AttributeError) as e:
+            # Valores de tipos inesperados en JSONL (p. ej. un numero como titulo)
+            raise CatalogImportError('Linea %s: valor no valido (%s)' % (line, e))
+        yield record
+
+
+def _record(row, line):
+    title = (row.get('title') or '').strip()
+    if not title:
+        raise CatalogImportError('Linea %s: falta el titulo' % line)
+    genres = row.get('genres') or ()
+    if isinstance(genres, str):
+        genres = genres.split('|')
+    author = ((row.get('author_first_name') or '').strip(), (row.get('author_last_name') or '').strip())
+    return BookRecord(
+        line=line,
+        title=title,
+        summary=row.get('summary') or '',
+        isbn=row.get('isbn') or '',
+        author=author if any(author) else None,
+        language=(row.get('language') or '').strip() or None,
+        genres=tuple(name.strip() for name in genres if name.strip()),
+        copies=_copies(row, line),
+    )
+
+
+class CatalogImporter:
+    """
+    Escribe lotes de BookRecord. Autores, generos e idiomas se resuelven con
+    tablas en memoria (clave natural -> id) y solo se crean los que faltan.
+    """
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.authors = {(first, last): pk for pk, first, last in Author.objects.values_list('pk', 'first_name', 'last_name').iterator()}
+        self.genres = dict(Genre.objects.values_list('name', 'pk'))
+        self.languages = dict(Language.objects.values_list('name', 'pk'))
+        self.books = 0
+        self.copies = 0
+        self.started = time.perf_counter()
+
+    def _resolve(self, lookup, keys, model, build):
+        """
+        Crea de una vez los objetos cuya clave aun no esta en lookup
+        """
+        missing = list(dict.fromkeys(key for key in keys if key is not None and key not in lookup))
+        if missing:
+            for obj, key in zip(model.objects.bulk_create([build(key) for key in missing]), missing):
+                lookup[key] = obj.pk
+
+    def run(self, records):
+        try:
+            for batch in batched(records, self.batch_size):
+                self.write_batch(batch)
+                if self.progress:
+                    self.progress(self.report())
+        finally:
+            # bulk_create no envia señales: se recalculan los datos derivados, tambien
+            # si una fila no valida corta la importacion tras confirmar otros lotes
+            counters.recount()
+            refdata.genres.invalidate()
+            refdata.languages.invalidate()
+        return self.report()
+
+    def write_batch(self, batch):
+        with transaction.atomic():
+            self._resolve(self.authors, (record.author for record in batch), Author, lambda key: Author(first_name=key[0], last_name=key[1]))
+            self._resolve(self.genres, (name for record in batch for name in record.genres), Genre, lambda name: Genre(name=name))
+            self._resolve(self.languages, (record.language for record in batch), Language, lambda name: Language(name=name))
+
+            books = Book.objects.bulk_create([
+                Book(
+                    title=record.title,
+                    summary=record.summary,
+                    isbn=record.isbn,
+                    author_id=self.authors.get(record.author),
+                    language_id=self.languages.get(record.language),
+                    # El resumen de disponibilidad sale de las propias filas, sin consultas
+                    copies_total=len(record.copies),
+                    copies_available=sum(copy.status == 'a' for copy in record.copies),
+                    next_due_back=min((copy.due_back for copy in record.copies if copy.status == 'o' and copy.due_back), default=None),
+                )
+                for record in batch
+            ])
+            Through = Book.genre.through
+            Through.objects.bulk_create(
+                [
+                    Through(book_id=book.pk, genre_id=self.genres[name])
+                    for book, record in zip(books, batch)
+                    for name in dict.fromkeys(record.genres)
+                ],
+                batch_size=self.batch_size,
+            )
+            instances = (
+                BookInstance(book_id=book.pk, imprint=copy.imprint, status=copy.status, due_back=copy.due_back)
+                for book, record in zip(books, batch)
+                for copy in record.copies
+            )
+            for chunk in batched(instances, self.batch_size):
+                BookInstance.objects.bulk_create(chunk)
+                self.copies += len(chunk)
+
+            search.index_books([book.pk for book in books])
+            fragments.bump('author', *{book.author_id for book in books})
+        self.books += len(batch)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'books': self.books,
+            'copies': self.copies,
+            'seconds': elapsed,
+            'books_per_second': self.books / elapsed if elapsed else 0.0,
+            'copies_per_second': self.copies / elapsed if elapsed else 0.0,
+        }
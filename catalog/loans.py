@@ -0,0 +1,95 @@
+"""
+Operaciones de prestamo por lotes: prestar, devolver y renovar muchas copias a
+la vez (mostrador de prestamos, ver la vista batch_loans).
+
+Cada operacion es una transaccion: se bloquean las filas de las copias, se
+comprueba su estado y se escriben todas con un solo UPDATE. Como update() no
+envia señales, los datos derivados (disponibilidad de Book, contadores de la
+pagina de inicio, fragmentos en cache) se actualizan aqui explicitamente, y las
+copias devueltas se asignan a la cola de reservas de su libro (catalog.holds).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import availability, counters, fragments, holds
+from .models import Book, BookInstance
+
+CHECK_OUT = 'checkout'
+RETURN = 'return'
+RENEW = 'renew'
+
+ACTIONS = (
+    (CHECK_OUT, 'Prestar'),
+    (RETURN, 'Devolver'),
+    (RENEW, 'Renovar'),
+)
+
+# Estado que deben tener las copias para cada operacion
+REQUIRED_STATUS = {
+    CHECK_OUT: 'a',
+    RETURN: 'o',
+    RENEW: 'o',
+}
+
+
+class LoanError(Exception):
+    """
+    La operacion no se ha aplicado; problems es una lista de (id de copia, motivo)
+    """
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__('; '.join('%s: %s' % problem for problem in problems))
+
+
+def _new_values(action, borrower, due_back):
+    if action == CHECK_OUT:
+        return {'status': 'o', 'borrower': borrower, 'due_back': due_back}
+    if action == RETURN:
+        return {'status': 'a', 'borrower': None, 'due_back': None}
+    return {'due_back': due_back}
+
+
+def apply(action, copy_ids, borrower=None, due_back=None):
+    """
+    Aplica action (CHECK_OUT, RETURN o RENEW) a todas las copias o a ninguna.
+    Devuelve el numero de copias modificadas o lanza LoanError.
+    """
+    copy_ids = list(dict.fromkeys(copy_ids))
+    required = REQUIRED_STATUS[action]
+    with transaction.atomic():
+        # En SQLite select_for_update() no hace nada, pero la transaccion es
+        # IMMEDIATE (settings.py) y ya tiene el bloqueo de escritura de la BD
+        rows = {
+            row['pk']: row
+            for row in BookInstance.objects.select_for_update()
+            .filter(pk__in=copy_ids)
+            .values('pk', 'status', 'book_id')
+        }
+        problems = [(pk, 'no existe') for pk in copy_ids if pk not in rows]
+        status_names = dict(BookInstance.LOAN_STATUS)
+        problems += [
+            (pk, 'esta en estado %s' % status_names.get(rows[pk]['status'], rows[pk]['status']))
+            for pk in copy_ids if pk in rows and rows[pk]['status'] != required
+        ]
+        if problems:
+            raise LoanError(problems)
+
+        values = _new_values(action, borrower, due_back)
+        # filter(status=...) repite la comprobacion en el UPDATE por si la base de datos no bloquea filas
+        updated = BookInstance.objects.filter(pk__in=copy_ids, status=required).update(updated_at=timezone.now(), **values)
+        if updated != len(copy_ids):
+            raise LoanError([(None, 'otra operacion ha modificado alguna de las copias')])
+
+        book_ids = {row['book_id'] for row in rows.values()} - {None}
+        availability.refresh(*book_ids)
+        if action == CHECK_OUT:
+            counters.adjust(num_instances_available=-updated)
+        elif action == RETURN:
+            counters.adjust(num_instances_available=updated)
+        if book_ids:
+            fragments.bump('book', *book_ids)
+            fragments.bump('author', *Book.objects.filter(pk__in=book_ids).values_list('author_id', flat=True))
+        if action == RETURN and book_ids:
+            holds.allocate(*book_ids)
+    return updated
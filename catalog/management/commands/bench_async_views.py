@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from catalog import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el rendimiento de las vistas de solo lectura sincronas (manejador WSGI, '
+        'un hilo por cliente) y asincronas (manejador ASGI, una tarea por cliente) con '
+        'muchos clientes concurrentes. Usa una base de datos temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=bench.DATASETS, default='10k')
+        parser.add_argument('--concurrency', type=int, default=64, help='Clientes concurrentes')
+        parser.add_argument('--duration', type=float, default=10.0, help='Segundos por modo')
+        parser.add_argument('--json', action='store_true', help='Escribe los resultados en JSON')
+
+    def handle(self, *args, **options):
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with tempfile.TemporaryDirectory() as tmp, override_settings(ALLOWED_HOSTS=hosts, CATALOG_SLOW_QUERY_MS=None):
+            with bench.benchmark_database(db_file=os.path.join(tmp, 'bench.sqlite3')):
+                self.stderr.write('Generando el dataset %s...' % options['dataset'])
+                bench.seed_catalog(**bench.DATASETS[options['dataset']])
+                user = bench.bench_user()
+                routes = {name: url for name, url in bench.catalog_routes().items() if name in bench.ASYNC_ROUTES}
+
+                results = {}
+                with bench.use_async_views(False):
+                    results['wsgi-sync'] = bench.bench_sync_throughput(routes, user, options['concurrency'], options['duration'])
+                with bench.use_async_views(True):
+                    results['asgi-async'] = bench.bench_async_throughput(routes, user, options['concurrency'], options['duration'])
+
+        if options['json']:
+            results['meta'] = bench.run_metadata(dataset=options['dataset'], routes=sorted(routes))
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+        self.stdout.write('%-12s %10s %9s %9s %9s %8s' % ('modo', 'peticiones/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errores'))
+        for mode, row in results.items():
+            self.stdout.write('%-12s %12.0f %9.1f %9.1f %9.1f %8s' % (
+                mode, row['requests_per_second'], row['p50_ms'], row['p95_ms'], row['p99_ms'], row['errors'],
+            ))
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from catalog import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark de todas las rutas del catalogo sobre datos generados: latencia '
+        '(p50/p95/p99) y consultas por peticion con el cliente de pruebas, y opcionalmente '
+        'carga concurrente contra un servidor WSGI. Escribe los resultados en JSON y '
+        'puede compararlos con los de otro commit. Usa una base de datos temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=bench.DATASETS, default='10k')
+        parser.add_argument('--iterations', type=int, default=50, help='Peticiones por ruta con el cliente de pruebas')
+        parser.add_argument('--routes', nargs='+', help='Nombres de ruta a medir (por defecto todas)')
+        parser.add_argument('--concurrency', type=int, default=0, help='Hilos del generador de carga (0 = no se lanza)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Segundos de carga concurrente')
+        parser.add_argument('--output', help='Fichero JSON de resultados (por defecto se escribe en la salida)')
+        parser.add_argument('--compare', help='JSON de una ejecucion anterior con el que comparar')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError('No se puede leer %s: %s' % (options['compare'], e))
+
+        sizes = bench.DATASETS[options['dataset']]
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']
+        # El servidor WSGI atiende cada peticion en un hilo con su propia conexion:
+        # hace falta un fichero, no una base de datos en memoria
+        with tempfile.TemporaryDirectory() as tmp, override_settings(ALLOWED_HOSTS=hosts, CATALOG_SLOW_QUERY_MS=None):
+            with bench.benchmark_database(db_file=os.path.join(tmp, 'bench.sqlite3')):
+                self.stderr.write('Generando el dataset %s...' % options['dataset'])
+                bench.seed_catalog(**sizes)
+                user = bench.bench_user()
+                routes = bench.catalog_routes()
+                if options['routes']:
+                    unknown = set(options['routes']) - set(routes)
+                    if unknown:
+                        raise CommandError('Rutas desconocidas: %s' % ', '.join(sorted(unknown)))
+                    routes = {name: routes[name] for name in options['routes']}
+
+                client = Client()
+                client.force_login(user)
+                self.stderr.write('Cliente de pruebas: %s rutas x %s peticiones...' % (len(routes), options['iterations']))
+                results = {'client': bench.bench_client(client, routes, options['iterations'])}
+
+                if options['concurrency']:
+                    self.stderr.write('Carga concurrente: %s hilos durante %ss...' % (options['concurrency'], options['duration']))
+                    cookie = '%s=%s' % (settings.SESSION_COOKIE_NAME, client.cookies[settings.SESSION_COOKIE_NAME].value)
+                    results['load'], results['load_totals'] = bench.bench_load(
+                        routes, options['concurrency'], options['duration'], cookie,
+                    )
+
+        results['meta'] = bench.run_metadata(
+            dataset=options['dataset'], sizes=sizes, iterations=options['iterations'],
+            peak_rss_mb=bench.peak_rss_mb(),
+        )
+        self.report(results)
+        if baseline is not None:
+            self.report_comparison(baseline, results)
+
+        payload = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload + '\n')
+            self.stderr.write(self.style.SUCCESS('Resultados en %s' % options['output']))
+        else:
+            self.stdout.write(payload)
+
+    def report(self, results):
+        for mode in ('client', 'load'):
+            if mode not in results:
+                continue
+            self.stderr.write(self.style.MIGRATE_HEADING(mode))
+            self.stderr.write('  %-22s %8s %8s %8s %8s %8s' % ('ruta', 'p50 ms', 'p95 ms', 'p99 ms', 'consultas', 'errores'))
+            for name, row in results[mode].items():
+                self.stderr.write('  %-22s %8.2f %8.2f %8.2f %8s %8s' % (
+                    name, row['p50_ms'], row['p95_ms'], row['p99_ms'], row.get('queries', '-'), row['errors'],
+                ))
+        if 'load_totals' in results:
+            self.stderr.write('  %.0f peticiones/s' % results['load_totals']['requests_per_second'])
+        self.stderr.write('  RSS maximo: %s MB' % results['meta']['peak_rss_mb'])
+
+    def report_comparison(self, baseline, results):
+        self.stderr.write(self.style.MIGRATE_HEADING(
+            'Comparacion con %s' % (baseline.get('meta', {}).get('commit') or 'la ejecucion anterior')
+        ))
+        for mode, name, metric, before, after, change in bench.compare_results(baseline, results):
+            line = '  %-6s %-22s %-8s %10.2f -> %10.2f' % (mode, name, metric, before, after)
+            if change is not None:
+                line += '  %+7.1f%%' % change
+            self.stderr.write(line)
@@ -0,0 +1,86 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from catalog import bench
+from catalog.models import Hold
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la cola de reservas con muchas reservas pendientes: devoluciones que '
+        'asignan la copia a la siguiente reserva, altas de reservas y la consulta que '
+        'saca la cabeza de la cola, con y sin su indice. Usa una base de datos temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--holds', type=int, default=100000, help='Reservas en espera a generar')
+        parser.add_argument('--instances', type=int, default=100000, help='Numero de copias a generar')
+        parser.add_argument('--books', type=int, default=20000, help='Numero de libros a generar')
+        parser.add_argument('--users', type=int, default=1000, help='Numero de usuarios a generar')
+        parser.add_argument('--returns', type=int, default=1000, help='Devoluciones a medir')
+        parser.add_argument('--places', type=int, default=200, help='Reservas nuevas a medir')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones de la consulta de la cola (se usa la mediana)')
+        parser.add_argument('--db-file', help='Fichero SQLite temporal (por defecto en memoria)')
+        parser.add_argument('--json', action='store_true', help='Escribe los resultados en JSON')
+
+    def handle(self, *args, **options):
+        with bench.benchmark_database(db_file=options['db_file']):
+            self.stderr.write('Generando %s copias y %s reservas...' % (options['instances'], options['holds']))
+            user_ids = bench.seed_loans(options['instances'], num_books=options['books'], num_users=options['users'])
+            bench.seed_holds(options['holds'], user_ids)
+
+            book_ids = list(Hold.objects.waiting().order_by('book_id').values_list('book_id', flat=True).distinct()[:100])
+            results = {
+                'queue-head': self.measure_queue(book_ids, options['repeat']),
+                'returns': bench.bench_hold_returns(options['returns']),
+                'places': bench.bench_hold_placement(options['places'], User.objects.create_user('bench-holds')),
+            }
+
+        for name in ('returns', 'places'):
+            # Operaciones seguidas en un solo proceso
+            mean_ms = results[name]['mean_ms']
+            results[name]['ops_per_second'] = 1000 / mean_ms if mean_ms else None
+
+        if options['json']:
+            results['meta'] = bench.run_metadata(holds=options['holds'], instances=options['instances'])
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True, default=str))
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Cabeza de la cola (%s libros)' % len(book_ids)))
+        for label in ('sin indice', 'con indice'):
+            row = results['queue-head'][label]
+            self.stdout.write('  %-12s %9.3f ms' % (label, row['ms']))
+            for line in row['plan'].splitlines():
+                self.stdout.write('      ' + line)
+        self.stdout.write('%-12s %8s %8s %9s %9s %9s %8s' % ('operacion', 'ops', 'ops/s', 'p50 ms', 'p95 ms', 'consultas', 'errores'))
+        for name in ('returns', 'places'):
+            row = results[name]
+            if not row['requests']:
+                continue
+            self.stdout.write('%-12s %8s %8.0f %9.2f %9.2f %9s %8s' % (
+                name, row['requests'], row['ops_per_second'], row['p50_ms'], row['p95_ms'], row['queries'], row['errors'],
+            ))
+
+    def measure_queue(self, book_ids, repeat):
+        """
+        Mediana del tiempo de leer la primera reserva de la cola de cada libro, y su plan
+        """
+        def pop_all():
+            for book_id in book_ids:
+                Hold.objects.queue(book_id).first()
+
+        def measure():
+            plan = Hold.objects.queue(book_ids[0])[:1].explain() if book_ids else ''
+            return {'ms': bench.time_call(pop_all, repeat) / max(len(book_ids), 1), 'plan': plan}
+
+        results = {'con indice': measure()}
+        index = next(index for index in Hold._meta.indexes if index.name == 'hold_queue_idx')
+        with connection.schema_editor() as editor:
+            editor.remove_index(Hold, index)
+        results['sin indice'] = measure()
+        with connection.schema_editor() as editor:
+            editor.add_index(Hold, index)
+        return results
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from catalog.bench import benchmark_database, seed_loans, time_call
+from catalog.models import BookInstance
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el plan de consulta y la latencia de las vistas de prestamos con y '
+        'sin los indices de BookInstance. Usa una base de datos temporal, no la real.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--instances', type=int, default=1000000, help='Numero de copias a generar')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por consulta (se usa la mediana)')
+        parser.add_argument('--db-file', help='Fichero SQLite temporal (por defecto en memoria)')
+
+    def handle(self, *args, **options):
+        with benchmark_database(db_file=options['db_file']):
+            self.stdout.write('Generando %s copias...' % options['instances'])
+            user_ids = seed_loans(options['instances'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            queries = self.loan_queries(user_ids[0])
+            with_indexes = self.measure(queries, options['repeat'])
+
+            indexes = BookInstance._meta.indexes
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(BookInstance, index)
+            without_indexes = self.measure(queries, options['repeat'])
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(BookInstance, index)
+
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (('sin indices', without_indexes), ('con indices', with_indexes)):
+                plan, ms = results[name]
+                self.stdout.write('  %-12s %9.2f ms' % (label, ms))
+                for line in plan.splitlines():
+                    self.stdout.write('      ' + line)
+
+    def loan_queries(self, user_id):
+        """
+        Las mismas consultas que hacen las vistas (lista paginada + COUNT del paginador)
+        """
+        by_user = BookInstance.objects.filter(borrower_id=user_id, status__exact='o').order_by('due_back')
+        on_loan = BookInstance.objects.filter(status__exact='o').order_by('due_back')
+        available = BookInstance.objects.filter(status__exact='a')
+        return {
+            'my-borrowed (pagina)': by_user[:10],
+            'my-borrowed (count)': by_user,
+            'loanedbooks (pagina)': on_loan[:10],
+            'loanedbooks (count)': on_loan,
+            'index (disponibles)': available,
+        }
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            if name.endswith('(pagina)'):
+                func = lambda qs=queryset: list(qs.all())
+                plan = queryset.explain()
+            else:
+                func = queryset.count
+                plan = queryset.order_by().values('pk').explain()
+            results[name] = (plan, time_call(func, repeat))
+        return results
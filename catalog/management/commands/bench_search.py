@@ -0,0 +1,71 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog import bench, search
+from catalog.models import Book
+
+# Latencia objetivo de una busqueda (contar y primera pagina)
+TARGET_MS = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el buscador (catalog.search) con muchos libros: construccion del indice, '
+        'latencia de busquedas con terminos de distinta frecuencia (contar y primera '
+        'pagina) y de reindexar un libro, con FTS5 y con el indice en memoria. Usa una '
+        'base de datos temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=500000, help='Numero de libros a generar')
+        parser.add_argument('--backends', nargs='+', choices=('fts5', 'memory'), default=['fts5', 'memory'])
+        parser.add_argument('--repeat', type=int, default=20, help='Repeticiones de cada consulta')
+        parser.add_argument('--updates', type=int, default=200, help='Libros a reindexar uno a uno')
+        parser.add_argument('--db-file', help='Fichero SQLite temporal (por defecto en memoria)')
+        parser.add_argument('--json', action='store_true', help='Escribe los resultados en JSON')
+
+    def handle(self, *args, **options):
+        results = {}
+        with bench.benchmark_database(db_file=options['db_file']):
+            self.stderr.write('Generando %s libros...' % options['books'])
+            vocabulary = bench.seed_search_books(options['books'])
+            queries = bench.search_queries(vocabulary)
+            book_ids = list(Book.objects.values_list('pk', flat=True))
+            updated = random.Random(0).sample(book_ids, min(options['updates'], len(book_ids)))
+
+            backends = {'fts5': search.FTS5Backend, 'memory': search.InMemoryBackend}
+            for name in options['backends']:
+                self.stderr.write('Indexando (%s)...' % name)
+                backend = backends[name]()
+                start = time.perf_counter()
+                backend.rebuild()
+                # El indice en memoria se construye en la primera busqueda
+                backend.count(['x'])
+                build_ms = (time.perf_counter() - start) * 1000
+                results[name] = {
+                    'build_ms': build_ms,
+                    'queries': bench.bench_search(backend, queries, options['repeat']),
+                    'updates': bench.bench_search_updates(backend, updated),
+                }
+
+        if options['json']:
+            results['meta'] = bench.run_metadata(books=options['books'])
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+
+        for name, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                '%s: indice construido en %.0f ms, reindexar un libro p50 %.2f ms' % (
+                    name, result['build_ms'], result['updates']['p50_ms'],
+                )
+            ))
+            self.stdout.write('  %-14s %-22s %10s %9s %9s' % ('consulta', 'texto', 'resultados', 'p50 ms', 'p95 ms'))
+            for label, row in result['queries'].items():
+                style = self.style.SUCCESS if row['p95_ms'] < TARGET_MS else self.style.WARNING
+                self.stdout.write(style('  %-14s %-22s %10s %9.2f %9.2f' % (
+                    label, row['query'], ('>%s' if row['truncated'] else '%s') % row['results'],
+                    row['p50_ms'], row['p95_ms'],
+                )))
@@ -0,0 +1,93 @@
+import datetime
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from catalog.bench import benchmark_database, seed_loans
+from catalog.models import BookInstance
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el rendimiento de SQLite con N hilos mezclando lecturas (lista de prestamos) '
+        'y renovaciones (como renew_book_librarian), con la configuracion por defecto de '
+        'Django y con la de settings.py (WAL, pragmas, IMMEDIATE). Usa ficheros temporales.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0, help='Segundos por configuracion')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Proporcion de escrituras')
+        parser.add_argument('--instances', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        profiles = {
+            'django por defecto': {},
+            'settings.py': dict(connection.settings_dict.get('OPTIONS', {})),
+        }
+        original = connection.settings_dict.get('OPTIONS', {})
+        try:
+            for label, db_options in profiles.items():
+                connection.settings_dict['OPTIONS'] = db_options
+                result = self.run_profile(options)
+                self.stdout.write(
+                    '%-20s %8.0f ops/s  lecturas=%-7d escrituras=%-7d errores "locked"=%d' % (
+                        label, result['ops'] / result['seconds'], result['reads'], result['writes'], result['errors'],
+                    )
+                )
+        finally:
+            connection.settings_dict['OPTIONS'] = original
+
+    def run_profile(self, options):
+        with tempfile.TemporaryDirectory() as tmp:
+            with benchmark_database(db_file=os.path.join(tmp, 'bench.sqlite3')):
+                seed_loans(options['instances'], num_books=options['instances'] // 10, num_users=100)
+                ids = list(BookInstance.objects.filter(status='o').values_list('pk', flat=True))
+                connection.close()
+
+                totals = {'reads': 0, 'writes': 0, 'errors': 0}
+                lock = threading.Lock()
+                deadline = time.perf_counter() + options['duration']
+
+                def worker(seed):
+                    rng = random.Random(seed)
+                    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+                    try:
+                        while time.perf_counter() < deadline:
+                            try:
+                                if rng.random() < options['write_ratio']:
+                                    self.renew(rng.choice(ids), rng)
+                                    counts['writes'] += 1
+                                else:
+                                    list(BookInstance.objects.filter(status__exact='o').select_related('book', 'borrower').order_by('due_back')[:10])
+                                    counts['reads'] += 1
+                            except OperationalError:
+                                counts['errors'] += 1
+                    finally:
+                        connections.close_all()
+                        with lock:
+                            for key, value in counts.items():
+                                totals[key] += value
+
+                threads = [threading.Thread(target=worker, args=(num,)) for num in range(options['threads'])]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                totals['seconds'] = time.perf_counter() - start
+                totals['ops'] = totals['reads'] + totals['writes']
+                return totals
+
+    def renew(self, pk, rng):
+        """
+        Lo mismo que hace renew_book_librarian con un formulario valido
+        """
+        book_inst = BookInstance.objects.select_related('book', 'borrower').get(pk=pk)
+        book_inst.due_back = datetime.date.today() + datetime.timedelta(days=rng.randint(1, 28))
+        book_inst.save()
@@ -0,0 +1,67 @@
+import json
+import os
+import statistics
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from catalog import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el arranque de un worker con y sin calentamiento (catalog/warmup.py): '
+        'tiempo de carga de locallibrary.wsgi, primera peticion a cada ruta y memoria '
+        'privada del worker tras un fork, como con gunicorn --preload. Usa una base '
+        'de datos temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=bench.DATASETS, default='1k')
+        parser.add_argument('--runs', type=int, default=3, help='Procesos arrancados por modo (se usa la mediana)')
+        parser.add_argument('--requests', type=int, default=20, help='Peticiones por ruta tras la primera')
+        parser.add_argument('--json', action='store_true', help='Escribe los resultados en JSON')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, 'bench.sqlite3')
+            with bench.benchmark_database(db_file=db_file):
+                self.stderr.write('Generando el dataset %s...' % options['dataset'])
+                bench.seed_catalog(**bench.DATASETS[options['dataset']])
+                user = bench.bench_user()
+                routes = bench.catalog_routes()
+
+                runs = {}
+                for mode, warmup in (('sin calentamiento', False), ('con calentamiento', True)):
+                    self.stderr.write('Arrancando %d procesos %s...' % (options['runs'], mode))
+                    runs[mode] = [
+                        bench.bench_startup(db_file, routes, user.username, warmup, options['requests'])
+                        for _ in range(options['runs'])
+                    ]
+
+        if options['json']:
+            results = dict(runs, meta=bench.run_metadata(dataset=options['dataset'], routes=sorted(routes)))
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+
+        def median(results, *keys):
+            values = []
+            for result in results:
+                for key in keys:
+                    result = result.get(key) if result else None
+                values.append(result)
+            return statistics.median(values) if None not in values else float('nan')
+
+        self.stdout.write('%-18s %10s %14s %9s %11s %13s %11s' % (
+            'modo', 'arranque ms', '1as peticiones', 'p50 ms', 'RSS maestro', 'privada worker', 'PSS worker',
+        ))
+        for mode, results in runs.items():
+            self.stdout.write('%-18s %10.0f %14.0f %9.2f %9.1f MB %11.1f MB %8.1f MB' % (
+                mode,
+                median(results, 'startup_ms'),
+                median(results, 'first_requests_total_ms'),
+                median(results, 'warm', 'p50_ms'),
+                median(results, 'master_memory', 'rss'),
+                median(results, 'worker_memory', 'private'),
+                median(results, 'worker_memory', 'pss'),
+            ))
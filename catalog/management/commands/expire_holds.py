@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from catalog import holds
+
+
+class Command(BaseCommand):
+    help = (
+        'Caduca las reservas listas cuyo plazo de recogida ha pasado y asigna sus '
+        'copias a la siguiente reserva de la cola. Pensado para ejecutarse desde cron.'
+    )
+
+    def handle(self, *args, **options):
+        expired = holds.expire()
+        self.stdout.write(self.style.SUCCESS(f'{expired} reservas caducadas'))
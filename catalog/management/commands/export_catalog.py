@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from catalog import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta el catalogo (libros, autores, idiomas, generos y copias) en CSV o JSONL/NDJSON. '
+        'Con --since solo lo modificado desde esa fecha.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='jsonl')
+        parser.add_argument('--since', help='Fecha o fecha y hora ISO 8601 de la ultima exportacion')
+        parser.add_argument('--output', '-o', default='-', help='Fichero de salida (por defecto stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Libros leidos por consulta')
+
+    def handle(self, *args, **options):
+        try:
+            since = export.parse_since(options['since'])
+        except ValueError as e:
+            raise CommandError(e)
+        started = timezone.now()
+        lines = export.export_lines(options['format'], since=since, chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+        else:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        # Inicio menos un margen: --since de la siguiente exportacion
+        self.stderr.write('Siguiente --since: %s' % export.next_since(started).isoformat())
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from catalog import fragments
+
+
+class Command(BaseCommand):
+    help = 'Muestra los aciertos y fallos de la cache de fragmentos de las paginas de detalle'
+
+    def handle(self, *args, **options):
+        for name, values in fragments.stats().items():
+            self.stdout.write('%-15s hits=%-8d misses=%-8d ratio=%.1f%%' % (name, values['hit'], values['miss'], values['ratio'] * 100))
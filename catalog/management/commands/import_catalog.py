@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importer import CatalogImporter, CatalogImportError, normalize, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa libros y copias desde un fichero CSV o JSONL (o - para la entrada estandar). '
+        'Ver catalog/importer.py para el formato de cada fila.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichero a importar, o - para leer de stdin')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Formato (por defecto segun la extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Libros por lote/transaccion')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        importer = CatalogImporter(batch_size=options['batch_size'], progress=self.progress)
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            report = importer.run(normalize(read_rows(stream, fmt)))
+        except CatalogImportError as e:
+            raise CommandError('%s (los lotes anteriores ya se han guardado: %s libros)' % (e, importer.books))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(
+            'Importados %(books)s libros y %(copies)s copias en %(seconds).1f s' % report
+        ))
+
+    def progress(self, report):
+        if self.verbosity >= 1:
+            self.stderr.write(
+                '%(books)10d libros %(copies)10d copias %(books_per_second)9.0f libros/s %(copies_per_second)9.0f copias/s' % report
+            )
@@ -0,0 +1,72 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from catalog import bench
+from catalog.templating import profiler
+
+
+class Command(BaseCommand):
+    help = (
+        'Reparte el tiempo de renderizado de plantillas entre cada plantilla '
+        '(base_generic.html, book_detail.html...) recorriendo todas las rutas del '
+        'catalogo con el cliente de pruebas. Usa una base de datos temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=bench.DATASETS, default='1k')
+        parser.add_argument('--iterations', type=int, default=20, help='Peticiones por ruta')
+        parser.add_argument('--route', action='append', dest='routes', help='Solo estas rutas (nombre de URL); se puede repetir')
+        parser.add_argument('--json', action='store_true', help='Escribe los resultados en JSON')
+
+    def handle(self, *args, **options):
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts, CATALOG_SLOW_QUERY_MS=None), bench.benchmark_database():
+            self.stderr.write('Generando el dataset %s...' % options['dataset'])
+            bench.seed_catalog(**bench.DATASETS[options['dataset']])
+            client = Client()
+            client.force_login(bench.bench_user())
+            routes = bench.catalog_routes()
+            if options['routes']:
+                routes = {name: url for name, url in routes.items() if name in options['routes']}
+
+            was_enabled = profiler.enabled
+            profiler.enable()
+            by_route = {}
+            try:
+                for name, url in routes.items():
+                    # Calentamiento: compila las plantillas y llena las caches
+                    client.get(url)
+                    profiler.reset()
+                    for _ in range(options['iterations']):
+                        client.get(url)
+                    by_route[name] = profiler.snapshot()
+            finally:
+                if not was_enabled:
+                    profiler.disable()
+
+        totals = {}
+        for rows in by_route.values():
+            for row in rows:
+                total = totals.setdefault(row['template'], {'template': row['template'], 'renders': 0, 'self_ms': 0.0, 'routes': 0})
+                total['renders'] += row['renders']
+                total['self_ms'] += row['self_ms']
+                total['routes'] += 1
+        grand_total = sum(row['self_ms'] for row in totals.values()) or 1.0
+        overall = sorted(totals.values(), key=lambda row: -row['self_ms'])
+        for row in overall:
+            row['share'] = row['self_ms'] / grand_total
+
+        if options['json']:
+            results = {'templates': overall, 'routes': by_route}
+            results['meta'] = bench.run_metadata(dataset=options['dataset'], iterations=options['iterations'])
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+
+        self.stdout.write('%-50s %6s %9s %9s %7s' % ('plantilla', 'rutas', 'renders', 'ms propios', '%'))
+        for row in overall:
+            self.stdout.write('%-50s %6s %9s %10.1f %6.1f%%' % (
+                row['template'], row['routes'], row['renders'], row['self_ms'], row['share'] * 100,
+            ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from catalog import availability
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde las copias el resumen de disponibilidad de cada libro '
+        '(copies_total, copies_available, next_due_back), por si se ha desviado '
+        'tras cambios que no pasan por las señales (update(), bulk_create, SQL a mano).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        updated = availability.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Disponibilidad recalculada para {updated} libros'))
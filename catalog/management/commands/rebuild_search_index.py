@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from catalog import search
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el indice del buscador de libros'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS('Indice de busqueda reconstruido (%s)' % type(backend).__name__))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from catalog import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde la base de datos los contadores de la pagina de inicio. '
+        'Pensado para ejecutarse periodicamente (cron) y corregir cualquier desviacion.'
+    )
+
+    def handle(self, *args, **options):
+        values = counters.recount()
+        for name in counters.COUNTERS:
+            self.stdout.write(f'{name}: {values[name]}')
+        self.stdout.write(self.style.SUCCESS('Contadores reconciliados'))
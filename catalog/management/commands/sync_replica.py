@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from catalog import routers
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia la base de datos SQLite del primario sobre las replicas de '
+        'CATALOG_READ_REPLICAS, para probar en local el enrutado de lecturas. '
+        'Con --interval repite la copia cada N segundos (retraso de replicacion simulado).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Segundos entre copias (0: una sola vez)')
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS].settings_dict
+        replicas = [connections[alias].settings_dict for alias in routers.replicas_available()]
+        if not replicas:
+            raise CommandError('No hay replicas configuradas (DJANGO_REPLICA_DB)')
+        for db in [source] + replicas:
+            if db['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError('sync_replica solo copia bases de datos SQLite')
+
+        while True:
+            start = time.perf_counter()
+            for replica in replicas:
+                routers.sync_sqlite(source['NAME'], replica['NAME'])
+            self.stdout.write('Replicas sincronizadas en %.0f ms' % ((time.perf_counter() - start) * 1000))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
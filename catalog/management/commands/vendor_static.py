@@ -0,0 +1,43 @@
+import base64
+import hashlib
+import os
+import urllib.request
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.assets import VENDOR_ASSETS
+
+
+def sri_hash(data):
+    return 'sha384-' + base64.b64encode(hashlib.sha384(data).digest()).decode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Descarga las librerias de terceros (catalog.assets.VENDOR_ASSETS) en '
+        'catalog/static/vendor/ para servirlas desde el propio sitio, comprobando '
+        'el hash publicado. Los ficheros descargados se suben al repositorio.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Descarga tambien los que ya existen')
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        static_dir = os.path.join(apps.get_app_config('catalog').path, 'static')
+        for path, (url, integrity) in VENDOR_ASSETS.items():
+            target = os.path.join(static_dir, *path.split('/'))
+            if os.path.exists(target) and not options['force']:
+                self.stdout.write('%s ya existe' % path)
+                continue
+            with urllib.request.urlopen(url, timeout=options['timeout']) as response:
+                data = response.read()
+            digest = sri_hash(data)
+            if integrity and digest != integrity:
+                raise CommandError('%s no coincide con el hash publicado (%s)' % (url, digest))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            # Sin hash publicado se muestra el calculado para fijarlo en VENDOR_ASSETS
+            self.stdout.write(self.style.SUCCESS('%s (%d bytes, %s)' % (path, len(data), digest)))
@@ -0,0 +1,163 @@
+"""
+Middleware del catalogo.
+"""
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+
+from . import performance, routers
+
+profile_logger = logging.getLogger('catalog.performance.profile')
+
+
+class PerformanceMiddleware:
+    """
+    Mide cada peticion: tiempo total, numero de consultas y tiempo de SQL (con
+    el execute_wrapper catalog.performance.time_query) y tiempo de plantillas (backend
+    catalog.templating.TimedDjangoTemplates). Los valores se envian en la
+    cabecera Server-Timing y se acumulan en los histogramas de
+    catalog.performance por nombre de URL.
+
+    Con CATALOG_PROFILE_EVERY = N, una de cada N peticiones se ejecuta bajo
+    cProfile; el resultado se guarda en CATALOG_PROFILE_DIR (.prof, para pstats
+    o snakeviz) o, si no esta definido, se escribe en el log.
+
+    Debe ir el primero de MIDDLEWARE para que el tiempo total incluya a los demas.
+    En las respuestas en streaming solo se mide hasta que empieza el envio.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.profile_every = getattr(settings, 'CATALOG_PROFILE_EVERY', 0)
+        self.profile_dir = getattr(settings, 'CATALOG_PROFILE_DIR', None)
+        self.counter = itertools.count(1)
+        # Con ASGI no obliga a ejecutar las vistas asincronas en un hilo
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        performance.install_query_timer()
+        with self.measure(request) as finish:
+            return finish(self.get_response(request))
+
+    async def __acall__(self, request):
+        # El hilo donde el ORM ejecuta las consultas de esta peticion
+        await sync_to_async(performance.install_query_timer)()
+        with self.measure(request) as finish:
+            return finish(await self.get_response(request))
+
+    @contextmanager
+    def measure(self, request):
+        """
+        Mide lo que se ejecute dentro; devuelve la funcion que completa la respuesta
+        """
+        stats = performance.RequestStats(request)
+        token = performance.current_stats.set(stats)
+        profiler = self.start_profiler()
+
+        def finish(response):
+            if profiler is not None:
+                profiler.disable()
+            total_ms = stats.total_ms
+            url_name = stats.url_name or 'unresolved'
+            response['Server-Timing'] = stats.server_timing(total_ms)
+            performance.registry.record(url_name, {
+                'total_ms': total_ms,
+                'db_ms': stats.db_ms,
+                'template_ms': stats.template_ms,
+                'queries': stats.queries,
+            })
+            if profiler is not None:
+                self.save_profile(profiler, url_name)
+            return response
+
+        try:
+            yield finish
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            performance.current_stats.reset(token)
+
+    def start_profiler(self):
+        if not self.profile_every or next(self.counter) % self.profile_every:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Ya hay otro perfilador activo (p. ej. en otro hilo)
+            return None
+        return profiler
+
+    def save_profile(self, profiler, url_name):
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            filename = '%s-%d.prof' % (url_name.replace(':', '_'), time.time_ns())
+            profiler.dump_stats(os.path.join(self.profile_dir, filename))
+        else:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(25)
+            profile_logger.info('Perfil de %s:\n%s', url_name, out.getvalue())
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Prepara el enrutado a replicas de cada peticion (ver catalog/routers.py):
+    marca si la vista lee de una replica y, si la peticion escribe, deja la
+    cookie que fija al primario las peticiones de los siguientes
+    CATALOG_REPLICA_PIN_SECONDS segundos.
+    """
+
+    sync_capable = True
+    async_capable = True
+    cookie_name = 'catalog_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'CATALOG_REPLICA_PIN_SECONDS', 10)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            return self.finish(state, self.get_response(request))
+        finally:
+            routers.current_state.reset(token)
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            return self.finish(state, await self.get_response(request))
+        finally:
+            routers.current_state.reset(token)
+
+    def start(self, request):
+        state = routers.RoutingState(pinned=self.cookie_name in request.COOKIES)
+        return state, routers.current_state.set(state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = routers.current_state.get()
+        if state is not None:
+            state.use_replica = routers.view_reads_from_replica(view_func)
+
+    def finish(self, state, response):
+        if state.wrote and routers.replicas_available():
+            response.set_cookie(self.cookie_name, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+FTS_TABLE = 'catalog_book_fts'
+
+
+def fts5_available(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any('FTS5' in row[0] for row in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Crea la tabla FTS5 del buscador y la llena con los libros existentes.
+    Sin FTS5 no hace nada y catalog.search usa el indice en memoria.
+    """
+    if not fts5_available(schema_editor):
+        return
+    Book = apps.get_model('catalog', 'Book')
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+        "title, summary, authors, genres, tokenize='unicode61 remove_diacritics 2')"
+    )
+    for book in Book.objects.select_related('author').prefetch_related('genre').iterator(chunk_size=2000):
+        author = f'{book.author.first_name} {book.author.last_name}' if book.author else ''
+        genres = ' '.join(genre.name for genre in book.genre.all())
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, summary, authors, genres) VALUES (%s, %s, %s, %s, %s)',
+            [book.pk, book.title, book.summary, author, genres],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_bookinstance_loan_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.15 on 2026-10-18 01:44
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_availability(apps, schema_editor):
+    """
+    Calcula el resumen de disponibilidad de los libros existentes
+    """
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+
+    def copies(aggregate):
+        return Subquery(
+            BookInstance.objects.filter(book=OuterRef('pk')).order_by().values('book').annotate(value=aggregate).values('value')
+        )
+
+    Book.objects.update(
+        copies_total=Coalesce(copies(Count('pk')), 0, output_field=IntegerField()),
+        copies_available=Coalesce(copies(Count('pk', filter=Q(status='a'))), 0, output_field=IntegerField()),
+        next_due_back=copies(Min('due_back', filter=Q(status='o'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='next_due_back',
+            field=models.DateField(editable=False, help_text='Primera devolucion prevista de las copias prestadas', null=True),
+        ),
+        migrations.RunPython(fill_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-18 02:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_author_name_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.PositiveSmallIntegerField(choices=[(0, 'Urgente'), (5, 'Normal')], default=5)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('w', 'En espera'), ('r', 'Lista para recoger'), ('f', 'Recogida'), ('c', 'Cancelada'), ('e', 'Caducada')], default='w', max_length=1)),
+                ('pickup_by', models.DateTimeField(blank=True, help_text='Fecha limite para recoger la copia', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='catalog.book')),
+                ('copy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='catalog.bookinstance')),
+                ('patron', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['requested_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'w')), fields=['book', 'priority', 'requested_at', 'id'], name='hold_queue_idx'), models.Index(condition=models.Q(('status', 'r')), fields=['pickup_by'], name='hold_ready_pickup_idx'), models.Index(fields=['patron', 'status'], name='hold_patron_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ('w', 'r'))), fields=('book', 'patron'), name='hold_one_active_per_patron'), models.UniqueConstraint(condition=models.Q(('status', 'r')), fields=('copy',), name='hold_one_ready_per_copy')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.15 on 2026-10-18 02:55
+
+import catalog.models
+from catalog.utils import fold
+from django.db import migrations, models
+
+
+def fill_name_keys(apps, schema_editor):
+    """
+    Calcula las claves de busqueda de los autores existentes
+    """
+    Author = apps.get_model('catalog', 'Author')
+    authors = list(Author.objects.only('first_name', 'last_name'))
+    for author in authors:
+        author.last_name_key = fold(author.last_name)
+        author.first_name_key = fold(author.first_name)
+    Author.objects.bulk_update(authors, ['last_name_key', 'first_name_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_hold'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='author',
+            name='author_last_name_lower_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='author',
+            name='author_first_name_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='first_name_key',
+            field=catalog.models.FoldedCharField(default='', max_length=100, source='first_name'),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='last_name_key',
+            field=catalog.models.FoldedCharField(default='', max_length=100, source='last_name'),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['last_name_key', 'first_name_key'], name='author_last_name_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['first_name_key'], name='author_first_name_key_idx'),
+        ),
+    ]
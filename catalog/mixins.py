@@ -0,0 +1,94 @@
+"""
+Mixins reutilizables por las vistas del catalogo.
+"""
+from django.core.paginator import InvalidPage
+from django.http import Http404
+
+from . import fragments, routers
+from .pagination import KeysetPaginator
+
+
+class RelationLoadingMixin:
+    """
+    Plan declarativo de carga de relaciones para las vistas genericas.
+
+    Cada vista declara que relaciones usa su plantilla, de modo que una pagina
+    cuesta un numero constante de consultas sea cual sea el numero de filas:
+
+        select_related   -- ForeignKey que se traen con JOIN en la misma consulta
+        prefetch_related -- relaciones inversas / M2M (una consulta por relacion)
+        annotations      -- agregados calculados en SQL (p. ej. Count)
+    """
+    select_related = ()
+    prefetch_related = ()
+    annotations = {}
+
+    def get_queryset(self):
+        return self.apply_loading_plan(super().get_queryset())
+
+    def apply_loading_plan(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset
+
+
+class KeysetPaginationMixin:
+    """
+    Paginacion por cursor para ListView (ver catalog.pagination).
+
+    keyset_ordering son los campos de ordenacion, terminando en uno unico.
+    Los enlaces antiguos con ?page=N siguen funcionando con el Paginator normal.
+    """
+    keyset_ordering = ('pk',)
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET or self.page_kwarg in self.kwargs:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, self.get_keyset_ordering())
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404('Cursor no valido: %s' % e)
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class FragmentCacheMixin:
+    """
+    Para DetailView cuya plantilla usa {% fragment_cache fragment_name object.pk %}.
+
+    Consulta la cache antes de cargar el objeto: si el fragmento ya esta, el objeto
+    se carga sin relaciones (el HTML ya las contiene). Si no esta, los datos se
+    leen del primario, porque el fragmento se guardara con las versiones actuales
+    y una replica puede ir por detras.
+    """
+    fragment_name = None
+    cached_fragment = None
+
+    def lookup_fragment(self):
+        self.fragment_key = fragments.fragment_key(self.fragment_name, self.kwargs[self.pk_url_kwarg])
+        self.cached_fragment = fragments.get(self.fragment_name, self.fragment_key)
+        if self.cached_fragment is None:
+            routers.use_primary()
+        return self.cached_fragment
+
+    def get_object(self, queryset=None):
+        if self.lookup_fragment() is not None and queryset is None:
+            queryset = self.model._default_manager.all()
+        return super().get_object(queryset)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'fragment_name': self.fragment_name,
+            'fragment_key': self.fragment_key,
+            'cached_fragment': self.cached_fragment,
+        })
+        return context
@@ -1,11 +1,65 @@
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse #generate URLs by reversing URL patterns
+from django.utils import timezone
+import datetime
 import uuid # Requerida para las instancias de libros unicos
 from django.contrib.auth.models import User
-from datetime import date
+from .utils import fold
 
 # Create your models here.
 
+class FoldedCharField(models.CharField):
+    """
+    Copia del campo source en minusculas y sin acentos (catalog.utils.fold) para
+    buscar e indexar. Se calcula al guardar, tambien con bulk_create; no con
+    update() ni con save(update_fields=...) si no se incluye
+    """
+
+    def __init__(self, source, *args, **kwargs):
+        self.source = source
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        kwargs.pop('editable', None)
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = fold(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+class LoadedValuesMixin:
+    """
+    Recuerda los valores leidos de la base de datos para poder detectar que
+    campos han cambiado al guardar (p. ej. el status de un BookInstance)
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_value(self, attname, default=None):
+        """
+        Valor del campo tal y como estaba en la BD, o default si no se conoce
+        """
+        value = getattr(self, '_loaded_values', {}).get(attname, models.DEFERRED)
+        return default if value is models.DEFERRED else value
+
+    def remember_loaded_values(self, *attnames):
+        """
+        Marca los valores actuales como los guardados en la BD
+        """
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for attname in attnames:
+            loaded[attname] = getattr(self, attname)
+
+
 class Genre(models.Model):
     """
     Modelo que representa un género literario (p. ej. ciencia ficción, poesía, etc.).
@@ -32,7 +86,7 @@ class Language(models.Model):
         return self.name
  
     
-class Book(models.Model):
+class Book(LoadedValuesMixin, models.Model):
     """
     Modelo que representa un libro(pero no uno especifico)
     """
@@ -53,6 +107,31 @@ class Book(models.Model):
 
     language = models.ForeignKey('Language', on_delete=models.SET_NULL, null=True)
 
+    # Fecha de la ultima modificacion, para exportaciones incrementales
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Resumen de las copias, mantenido por catalog.availability (no se edita a mano)
+    copies_total = models.PositiveIntegerField(default=0, editable=False)
+    copies_available = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    next_due_back = models.DateField(null=True, editable=False, help_text='Primera devolucion prevista de las copias prestadas')
+
+    AVAILABILITY_FIELDS = ('copies_total', 'copies_available', 'next_due_back')
+
+    def save(self, *args, **kwargs):
+        # Un Book leido antes de prestar o devolver una copia no debe pisar el resumen
+        # de disponibilidad al guardarse: solo lo escribe catalog.availability. Sin pk
+        # (copia con book.pk = None) es un INSERT normal; los campos diferidos de
+        # .only()/.defer() no se guardan, como hace Django.
+        if (not self._state.adding and self.pk is not None
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.AVAILABILITY_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
     def display_genre(self):
         """
         Crea una string para el genero, lo utilizamos para mostrarlo en Admin
@@ -73,7 +152,76 @@ class Book(models.Model):
         return reverse('book-detail', args=[str(self.id)])
     
 
-class BookInstance(models.Model):
+class DaysBetween(models.Func):
+    """
+    Dias enteros desde start hasta end (end - start), calculado en la base de datos
+    """
+    arg_joiner = ' - '
+    template = '(%(expressions)s)'
+    output_field = models.IntegerField()
+    arity = 2
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='CAST(julianday(%(expressions)s) AS INTEGER)', arg_joiner=') - julianday(', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='DATEDIFF', template='%(function)s(%(expressions)s)', arg_joiner=', ', **extra_context)
+
+
+class BookInstanceQuerySet(models.QuerySet):
+    """
+    Consultas de prestamos; el retraso se calcula en SQL para poder filtrar,
+    contar y ordenar sin cargar las copias
+    """
+
+    def on_loan(self):
+        return self.filter(status='o')
+
+    def overdue(self, today=None, min_days=1):
+        """
+        Copias prestadas cuya fecha de devolucion paso hace al menos min_days dias
+        (usa el indice parcial bookinst_on_loan_due_idx)
+        """
+        today = today or timezone.localdate()
+        return self.on_loan().filter(due_back__lte=today - datetime.timedelta(days=min_days))
+
+    def with_overdue(self, today=None):
+        """
+        Anota is_overdue y days_overdue (0 si no esta atrasada)
+        """
+        today = today or timezone.localdate()
+        overdue = models.Q(status='o', due_back__lt=today)
+        return self.annotate(
+            is_overdue=models.ExpressionWrapper(overdue, output_field=models.BooleanField()),
+            days_overdue=models.Case(
+                models.When(overdue, then=DaysBetween(models.Value(today, output_field=models.DateField()), 'due_back')),
+                default=0,
+                output_field=models.IntegerField(),
+            ),
+        )
+
+    def overdue_by_borrower(self, today=None, min_days=1):
+        """
+        Resumen por usuario con un solo GROUP BY: numero de copias atrasadas,
+        fecha mas antigua y maximo de dias de retraso
+        """
+        today = today or timezone.localdate()
+        return (
+            self.overdue(today, min_days)
+            .values('borrower', 'borrower__username', 'borrower__email')
+            .annotate(
+                loans=models.Count('pk'),
+                oldest_due_back=models.Min('due_back'),
+                max_days_overdue=DaysBetween(models.Value(today, output_field=models.DateField()), models.Min('due_back')),
+            )
+            .order_by('oldest_due_back', 'borrower')
+        )
+
+
+class BookInstance(LoadedValuesMixin, models.Model):
     """
     Modelo que representa una copia especifica de un libro (Que puede ser prestado por la biblioteca)
     """
@@ -97,15 +245,42 @@ class BookInstance(models.Model):
 
     borrower = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = BookInstanceQuerySet.as_manager()
+
     class Meta:
         ordering = ['due_back']
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            # Prestamos de todos los usuarios por fecha (LoanedBooksLibrarianView) y contador de disponibles
+            models.Index(fields=['status', 'due_back'], name='bookinst_status_due_idx'),
+            # Prestamos de un usuario por fecha (LoanedBooksByUserListView)
+            models.Index(fields=['borrower', 'status', 'due_back'], name='bookinst_borrower_status_idx'),
+            # Indice parcial solo con las copias prestadas, mucho mas pequeño
+            models.Index(fields=['due_back'], condition=models.Q(status='o'), name='bookinst_on_loan_due_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # La copia y el resumen de disponibilidad de su libro (señal post_save) se
+        # guardan en la misma transaccion
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     @property
     def is_overdue(self):
-        if self.due_back and date.today() > self.due_back:
-            return True
-        return False
+        """
+        Viene de la consulta si se uso with_overdue(); si no, se calcula aqui con
+        el mismo criterio (prestada y con la fecha de devolucion pasada)
+        """
+        if '_is_overdue' in self.__dict__:
+            return self._is_overdue
+        return bool(self.status == 'o' and self.due_back and timezone.localdate() > self.due_back)
+
+    @is_overdue.setter
+    def is_overdue(self, value):
+        # Asignado por la anotacion de with_overdue()
+        self._is_overdue = value
     
     def __str__(self):
         """
@@ -123,6 +298,10 @@ class Author(models.Model):
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField('died', null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Nombres sin mayusculas ni acentos para la busqueda por prefijo (catalog.autocomplete)
+    last_name_key = FoldedCharField('last_name', max_length=100, default='')
+    first_name_key = FoldedCharField('first_name', max_length=100, default='')
 
     def get_absolute_url(self):
         """
@@ -134,4 +313,109 @@ class Author(models.Model):
         return f'{self.last_name}, {self.first_name}'
        
     class Meta:
-        ordering = ['last_name']
\ No newline at end of file
+        ordering = ['last_name']
+        indexes = [
+            # Busqueda por prefijo sin distinguir mayusculas ni acentos (catalog.autocomplete)
+            models.Index(fields=['last_name_key', 'first_name_key'], name='author_last_name_key_idx'),
+            models.Index(fields=['first_name_key'], name='author_first_name_key_idx'),
+        ]
+
+class HoldQuerySet(models.QuerySet):
+
+    def waiting(self):
+        return self.filter(status=Hold.WAITING)
+
+    def active(self):
+        return self.filter(status__in=(Hold.WAITING, Hold.READY))
+
+    def queue(self, book_id):
+        """
+        Reservas en espera de un libro en el orden en que se atienden (indice hold_queue_idx)
+        """
+        return self.waiting().filter(book_id=book_id).order_by(*Hold.QUEUE_ORDER)
+
+
+class Hold(models.Model):
+    """
+    Reserva de un libro por un usuario. Las reservas en espera de cada libro
+    forman una cola por prioridad y fecha de peticion (ver catalog/holds.py)
+    """
+
+    URGENT = 0
+    NORMAL = 5
+    PRIORITIES = (
+        (URGENT, 'Urgente'),
+        (NORMAL, 'Normal'),
+    )
+
+    WAITING = 'w'
+    READY = 'r'
+    FULFILLED = 'f'
+    CANCELLED = 'c'
+    EXPIRED = 'e'
+    STATUS = (
+        (WAITING, 'En espera'),
+        (READY, 'Lista para recoger'),
+        (FULFILLED, 'Recogida'),
+        (CANCELLED, 'Cancelada'),
+        (EXPIRED, 'Caducada'),
+    )
+
+    # Orden de la cola: menor prioridad primero y, a igual prioridad, la mas antigua
+    QUEUE_ORDER = ('priority', 'requested_at', 'id')
+
+    book = models.ForeignKey('Book', on_delete=models.CASCADE)
+    patron = models.ForeignKey(User, on_delete=models.CASCADE)
+    priority = models.PositiveSmallIntegerField(choices=PRIORITIES, default=NORMAL)
+    requested_at = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=1, choices=STATUS, default=WAITING)
+    copy = models.ForeignKey(BookInstance, on_delete=models.SET_NULL, null=True, blank=True)
+    pickup_by = models.DateTimeField(null=True, blank=True, help_text='Fecha limite para recoger la copia')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = HoldQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['requested_at']
+        indexes = [
+            # La cola de cada libro: la siguiente reserva es la primera entrada del rango (O(log n))
+            models.Index(fields=['book', 'priority', 'requested_at', 'id'], condition=models.Q(status='w'), name='hold_queue_idx'),
+            # Reservas listas cuyo plazo de recogida ha vencido (expire_holds)
+            models.Index(fields=['pickup_by'], condition=models.Q(status='r'), name='hold_ready_pickup_idx'),
+            models.Index(fields=['patron', 'status'], name='hold_patron_status_idx'),
+        ]
+        constraints = [
+            # Una sola reserva activa por usuario y libro, y cada copia para una sola reserva
+            models.UniqueConstraint(fields=['book', 'patron'], condition=models.Q(status__in=('w', 'r')), name='hold_one_active_per_patron'),
+            models.UniqueConstraint(fields=['copy'], condition=models.Q(status='r'), name='hold_one_ready_per_copy'),
+        ]
+
+    def __str__(self):
+        return f'{self.book} - {self.patron} ({self.get_status_display()})'
+
+
+class Tombstone(models.Model):
+    """
+    Libro o copia borrados, para que las exportaciones incrementales
+    (catalog.export) informen de los borrados
+    """
+
+    BOOK = 'book'
+    COPY = 'copy'
+    KINDS = (
+        (BOOK, 'Libro'),
+        (COPY, 'Copia'),
+    )
+
+    kind = models.CharField(max_length=4, choices=KINDS)
+    # pk del objeto borrado (el de una copia es un UUID)
+    object_id = models.CharField(max_length=36)
+    # Libro del objeto borrado (el propio libro, o el de la copia)
+    book_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id} ({self.deleted_at})'
@@ -0,0 +1,195 @@
+"""
+Paginacion por cursor (keyset) para las listas del catalogo.
+
+En lugar de OFFSET n y un COUNT(*) por pagina, cada pagina se pide con un
+cursor opaco que contiene los valores de ordenacion de la ultima (o primera)
+fila mostrada. La consulta queda como WHERE (campos) > (valores) ORDER BY campos
+LIMIT n, que con un indice adecuado cuesta lo mismo en la pagina 1 que en la 10.000.
+"""
+import base64
+import binascii
+import json
+
+from django.core.paginator import InvalidPage, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPaginator:
+    """
+    Pagina un queryset por los campos de ordering (el ultimo debe ser unico, p. ej. 'pk').
+    Un '-' delante del nombre ordena de forma descendente. Los NULL van primero en
+    orden ascendente y al final en descendente.
+    """
+
+    def __init__(self, object_list, per_page, ordering):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.model = object_list.model
+        self.ordering = []
+        for name in ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            field = self.model._meta.pk if name == 'pk' else self.model._meta.get_field(name)
+            self.ordering.append((field, descending))
+
+    def _order_by(self, reverse=False):
+        order_by = []
+        for field, descending in self.ordering:
+            descending = descending != reverse
+            expression = F(field.name)
+            if not field.null:
+                order_by.append(expression.desc() if descending else expression.asc())
+            elif descending:
+                order_by.append(expression.desc(nulls_last=True))
+            else:
+                order_by.append(expression.asc(nulls_first=True))
+        return order_by
+
+    def _beyond(self, field, descending, value):
+        """
+        Filas que van estrictamente despues de value en el orden (field, descending)
+        """
+        name = field.name
+        if not descending:
+            return Q(**{f'{name}__isnull': False}) if value is None else Q(**{f'{name}__gt': value})
+        if value is None:
+            return Q(pk__in=[])
+        condition = Q(**{f'{name}__lt': value})
+        if field.null:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def _seek(self, values, reverse=False):
+        """
+        WHERE del keyset: (a > va) OR (a = va AND b > vb) OR ...
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            condition |= equal & self._beyond(field, descending != reverse, value)
+            equal &= Q(**{f'{field.name}__isnull': True}) if value is None else Q(**{field.name: value})
+        return condition
+
+    def _values(self, row):
+        if isinstance(row, dict):
+            return [row[field.attname] if field.attname in row else row[field.name] for field, _ in self.ordering]
+        return [getattr(row, field.attname) for field, _ in self.ordering]
+
+    def encode_cursor(self, direction, row):
+        payload = json.dumps([direction, self._values(row)], cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('n', 'p') or len(values) != len(self.ordering):
+                raise ValueError
+            values = [None if value is None else field.to_python(value) for (field, _), value in zip(self.ordering, values)]
+        except (ValueError, TypeError, binascii.Error) as exc:
+            raise InvalidCursor('Cursor no valido') from exc
+        return direction, values
+
+    def _page_query(self, cursor):
+        """
+        Consulta de la pagina (con una fila de mas para saber si hay otra) y datos del cursor
+        """
+        queryset = self.object_list
+        direction, values = self.decode_cursor(cursor) if cursor else ('n', None)
+        reverse = direction == 'p'
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse=reverse))
+        return queryset.order_by(*self._order_by(reverse=reverse))[:self.per_page + 1], values, reverse
+
+    def _make_page(self, rows, values, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            return KeysetPage(rows, self, has_next=True, has_previous=has_more)
+        return KeysetPage(rows, self, has_next=has_more, has_previous=values is not None)
+
+    def page(self, cursor=None):
+        queryset, values, reverse = self._page_query(cursor)
+        return self._make_page(list(queryset), values, reverse)
+
+    async def apage(self, cursor=None):
+        """
+        page() para vistas asincronas (iteracion asincrona del ORM)
+        """
+        queryset, values, reverse = self._page_query(cursor)
+        return self._make_page([row async for row in queryset], values, reverse)
+
+
+class KeysetPage:
+    """
+    Pagina con la misma interfaz basica que django.core.paginator.Page, sin numero de pagina
+    """
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        return self.paginator.encode_cursor('n', self.object_list[-1]) if self._has_next else None
+
+    @property
+    def previous_cursor(self):
+        return self.paginator.encode_cursor('p', self.object_list[0]) if self._has_previous else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator para los listados del admin. Sin filtros, en SQLite el total se
+    estima con MAX(rowid), que es una sola busqueda en el arbol de la tabla, en
+    lugar de un COUNT(*) que la recorre entera. Puede quedarse por encima si se
+    han borrado filas; por debajo de exact_below (y en otras bases de datos) se
+    cuenta de verdad.
+    """
+    exact_below = 10000
+
+    def estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'sqlite':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT MAX(_rowid_) FROM %s' % connection.ops.quote_name(queryset.model._meta.db_table))
+            return cursor.fetchone()[0] or 0
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = self.estimate(queryset)
+            if estimate is not None and estimate >= self.exact_below:
+                return estimate
+        return super().count
@@ -0,0 +1,213 @@
+"""
+Instrumentacion de rendimiento por peticion.
+
+PerformanceMiddleware (catalog/middleware.py) crea un RequestStats por peticion
+y lo deja en current_stats; el wrapper de SQL y el backend de plantillas
+(catalog/templating.py) suman ahi sus tiempos. Al terminar la peticion los
+valores se añaden a histogramas en memoria por nombre de URL, que se pueden
+consultar con snapshot() (vista performance_stats).
+
+Los histogramas son por proceso: con varios workers cada uno tiene los suyos.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connections
+
+slow_query_logger = logging.getLogger('catalog.performance.slow_queries')
+
+current_stats = contextvars.ContextVar('catalog_request_stats', default=None)
+
+# Limites superiores (ms) de los cubos de los histogramas de tiempo
+TIME_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+# Limites superiores de los cubos del numero de consultas
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+METRICS = {
+    'total_ms': TIME_BUCKETS,
+    'db_ms': TIME_BUCKETS,
+    'template_ms': TIME_BUCKETS,
+    'queries': QUERY_BUCKETS,
+}
+
+
+def slow_query_ms():
+    return getattr(settings, 'CATALOG_SLOW_QUERY_MS', 100)
+
+
+class RequestStats:
+    """
+    Tiempos y consultas de una peticion
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.templates = []
+        self.template_depth = 0
+
+    @property
+    def url_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else None
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms):
+        """
+        Valor de la cabecera Server-Timing
+        """
+        return ', '.join((
+            'total;dur=%.1f' % total_ms,
+            'db;dur=%.1f;desc="%d consultas"' % (self.db_ms, self.queries),
+            'tpl;dur=%.1f;desc="%s"' % (self.template_ms, ' '.join(self.templates)),
+        ))
+
+
+def project_stack(limit=8):
+    """
+    Ultimas frames del codigo del proyecto (sin Django ni site-packages) para saber
+    que linea ha lanzado una consulta
+    """
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(root) and 'site-packages' not in frame.filename
+        and not frame.filename.endswith(os.path.join('catalog', 'performance.py'))
+    ]
+    return ''.join(traceback.format_list(frames[-limit:]))
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Wrapper de ejecucion de SQL (connection.execute_wrapper) que suma cada
+    consulta al RequestStats de la peticion en curso, si la hay, y registra las
+    que superan CATALOG_SLOW_QUERY_MS con la pila que las lanzo
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        stats.queries += 1
+        stats.db_ms += elapsed
+        slow_ms = slow_query_ms()
+        if slow_ms is not None and elapsed >= slow_ms:
+            slow_query_logger.warning(
+                'Consulta lenta (%.1f ms, %s, vista %s): %s\n%s',
+                elapsed, context['connection'].alias, stats.url_name, sql, project_stack(),
+            )
+
+
+def install_query_timer():
+    """
+    Instala time_query en las conexiones del hilo actual (una sola vez por conexion).
+
+    Las conexiones son por hilo: en las vistas asincronas el ORM se ejecuta en
+    otro hilo, asi que no basta con un execute_wrapper() en el de la peticion.
+    """
+    for alias in connections:
+        wrappers = connections[alias].execute_wrappers
+        if time_query not in wrappers:
+            wrappers.append(time_query)
+
+
+class Histogram:
+    """
+    Histograma de cubos fijos con total, suma y maximo
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        """
+        Limite superior del cubo donde cae el percentil (aproximado)
+        """
+        if not self.count:
+            return None
+        target = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': {
+                ('<=%s' % bound if bound is not None else 'inf'): count
+                for bound, count in zip(list(self.buckets) + [None], self.counts)
+            },
+        }
+
+
+class Registry:
+    """
+    Histogramas por nombre de URL y metrica
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def record(self, url_name, values):
+        with self.lock:
+            histograms = self.histograms.get(url_name)
+            if histograms is None:
+                histograms = self.histograms[url_name] = {name: Histogram(buckets) for name, buckets in METRICS.items()}
+            for name, value in values.items():
+                histograms[name].add(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                url_name: {name: histogram.as_dict() for name, histogram in histograms.items()}
+                for url_name, histograms in sorted(self.histograms.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+
+registry = Registry()
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+def reset():
+    registry.reset()
@@ -0,0 +1,184 @@
+"""
+Cache en memoria del proceso para los datos de referencia (Genre y Language).
+
+Son tablas pequeñas que casi nunca cambian, pero se consultaban en cada ficha
+de libro, en cada formulario de libro (los ModelChoiceField recorren la tabla
+entera) y en cada serializacion. Aqui se cargan una vez por proceso y se
+resuelven los ids desde memoria.
+
+Invalidacion:
+    - en este proceso, las señales (catalog/signals.py) llaman a invalidate()
+    - entre procesos, cada tabla tiene una version en la cache de Django que
+      invalidate() cambia al confirmar la transaccion; cada proceso la compara
+      con la suya como mucho cada CATALOG_REFDATA_CHECK_INTERVAL segundos
+
+Ademas, ninguna copia vive mas de CATALOG_REFDATA_TIMEOUT segundos (cubre, por
+ejemplo, una copia cargada dentro de una transaccion que luego se deshizo).
+
+Si una tabla supera CATALOG_REFDATA_MAX_ROWS filas no se guarda en memoria y
+las consultas van a la base de datos como siempre.
+"""
+import threading
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+VERSION_PREFIX = 'catalog:refdata-version:'
+
+
+class ReferenceTable:
+    """
+    Copia en memoria de una tabla de referencia: {pk: instancia} en el orden del modelo
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.lock = threading.Lock()
+        self.rows = None
+        self.version = None
+        self.checked_at = 0.0
+        self.loaded_at = 0.0
+
+    @property
+    def model(self):
+        return apps.get_model('catalog', self.model_name)
+
+    @property
+    def version_key(self):
+        return VERSION_PREFIX + self.model_name.lower()
+
+    def _current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = uuid.uuid4().hex[:12]
+            # Si otro proceso la crea a la vez gana la suya
+            if not cache.add(self.version_key, version, None):
+                version = cache.get(self.version_key, version)
+        return version
+
+    def _load(self):
+        """
+        {pk: instancia}, o None si la tabla es demasiado grande para tenerla en memoria
+        """
+        max_rows = getattr(settings, 'CATALOG_REFDATA_MAX_ROWS', 1000)
+        # Siempre del primario: la copia queda asociada a la version actual
+        objects = list(self.model._default_manager.using(DEFAULT_DB_ALIAS)[:max_rows + 1])
+        if len(objects) > max_rows:
+            return None
+        return {obj.pk: obj for obj in objects}
+
+    def snapshot(self):
+        """
+        {pk: instancia} actual (recargada si otro proceso la ha cambiado), o None
+        """
+        now = time.monotonic()
+        if self.version is not None and now - self.checked_at < getattr(settings, 'CATALOG_REFDATA_CHECK_INTERVAL', 1.0):
+            return self.rows
+        with self.lock:
+            version = self._current_version()
+            if version != self.version or now - self.loaded_at >= getattr(settings, 'CATALOG_REFDATA_TIMEOUT', 300):
+                self.rows = self._load()
+                self.version = version
+                self.loaded_at = now
+            self.checked_at = now
+            return self.rows
+
+    def reset(self):
+        """
+        Olvida la copia de este proceso; se recarga en el siguiente acceso
+        """
+        with self.lock:
+            self.version = None
+
+    def invalidate(self):
+        """
+        Descarta la copia de este proceso y, al confirmar la transaccion, la de los demas
+        """
+        self.reset()
+
+        def bump():
+            cache.set(self.version_key, uuid.uuid4().hex[:12], None)
+            # Por si se recargo dentro de la transaccion, antes de confirmar
+            self.reset()
+
+        transaction.on_commit(bump)
+
+    def all(self):
+        rows = self.snapshot()
+        return list(self.model._default_manager.all()) if rows is None else list(rows.values())
+
+    def get(self, pk):
+        """
+        Instancia con ese pk o None
+        """
+        rows = self.snapshot()
+        if rows is None:
+            return self.model._default_manager.filter(pk=pk).first()
+        return rows.get(pk)
+
+    def in_bulk(self, pks):
+        """
+        {pk: instancia} de los pks que existen, en el orden del modelo
+        """
+        rows = self.snapshot()
+        if rows is None:
+            return self.model._default_manager.in_bulk(list(pks))
+        pks = set(pks)
+        return {pk: obj for pk, obj in rows.items() if pk in pks}
+
+
+genres = ReferenceTable('Genre')
+languages = ReferenceTable('Language')
+
+
+def attach_languages(books):
+    """
+    Rellena book.language desde memoria (sin JOIN ni consulta por libro)
+    """
+    field = apps.get_model('catalog', 'Book')._meta.get_field('language')
+    for book in books:
+        if book.language_id is not None:
+            field.set_cached_value(book, languages.get(book.language_id))
+    return books
+
+
+def prefetch_genres(books):
+    """
+    Como prefetch_related('genre'), pero solo lee la tabla intermedia (una
+    consulta) y toma los generos de memoria
+    """
+    Book = apps.get_model('catalog', 'Book')
+    books = [book for book in books if book.pk is not None]
+    if not books:
+        return books
+    links = Book.genre.through.objects.filter(book_id__in=[book.pk for book in books]).values_list('book_id', 'genre_id')
+    genre_ids = {}
+    for book_id, genre_id in links:
+        genre_ids.setdefault(book_id, set()).add(genre_id)
+    rows = genres.in_bulk(set().union(*genre_ids.values()))
+    for book in books:
+        # Igual que hace prefetch_related: un queryset con el resultado ya cargado
+        manager = book.genre
+        prefetched = book.__dict__.setdefault('_prefetched_objects_cache', {})
+        prefetched.pop(manager.prefetch_cache_name, None)
+        queryset = manager.get_queryset()
+        queryset._result_cache = [obj for pk, obj in rows.items() if pk in genre_ids.get(book.pk, ())]
+        queryset._prefetch_done = True
+        prefetched[manager.prefetch_cache_name] = queryset
+    return books
+
+
+def language_name(pk):
+    language = languages.get(pk) if pk is not None else None
+    return language.name if language else None
+
+
+def table_for(model):
+    return TABLES[model._meta.model_name]
+
+
+TABLES = {'genre': genres, 'language': languages}
@@ -0,0 +1,124 @@
+"""
+Enrutado de lecturas a replicas de la base de datos.
+
+Por defecto todo va a 'default' (el primario). Las vistas de solo lectura que
+lo indican (atributo read_from_replica = True en las vistas basadas en clases,
+decorador read_from_replica en las funciones) leen de una de las replicas de
+CATALOG_READ_REPLICAS, elegida al azar una vez por peticion. Una subclase
+puede volver a poner read_from_replica = False.
+
+Lecturas de lo propio escrito (read-your-writes):
+
+    - en cuanto una peticion escribe (db_for_write), el resto de sus lecturas
+      van al primario
+    - ReplicaRoutingMiddleware (catalog/middleware.py) deja ademas una cookie
+      durante CATALOG_REPLICA_PIN_SECONDS: las siguientes peticiones de ese
+      navegador (p. ej. la ficha del libro tras BookUpdate) leen del primario
+      mientras la replica se pone al dia
+
+Las sesiones, los usuarios, grupos y permisos (auth) y los content types
+siempre se leen del primario: una sesion o un usuario recien creados, o una
+contraseña o permisos recien cambiados, pueden no estar aun en la replica. Tambien lo que se guarda en cache con la version
+actual de sus datos: FragmentCacheMixin llama a use_primary() cuando el
+fragmento no esta en cache, y el resto de la peticion lee del primario.
+
+Para probarlo en local basta con una copia del fichero SQLite
+(DJANGO_REPLICA_DB, ver settings.py) sincronizada con manage.py sync_replica.
+"""
+import contextvars
+import random
+import sqlite3
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Estado de la peticion en curso (lo crea ReplicaRoutingMiddleware)
+current_state = contextvars.ContextVar('catalog_replica_state', default=None)
+
+# Modelos que nunca se leen de una replica
+PRIMARY_ONLY_APPS = {'sessions', 'auth', 'contenttypes'}
+
+
+class RoutingState:
+
+    def __init__(self, pinned=False):
+        # La peticion (o una reciente del mismo navegador) ha escrito
+        self.pinned = pinned
+        self.wrote = False
+        self.use_replica = False
+        self.replica = None
+
+    def read_database(self):
+        replicas = replicas_available()
+        if not self.use_replica or self.pinned or not replicas:
+            return None
+        if self.replica not in replicas:
+            self.replica = random.choice(replicas)
+        return self.replica
+
+
+def replicas_available():
+    return list(getattr(settings, 'CATALOG_READ_REPLICAS', ()))
+
+
+def use_primary():
+    """
+    El resto de la peticion en curso lee del primario
+    """
+    state = current_state.get()
+    if state is not None:
+        state.use_replica = False
+
+
+def read_from_replica(view):
+    """
+    Decorador para vistas funcion de solo lectura: sus lecturas van a una replica
+    """
+    view.read_from_replica = True
+    return view
+
+
+def view_reads_from_replica(view_func):
+    flag = getattr(view_func, 'read_from_replica', None)
+    if flag is None:
+        flag = getattr(getattr(view_func, 'view_class', None), 'read_from_replica', False)
+    return bool(flag)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = current_state.get()
+        if state is None or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return state.read_database()
+
+    def db_for_write(self, model, **hints):
+        state = current_state.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y replicas tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las replicas reciben el esquema con los datos, no con migrate
+        if db in replicas_available():
+            return False
+        return None
+
+
+def sync_sqlite(source, target):
+    """
+    Copia la base de datos SQLite source sobre target con la API de backup
+    (consistente aunque source se este escribiendo)
+    """
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
@@ -0,0 +1,318 @@
+"""
+Motor de busqueda de libros.
+
+Indice invertido sobre el titulo, el resumen, el autor y los generos de cada
+libro. En SQLite con FTS5 se usa la tabla virtual catalog_book_fts (creada en la
+migracion 0006) con ranking bm25; en cualquier otro caso se usa un indice en
+memoria del proceso. Ambos motores tienen la misma interfaz y se mantienen
+sincronizados desde catalog/signals.py.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import Book
+from .utils import batched, fold
+
+FTS_TABLE = 'catalog_book_fts'
+
+# Peso de cada campo en el ranking (mismo orden que las columnas de la tabla FTS)
+FIELD_WEIGHTS = {
+    'title': 10.0,
+    'summary': 1.0,
+    'authors': 5.0,
+    'genres': 2.0,
+}
+FIELDS = tuple(FIELD_WEIGHTS)
+
+
+def max_count():
+    # Los resultados se cuentan hasta este numero: contar todos los de un termino
+    # comun cuesta segundos con cientos de miles de libros
+    return getattr(settings, 'CATALOG_SEARCH_MAX_COUNT', 1000)
+
+
+def tokenize(text):
+    """
+    Minusculas, sin acentos y partido en palabras
+    """
+    return re.findall(r'\w+', fold(text))
+
+
+def book_documents(book_ids=None, chunk_size=2000):
+    """
+    Genera (id, {campo: texto}) para los libros indicados (o todos)
+    """
+    books = Book.objects.select_related('author').prefetch_related('genre').order_by('pk')
+    if book_ids is not None:
+        books = books.filter(pk__in=book_ids)
+    for book in books.iterator(chunk_size=chunk_size):
+        yield book.pk, {
+            'title': book.title,
+            'summary': book.summary,
+            'authors': f'{book.author.first_name} {book.author.last_name}' if book.author else '',
+            'genres': ' '.join(genre.name for genre in book.genre.all()),
+        }
+
+
+class FTS5Backend:
+    """
+    Busqueda con la tabla virtual FTS5 de SQLite. Las escrituras van en la misma
+    transaccion que el cambio del libro, asi que el indice nunca queda a medias.
+    """
+
+    def index(self, book_ids=None):
+        columns = ', '.join(FIELDS)
+        placeholders = ', '.join(['%s'] * (len(FIELDS) + 1))
+        with connection.cursor() as cursor:
+            for batch in batched(book_documents(book_ids), 500):
+                cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk, _ in batch])
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES ({placeholders})',
+                    [(pk, *(doc[field] for field in FIELDS)) for pk, doc in batch],
+                )
+
+    def remove(self, book_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in book_ids])
+
+    def rebuild(self):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            self.index()
+
+    def match_expression(self, terms):
+        # Cada termino entre comillas (sin operadores FTS) y con * para buscar por prefijo
+        return ' '.join('"%s"*' % term for term in terms)
+
+    def count(self, terms, limit=None):
+        # LIMIT -1 es sin limite en SQLite
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM (SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)',
+                [self.match_expression(terms), -1 if limit is None else limit],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, terms, offset, limit):
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS.values())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+                [self.match_expression(terms), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class InMemoryBackend:
+    """
+    Indice invertido en memoria, para bases de datos sin FTS5.
+
+    Cada proceso tiene su propia copia; un numero de version en la cache indica
+    a los demas procesos que deben reconstruirla tras un cambio. Los cambios del
+    propio proceso se aplican sobre su copia si nadie mas ha cambiado la version.
+    """
+    VERSION_KEY = 'catalog:search:version'
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = {}   # token -> {book_id: puntuacion}
+        self.documents = {}  # book_id -> tokens del libro
+        self.tokens = []     # tokens ordenados, para buscar prefijos con bisect
+        self.version = None
+
+    def _current_version(self):
+        return cache.get_or_set(self.VERSION_KEY, self._initial_version, None)
+
+    def _initial_version(self):
+        # Si la clave se pierde (expulsion de la cache) no se repiten versiones antiguas
+        return time.time_ns() // 1000
+
+    def _bump_version(self):
+        cache.add(self.VERSION_KEY, self._initial_version(), None)
+        try:
+            return cache.incr(self.VERSION_KEY)
+        except ValueError:
+            # La clave desaparecio entre add e incr
+            return self._current_version()
+
+    def _ensure_loaded(self):
+        version = self._current_version()
+        if self.version != version:
+            with self.lock:
+                self._clear()
+                self._add(book_documents())
+                self.version = version
+
+    def _clear(self):
+        self.postings, self.documents, self.tokens = {}, {}, []
+
+    def _add(self, documents):
+        for pk, doc in documents:
+            self._discard(pk)
+            scores = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(doc[field]):
+                    scores[token] = scores.get(token, 0.0) + weight
+            for token, score in scores.items():
+                if token not in self.postings:
+                    self.postings[token] = {}
+                    bisect.insort(self.tokens, token)
+                self.postings[token][pk] = score
+            self.documents[pk] = tuple(scores)
+
+    def _discard(self, pk):
+        for token in self.documents.pop(pk, ()):
+            postings = self.postings[token]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[token]
+                self.tokens.pop(bisect.bisect_left(self.tokens, token))
+
+    def _changed(self, apply):
+        def callback():
+            # La version compartida sube siempre, aunque este proceso no haya
+            # cargado el indice, para que los demas procesos vean el cambio
+            with self.lock:
+                version = self._bump_version()
+                if self.version is not None and version == self.version + 1:
+                    apply()
+                    self.version = version
+                # Si no, hubo cambios de otros procesos: se recarga en la siguiente busqueda
+        transaction.on_commit(callback)
+
+    def index(self, book_ids=None):
+        if book_ids is None:
+            self.rebuild()
+        else:
+            self._changed(lambda: self._add(book_documents(book_ids)))
+
+    def remove(self, book_ids):
+        def apply():
+            for pk in book_ids:
+                self._discard(pk)
+        self._changed(apply)
+
+    def rebuild(self):
+        with self.lock:
+            self.version = None
+            self._bump_version()
+
+    def _matches(self, term):
+        """
+        {book_id: puntuacion} de todos los tokens que empiezan por term
+        """
+        matches = {}
+        start = bisect.bisect_left(self.tokens, term)
+        for token in self.tokens[start:]:
+            if not token.startswith(term):
+                break
+            for pk, score in self.postings[token].items():
+                matches[pk] = max(matches.get(pk, 0.0), score)
+        return matches
+
+    def _ranking(self, terms):
+        self._ensure_loaded()
+        with self.lock:
+            total = len(self.documents) or 1
+            ranking = None
+            for term in terms:
+                matches = self._matches(term)
+                idf = math.log(1 + total / (len(matches) or 1))
+                if ranking is None:
+                    ranking = {pk: score * idf for pk, score in matches.items()}
+                else:
+                    ranking = {pk: ranking[pk] + score * idf for pk, score in matches.items() if pk in ranking}
+        return sorted(ranking or {}, key=lambda pk: (-ranking[pk], pk))
+
+    def count(self, terms, limit=None):
+        count = len(self._ranking(terms))
+        return count if limit is None else min(count, limit)
+
+    def ranked_ids(self, terms, offset, limit):
+        return self._ranking(terms)[offset:offset + limit]
+
+
+_memory_backend = InMemoryBackend()
+_fts_available = {}
+
+
+def get_backend():
+    """
+    FTS5 si la tabla existe en la base de datos actual; si no, el indice en memoria
+    """
+    key = (connection.alias, str(connection.settings_dict['NAME']))
+    if key not in _fts_available:
+        available = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                available = cursor.fetchone() is not None
+        _fts_available[key] = available
+    return FTS5Backend() if _fts_available[key] else _memory_backend
+
+
+def index_books(book_ids):
+    get_backend().index(list(book_ids))
+
+
+def remove_books(book_ids):
+    get_backend().remove(list(book_ids))
+
+
+def rebuild():
+    get_backend().rebuild()
+
+
+class SearchResults:
+    """
+    Resultados perezosos de una busqueda, paginables con el Paginator de Django:
+    solo se consultan el total y los libros de la pagina pedida.
+
+    El total se cuenta hasta max_count(); si hay mas, truncated es True y solo se
+    puede paginar hasta ese numero de resultados.
+    """
+    model = Book
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.terms = tokenize(query)
+        self.backend = backend or get_backend()
+        self.max_count = max_count()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.terms, self.max_count + 1) if self.terms else 0
+        return min(self._count, self.max_count)
+
+    @property
+    def truncated(self):
+        self.count()
+        return self._count > self.max_count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice):
+            return self[k:k + 1][0]
+        start = k.start or 0
+        stop = self.count() if k.stop is None else k.stop
+        if not self.terms or stop <= start:
+            return []
+        ids = self.backend.ranked_ids(self.terms, start, stop - start)
+        books = Book.objects.select_related('author').in_bulk(ids)
+        return [books[pk] for pk in ids if pk in books]
+
+
+def search(query):
+    return SearchResults(query)
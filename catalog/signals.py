@@ -0,0 +1,246 @@
+"""
+Receptores de señales del catalogo.
+
+Se conectan desde CatalogConfig.ready() y mantienen al dia los datos derivados
+(contadores de la pagina de inicio, indice del buscador, versiones de la cache
+de fragmentos, resumen de disponibilidad de cada libro, copia en memoria de
+generos e idiomas, updated_at y registro de borrados para la exportacion
+incremental) sin recalcularlos en cada peticion. Tambien asignan las copias que
+quedan disponibles a la cola de reservas (catalog.holds).
+
+Hay un solo receptor por modelo y señal, que llama a cada paso en este orden:
+
+    1. resumen de disponibilidad (necesita el book_id anterior de la copia)
+    2. updated_at de los libros y registro de borrados
+    3. contadores
+    4. indice del buscador
+    5. versiones de fragmentos (recuerdan el book_id y author_id nuevos)
+    6. copia en memoria de generos e idiomas
+    7. cola de reservas (asignar la copia la vuelve a guardar, y los pasos
+       anteriores ya deben haber visto este cambio)
+
+Con raw (loaddata) no se escribe nada en la base de datos: solo se invalidan
+las caches. El resumen de disponibilidad viene en el fixture; el indice del
+buscador se reconstruye con rebuild_search_index.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import availability, counters, fragments, holds, refdata, search
+from .models import Author, Book, BookInstance, Genre, Language, Tombstone
+
+# Sentinela para campos cuyo valor previo en la BD no conocemos
+UNKNOWN = object()
+
+
+def touch_books(book_ids):
+    # Con update(): no vuelve a disparar las señales de Book
+    Book.objects.filter(pk__in=book_ids).update(updated_at=timezone.now())
+
+
+def related_book_ids(instance):
+    """
+    Libros de un autor, genero o idioma; al borrarlo, los guardados en pre_delete
+    """
+    book_ids = instance.__dict__.get('_related_book_ids')
+    if book_ids is None:
+        book_ids = list(instance.book_set.values_list('pk', flat=True))
+    return book_ids
+
+
+# Contadores
+
+def count_book_saved(instance, created):
+    has_y = counters.title_has_y(instance.title)
+    if created:
+        counters.adjust(num_books=1, num_libros_con_y=int(has_y))
+    else:
+        old_title = instance.loaded_value('title', UNKNOWN)
+        if old_title is UNKNOWN:
+            counters.invalidate()
+        else:
+            counters.adjust(num_libros_con_y=int(has_y) - int(counters.title_has_y(old_title)))
+    instance.remember_loaded_values('title')
+
+
+def count_book_deleted(instance):
+    title = instance.loaded_value('title', instance.title)
+    counters.adjust(num_books=-1, num_libros_con_y=-int(counters.title_has_y(title)))
+
+
+def count_bookinstance_saved(instance, created):
+    available = int(instance.status == 'a')
+    if created:
+        counters.adjust(num_instances=1, num_instances_available=available)
+    else:
+        old_status = instance.loaded_value('status', UNKNOWN)
+        if old_status is UNKNOWN:
+            counters.invalidate()
+        elif old_status != instance.status:
+            # Cambio de estado: O(1), solo se toca el contador de disponibles
+            counters.adjust(num_instances_available=available - int(old_status == 'a'))
+    instance.remember_loaded_values('status')
+
+
+def count_bookinstance_deleted(instance):
+    status = instance.loaded_value('status', instance.status)
+    counters.adjust(num_instances=-1, num_instances_available=-int(status == 'a'))
+
+
+# Versiones de la cache de fragmentos de las paginas de detalle
+
+def bump_book_fragments(instance):
+    fragments.bump('book', instance.pk)
+    # La pagina del autor lista sus libros (y el libro puede haber cambiado de autor)
+    fragments.bump('author', instance.author_id, instance.loaded_value('author_id'))
+    instance.remember_loaded_values('author_id')
+
+
+def bump_bookinstance_fragments(instance):
+    book_ids = {instance.book_id, instance.loaded_value('book_id')} - {None}
+    if book_ids:
+        fragments.bump('book', *book_ids)
+        # El numero de copias aparece tambien en la pagina del autor
+        fragments.bump('author', *Book.objects.filter(pk__in=book_ids).values_list('author_id', flat=True))
+    instance.remember_loaded_values('book_id')
+
+
+# Book
+
+@receiver(post_save, sender=Book, dispatch_uid='catalog_book_saved')
+def book_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        counters.invalidate()
+        fragments.bump('book', instance.pk)
+        return
+    count_book_saved(instance, created)
+    search.index_books([instance.pk])
+    bump_book_fragments(instance)
+
+
+@receiver(post_delete, sender=Book, dispatch_uid='catalog_book_deleted')
+def book_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(kind=Tombstone.BOOK, object_id=str(instance.pk), book_id=instance.pk)
+    count_book_deleted(instance)
+    search.remove_books([instance.pk])
+    bump_book_fragments(instance)
+
+
+@receiver(m2m_changed, sender=Book.genre.through, dispatch_uid='catalog_book_genres_changed')
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Al vaciar un genero hay que saber antes que libros lo tenian
+        instance._cleared_book_ids = list(instance.book_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        book_ids = [instance.pk]
+    elif action == 'post_clear':
+        book_ids = instance.__dict__.pop('_cleared_book_ids', [])
+    else:
+        book_ids = list(pk_set)
+    touch_books(book_ids)
+    search.index_books(book_ids)
+    if reverse:
+        fragments.bump('genre')
+    else:
+        fragments.bump('book', instance.pk)
+
+
+# BookInstance
+
+@receiver(post_save, sender=BookInstance, dispatch_uid='catalog_bookinstance_saved')
+def bookinstance_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        counters.invalidate()
+        fragments.bump('book', instance.book_id)
+        return
+    # Tambien el libro anterior si la copia ha cambiado de libro
+    availability.refresh(instance.book_id, instance.loaded_value('book_id'))
+    count_bookinstance_saved(instance, created)
+    bump_bookinstance_fragments(instance)
+    if instance.status == 'a':
+        holds.allocate_copy(instance)
+
+
+@receiver(post_delete, sender=BookInstance, dispatch_uid='catalog_bookinstance_deleted')
+def bookinstance_deleted(sender, instance, **kwargs):
+    availability.refresh(instance.book_id, instance.loaded_value('book_id'))
+    Tombstone.objects.create(kind=Tombstone.COPY, object_id=str(instance.pk), book_id=instance.book_id)
+    count_bookinstance_deleted(instance)
+    bump_bookinstance_fragments(instance)
+
+
+# Author, Genre y Language
+
+@receiver(pre_delete, sender=Author, dispatch_uid='catalog_author_deleting')
+@receiver(pre_delete, sender=Genre, dispatch_uid='catalog_genre_deleting')
+@receiver(pre_delete, sender=Language, dispatch_uid='catalog_language_deleting')
+def related_deleting(sender, instance, **kwargs):
+    # Despues del borrado ya no se puede saber que libros estaban relacionados
+    instance._related_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Author, dispatch_uid='catalog_author_saved')
+def author_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        counters.invalidate()
+        fragments.bump('author', instance.pk)
+        return
+    if created:
+        counters.adjust(num_authors=1)
+        fragments.bump('author', instance.pk)
+        return
+    # Nombre del autor: el export lo lee con JOIN (author__updated_at)
+    book_ids = related_book_ids(instance)
+    search.index_books(book_ids)
+    fragments.bump('author', instance.pk)
+    if book_ids:
+        fragments.bump('book', *book_ids)
+
+
+@receiver(post_delete, sender=Author, dispatch_uid='catalog_author_deleted')
+def author_deleted(sender, instance, **kwargs):
+    # Los libros ya tienen author=NULL: se usan los ids guardados en pre_delete
+    book_ids = related_book_ids(instance)
+    touch_books(book_ids)
+    counters.adjust(num_authors=-1)
+    search.index_books(book_ids)
+    fragments.bump('author', instance.pk)
+    if book_ids:
+        fragments.bump('book', *book_ids)
+
+
+@receiver(post_save, sender=Genre, dispatch_uid='catalog_genre_saved')
+def genre_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        counters.invalidate()
+    elif created:
+        counters.adjust(num_generos=1)
+    else:
+        book_ids = related_book_ids(instance)
+        touch_books(book_ids)
+        search.index_books(book_ids)
+    fragments.bump('genre')
+    refdata.genres.invalidate()
+
+
+@receiver(post_delete, sender=Genre, dispatch_uid='catalog_genre_deleted')
+def genre_deleted(sender, instance, **kwargs):
+    book_ids = related_book_ids(instance)
+    touch_books(book_ids)
+    counters.adjust(num_generos=-1)
+    search.index_books(book_ids)
+    fragments.bump('genre')
+    refdata.genres.invalidate()
+
+
+@receiver(post_save, sender=Language, dispatch_uid='catalog_language_saved')
+@receiver(post_delete, sender=Language, dispatch_uid='catalog_language_deleted')
+def language_changed(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        touch_books(related_book_ids(instance))
+    fragments.bump('language')
+    refdata.languages.invalidate()
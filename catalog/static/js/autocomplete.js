@@ -0,0 +1,69 @@
+// Selectores con autocompletado (catalog.widgets.AutocompleteSelect)
+(function () {
+  'use strict';
+
+  function setup(container) {
+    var hidden = container.querySelector('input[type=hidden]');
+    var input = container.querySelector('input[type=search]');
+    var list = container.querySelector('.autocomplete-results');
+    var timer = null;
+    var request = 0;
+
+    function clear() {
+      list.innerHTML = '';
+    }
+
+    function choose(item) {
+      hidden.value = item.id;
+      input.value = item.text;
+      clear();
+    }
+
+    function show(data) {
+      clear();
+      data.results.forEach(function (item) {
+        var li = document.createElement('li');
+        li.textContent = item.text;
+        li.addEventListener('mousedown', function (event) {
+          event.preventDefault();
+          choose(item);
+        });
+        list.appendChild(li);
+      });
+      if (data.more) {
+        var more = document.createElement('li');
+        more.className = 'autocomplete-more';
+        more.textContent = 'Sigue escribiendo para ver más…';
+        list.appendChild(more);
+      }
+    }
+
+    function search() {
+      var term = input.value.trim();
+      var current = ++request;
+      if (!term) {
+        clear();
+        return;
+      }
+      fetch(container.dataset.url + '?q=' + encodeURIComponent(term), {credentials: 'same-origin'})
+        .then(function (response) { return response.json(); })
+        .then(function (data) {
+          // Solo la respuesta de la ultima busqueda
+          if (current === request) {
+            show(data);
+          }
+        });
+    }
+
+    input.addEventListener('input', function () {
+      hidden.value = '';
+      clearTimeout(timer);
+      timer = setTimeout(search, 200);
+    });
+    input.addEventListener('blur', clear);
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.autocomplete').forEach(setup);
+  });
+})();
@@ -0,0 +1,68 @@
+"""
+Almacenamiento de los ficheros estaticos para produccion.
+
+collectstatic copia cada fichero con un hash de su contenido en el nombre
+(css/styles.3f2a9c1b7e4d.css, ver ManifestStaticFilesStorage) y, ademas, deja
+al lado versiones comprimidas (.gz y, si esta instalado el paquete brotli,
+.br). Asi las respuestas (catalog.assets.serve) no comprimen nada por peticion
+y los ficheros con hash se pueden cachear para siempre en el navegador.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el solo se generan los .gz
+    brotli = None
+
+# Solo merece la pena comprimir los formatos de texto
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.html', '.txt', '.xml', '.ttf', '.eot', '.ico')
+# Por debajo de este tamaño la cabecera de compresion se come la ganancia
+MIN_SIZE = 256
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+        if dry_run:
+            return
+        for name in sorted(names):
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """
+        Escribe las versiones comprimidas de name que ocupan menos; devuelve sus nombres
+        """
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return []
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_SIZE:
+            return []
+        stat = os.stat(path)
+        written = []
+        for suffix, compress in _compressors():
+            compressed = compress(data)
+            # Si apenas gana, mejor servir el original
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                # Misma fecha que el original: Last-Modified no depende de la variante servida
+                os.utime(path + suffix, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                written.append(name + suffix)
+        return written
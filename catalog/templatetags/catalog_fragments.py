@@ -0,0 +1,42 @@
+from django import template
+
+from catalog import fragments
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+
+    def __init__(self, nodelist, name, pk):
+        self.nodelist = nodelist
+        self.name = name
+        self.pk = pk
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        if context.get('fragment_name') == name:
+            # La vista (FragmentCacheMixin) ya ha consultado la cache
+            key = context['fragment_key']
+            html = context.get('cached_fragment')
+        else:
+            key = fragments.fragment_key(name, self.pk.resolve(context))
+            html = fragments.get(name, key)
+        if html is None:
+            html = self.nodelist.render(context)
+            fragments.store(key, html)
+        return html
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    """
+    Guarda en cache el contenido con una clave versionada (ver catalog.fragments):
+
+        {% fragment_cache 'book_detail' book.pk %} ... {% endfragment_cache %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError("'%s' necesita el nombre del fragmento y el pk" % bits[0])
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    return FragmentCacheNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
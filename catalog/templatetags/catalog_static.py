@@ -0,0 +1,15 @@
+from django import template
+
+from catalog import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_static(path):
+    """
+    URL de un fichero de terceros de catalog.assets.VENDOR_ASSETS:
+
+        <link rel="stylesheet" href="{% vendor_static 'vendor/bootstrap/3.3.7/css/bootstrap.min.css' %}">
+    """
+    return assets.vendor_url(path)
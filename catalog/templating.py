@@ -0,0 +1,187 @@
+"""
+Backend de plantillas de Django que mide el tiempo de renderizado.
+
+Es el DjangoTemplates de siempre; solo envuelve las plantillas para sumar su
+tiempo al RequestStats de la peticion en curso (ver catalog.performance). Las
+plantillas que se renderizan dentro de otra no se vuelven a contar.
+
+Ademas:
+
+    - precompile() compila todas las plantillas al arrancar el proceso
+      (CATALOG_PRECOMPILE_TEMPLATES, ver locallibrary/wsgi.py), para que el
+      loader cached las tenga ya en memoria en la primera peticion
+    - profiler (CATALOG_TEMPLATE_PROFILE o el comando profile_templates) reparte
+      el tiempo de renderizado entre las plantillas: cada bloque cuenta para la
+      plantilla que lo define, no para la que lo incluye o de la que hereda
+      (base_generic.html solo suma su propio HTML, no el contenido de cada pagina)
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.base import NodeList
+
+from .performance import current_stats
+
+logger = logging.getLogger(__name__)
+
+
+class TimedTemplate:
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        if stats is None:
+            return self.template.render(context, request)
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_ms += (time.perf_counter() - start) * 1000
+                stats.templates.append(self.template.origin.template_name or '<string>')
+
+
+class TemplateProfiler:
+    """
+    Tiempo propio de cada plantilla (sin el de las plantillas y bloques de otras
+    plantillas que se renderizan dentro), acumulado en el proceso.
+
+    Mientras esta activo sustituye NodeList.render: cada lista de nodos pertenece
+    a una sola plantilla (la de su origin), y solo se mide cuando cambia la
+    plantilla respecto a la lista que la contiene.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # nombre -> [renderizados, ms propios, maximo ms propios]
+        self.totals = {}
+        # Pila de [nombre, inicio, ms de las plantillas hijas] del renderizado en curso
+        self.stack = contextvars.ContextVar('catalog_template_profile_stack', default=None)
+        self.original_render = None
+
+    @property
+    def enabled(self):
+        return self.original_render is not None
+
+    def enable(self):
+        if self.original_render is None:
+            self.original_render = NodeList.render
+            profiler = self
+
+            def render(nodelist, context):
+                return profiler.render(nodelist, context)
+
+            NodeList.render = render
+
+    def disable(self):
+        if self.original_render is not None:
+            NodeList.render = self.original_render
+            self.original_render = None
+
+    def render(self, nodelist, context):
+        origin = nodelist[0].origin if nodelist else None
+        name = (origin.template_name or '<string>') if origin is not None else None
+        stack = self.stack.get()
+        if stack is None:
+            stack = []
+            self.stack.set(stack)
+        if name is None or (stack and stack[-1][0] == name):
+            return self.original_render(nodelist, context)
+
+        frame = [name, time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            return self.original_render(nodelist, context)
+        finally:
+            stack.pop()
+            elapsed = (time.perf_counter() - frame[1]) * 1000
+            if stack:
+                stack[-1][2] += elapsed
+            self.record(name, elapsed - frame[2])
+
+    def record(self, name, self_ms):
+        with self.lock:
+            totals = self.totals.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += self_ms
+            totals[2] = max(totals[2], self_ms)
+
+    def snapshot(self):
+        """
+        [{template, renders, self_ms, max_ms, share}] de mas a menos tiempo propio
+        """
+        with self.lock:
+            rows = [(name, *values) for name, values in self.totals.items()]
+        total_ms = sum(row[2] for row in rows) or 1.0
+        return [
+            {'template': name, 'renders': renders, 'self_ms': self_ms, 'max_ms': max_ms, 'share': self_ms / total_ms}
+            for name, renders, self_ms, max_ms in sorted(rows, key=lambda row: -row[2])
+        ]
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+
+
+profiler = TemplateProfiler()
+
+
+def template_names(engine):
+    """
+    Nombres de todas las plantillas que pueden encontrar los loaders del motor
+    """
+    names = set()
+    for loader in engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            for directory in inner.get_dirs():
+                for root, dirs, files in os.walk(directory):
+                    for filename in files:
+                        names.add(os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def precompile():
+    """
+    Compila todas las plantillas de los motores DjangoTemplates (las guarda el
+    loader cached). Devuelve el numero de plantillas compiladas.
+    """
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError) as e:
+                # Ficheros que no son plantillas, o que solo compilan en su contexto
+                logger.debug('No se precompila %s: %s', name, e)
+            else:
+                compiled += 1
+    return compiled
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+
+    def __init__(self, params):
+        super().__init__(params)
+        if getattr(settings, 'CATALOG_TEMPLATE_PROFILE', False):
+            profiler.enable()
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
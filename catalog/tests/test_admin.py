@@ -0,0 +1,110 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.pagination import EstimatedCountPaginator
+
+
+class AdminChangelistTest(TestCase):
+    """
+    Los listados y las fichas del admin no deben hacer una consulta por fila
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_superuser(username='admin', password='12345', email='admin@example.com')
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.genres = [Genre.objects.create(name='Genre %s' % num) for num in range(3)]
+        cls.language = Language.objects.create(name='English')
+        cls.book = cls.add_books(3)
+
+    @classmethod
+    def add_books(cls, count):
+        for num in range(count):
+            book = Book.objects.create(title='Book %s' % num, summary='Summary', isbn='ABCDEFG', author=cls.author, language=cls.language)
+            book.genre.set(cls.genres)
+            BookInstance.objects.bulk_create([BookInstance(book=book, imprint='Imprint', status='a') for _ in range(30)])
+        return book
+
+    def setUp(self):
+        self.client.login(username='admin', password='12345')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx)
+
+    def assertConstantQueries(self, url):
+        before = self.count_queries(url)
+        self.add_books(10)
+        self.assertEqual(self.count_queries(url), before)
+
+    def test_book_changelist_constant_queries(self):
+        self.assertConstantQueries(reverse('admin:catalog_book_changelist'))
+
+    def test_bookinstance_changelist_constant_queries(self):
+        self.assertConstantQueries(reverse('admin:catalog_bookinstance_changelist'))
+
+    def test_book_change_page_limits_inline_rows(self):
+        resp = self.client.get(reverse('admin:catalog_book_change', args=[self.book.pk]))
+        self.assertEqual(resp.status_code, 200)
+        formset = resp.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.forms), formset.max_rows)
+        # Todas las copias tienen due_back NULL: el corte sigue el pk
+        expected = BookInstance.objects.filter(book=self.book).order_by('pk')[:formset.max_rows]
+        self.assertEqual([form.instance.pk for form in formset.forms], [copy.pk for copy in expected])
+        url = reverse('admin:catalog_bookinstance_changelist') + '?book__id__exact=%s' % self.book.pk
+        self.assertContains(resp, 'Ver todos (30)')
+        self.assertEqual(self.client.get(url).context['cl'].result_count, 30)
+
+    def test_book_change_page_saves_with_limited_inline(self):
+        url = reverse('admin:catalog_book_change', args=[self.book.pk])
+        resp = self.client.get(url)
+        formset = resp.context['inline_admin_formsets'][0].formset
+        data = {key: value for key, value in resp.context['adminform'].form.initial.items() if value is not None}
+        data['genre'] = [genre.pk for genre in self.genres]
+        data['author'] = self.author.pk
+        data['language'] = self.language.pk
+        data['title'] = 'Nuevo titulo'
+        prefix = formset.prefix
+        data.update({
+            f'{prefix}-TOTAL_FORMS': len(formset.forms), f'{prefix}-INITIAL_FORMS': len(formset.forms),
+            f'{prefix}-MIN_NUM_FORMS': 0, f'{prefix}-MAX_NUM_FORMS': 1000,
+        })
+        for num, form in enumerate(formset.forms):
+            data.update({
+                f'{prefix}-{num}-id': form.instance.pk, f'{prefix}-{num}-book': self.book.pk,
+                f'{prefix}-{num}-imprint': 'Otro', f'{prefix}-{num}-status': 'a',
+            })
+        resp = self.client.post(url, data)
+        self.assertEqual(resp.status_code, 302)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, 'Nuevo titulo')
+        self.assertEqual(BookInstance.objects.filter(book=self.book, imprint='Otro').count(), formset.max_rows)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        Book.objects.bulk_create([Book(title='Book %s' % num, summary='Summary', isbn='ABCDEFG', author=cls.author) for num in range(25)])
+        Book.objects.filter(title='Book 3').delete()
+
+    def test_small_tables_are_counted_exactly(self):
+        self.assertEqual(EstimatedCountPaginator(Book.objects.order_by('pk'), 10).count, 24)
+
+    def test_large_tables_are_estimated(self):
+        paginator = EstimatedCountPaginator(Book.objects.order_by('pk'), 10)
+        paginator.exact_below = 10
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 25)
+
+    def test_filtered_querysets_are_counted_exactly(self):
+        paginator = EstimatedCountPaginator(Book.objects.filter(title__startswith='Book 1').order_by('pk'), 10)
+        paginator.exact_below = 0
+        self.assertEqual(paginator.count, 11)
@@ -0,0 +1,124 @@
+import datetime
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Language
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Miguel', last_name='Cervantes')
+        spanish = Language.objects.create(name='Español')
+        cls.books = [
+            Book.objects.create(title='Libro %d' % num, summary='Resumen', isbn='%013d' % num, author=cls.author, language=spanish)
+            for num in range(5)
+        ]
+        cls.copy = BookInstance.objects.create(book=cls.books[0], imprint='Austral', status='a')
+
+    def get(self, name, *args, **params):
+        headers = {key: params.pop(key) for key in list(params) if key.startswith('HTTP_')}
+        return self.client.get(reverse(name, args=args), params, **headers)
+
+    def test_detail_with_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.get('api-detail', 'books', self.books[0].pk, fields='title,language')
+        self.assertEqual(resp.json(), {'title': 'Libro 0', 'language': 'Español'})
+        # Solo la columna pedida y el JOIN de idioma; nada del resumen ni del autor
+        self.assertNotIn('summary', queries[-1]['sql'])
+        self.assertNotIn('catalog_author', queries[-1]['sql'])
+
+    def test_unknown_field(self):
+        self.assertEqual(self.get('api-list', 'books', fields='title,nope').status_code, 400)
+
+    def test_not_found(self):
+        self.assertEqual(self.get('api-detail', 'books', 999).status_code, 404)
+        self.assertEqual(self.get('api-detail', 'copies', 'not-a-uuid').status_code, 404)
+        self.assertEqual(self.get('api-list', 'nope').status_code, 404)
+
+    def test_cursor_pagination(self):
+        resp = self.get('api-list', 'books', fields='id', limit=2)
+        data = resp.json()
+        self.assertEqual(data['results'], [{'id': self.books[0].pk}, {'id': self.books[1].pk}])
+        self.assertIsNone(data['previous'])
+        seen = [row['id'] for row in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            seen += [row['id'] for row in data['results']]
+        self.assertEqual(seen, [book.pk for book in self.books])
+
+    def test_filters(self):
+        resp = self.get('api-list', 'copies', book=self.books[0].pk, fields='id,status')
+        self.assertEqual(resp.json()['results'], [{'id': str(self.copy.pk), 'status': 'a'}])
+        self.assertEqual(self.get('api-list', 'books', author='x').status_code, 400)
+
+    def test_not_modified(self):
+        resp = self.get('api-detail', 'authors', self.author.pk)
+        self.assertIn('Last-Modified', resp)
+        with self.assertNumQueries(1):
+            again = self.get('api-detail', 'authors', self.author.pk, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(again.status_code, 304)
+        again = self.get('api-detail', 'authors', self.author.pk, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+        self.author.first_name = 'M.'
+        self.author.save()
+        self.assertEqual(self.get('api-detail', 'authors', self.author.pk, HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 200)
+
+    def test_related_rename_changes_etag(self):
+        # author_name se lee con JOIN: su version es la del autor
+        resp = self.get('api-detail', 'books', self.books[0].pk, fields='author_name')
+        self.assertEqual(self.get('api-detail', 'books', self.books[0].pk, fields='author_name', HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+        list_etag = self.get('api-list', 'books', fields='id,author_name')['ETag']
+
+        self.author.last_name = 'de Cervantes'
+        self.author.save()
+        again = self.get('api-detail', 'books', self.books[0].pk, fields='author_name', HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json(), {'author_name': 'de Cervantes'})
+        self.assertEqual(self.get('api-list', 'books', fields='id,author_name', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_list_etag_changes_with_page_rows(self):
+        etag = self.get('api-list', 'books', limit=2)['ETag']
+        self.assertEqual(self.get('api-list', 'books', limit=2, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.books[1].delete()
+        self.assertEqual(self.get('api-list', 'books', limit=2, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_changes_with_next_page(self):
+        resp = self.get('api-list', 'books', limit=5)
+        self.assertIsNone(resp.json()['next'])
+        # Sin Last-Modified: borrar una fila no cambia el updated_at maximo de las demas
+        self.assertNotIn('Last-Modified', resp)
+        Book.objects.create(title='Libro 5', summary='Resumen', isbn='%013d' % 5, author=self.author)
+        again = self.get('api-list', 'books', limit=5, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertIsNotNone(again.json()['next'])
+
+    def test_availability_changes_etag(self):
+        # El resumen de disponibilidad cambia sin tocar Book.updated_at
+        resp = self.get('api-detail', 'books', self.books[0].pk, fields='title,copies_available')
+        self.assertNotIn('Last-Modified', resp)
+        self.copy.status = 'o'
+        self.copy.save()
+        again = self.get('api-detail', 'books', self.books[0].pk, fields='title,copies_available', HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(again.json(), {'title': 'Libro 0', 'copies_available': 0})
+
+    def test_loans_require_permission(self):
+        self.assertEqual(self.get('api-list', 'loans').status_code, 403)
+        user = User.objects.create_user(username='librarian', password='12345')
+        user.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        self.client.login(username='librarian', password='12345')
+        BookInstance.objects.create(
+            book=self.books[1], imprint='Austral', status='o', borrower=user,
+            due_back=datetime.date.today() - datetime.timedelta(days=2),
+        )
+        resp = self.get('api-list', 'loans', fields='title,borrower,days_overdue')
+        self.assertEqual(resp.json()['results'], [{'title': 'Libro 1', 'borrower': 'librarian', 'days_overdue': 2}])
+        # El usuario no tiene columna de version: sin respuestas condicionales
+        self.assertNotIn('ETag', resp)
+        self.assertIn('ETag', self.get('api-list', 'loans', fields='title,days_overdue'))
@@ -0,0 +1,105 @@
+import datetime
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import async_views, bench, counters
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class AsyncViewsTest(TestCase):
+    """
+    Las vistas asincronas devuelven lo mismo que las sincronas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='librarian', password='12345')
+        cls.user.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        User.objects.create_user(username='reader', password='12345')
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        language = Language.objects.create(name='English')
+        genre = Genre.objects.create(name='Fantasy')
+        due_back = datetime.date.today() + datetime.timedelta(days=3)
+        for num in range(7):
+            book = Book.objects.create(title='Book %s' % num, summary='Summary', isbn='ABCDEFG', author=cls.author, language=language)
+            book.genre.add(genre)
+            BookInstance.objects.create(book=book, imprint='Imprint', due_back=due_back, borrower=cls.user, status='o')
+        cls.book = book
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(bench.use_async_views())
+
+    async def login(self, username='librarian'):
+        await self.async_client.alogin(username=username, password='12345')
+
+    def assertAsyncView(self, resp, view_class):
+        self.assertEqual(resp.resolver_match.func.view_class, view_class)
+
+    async def test_index(self):
+        resp = await self.async_client.get(reverse('index'))
+        self.assertEqual(resp.resolver_match.func, async_views.index)
+        self.assertEqual(resp.context['num_books'], 7)
+        self.assertEqual(resp.context['num_visits'], 1)
+
+    async def test_counters_recount_concurrently(self):
+        values = await counters.arecount()
+        self.assertEqual(values, await counters.aget_counters())
+        self.assertEqual(values['num_instances_available'], 0)
+
+    async def test_book_list_keyset_pages(self):
+        await self.login()
+        resp = await self.async_client.get(reverse('books'))
+        self.assertAsyncView(resp, async_views.BookListView)
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Book %s' % num for num in range(5)])
+        resp = await self.async_client.get(reverse('books') + '?cursor=' + resp.context['page_obj'].next_cursor)
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Book 5', 'Book 6'])
+
+    async def test_book_list_page_number(self):
+        await self.login()
+        resp = await self.async_client.get(reverse('books') + '?page=2')
+        self.assertEqual(resp.context['page_obj'].number, 2)
+        self.assertEqual(len(resp.context['book_list']), 2)
+
+    async def test_book_list_requires_login(self):
+        resp = await self.async_client.get(reverse('books'))
+        self.assertRedirects(resp, '/accounts/login/?next=/catalog/books/', fetch_redirect_response=False)
+
+    async def test_book_detail(self):
+        for _ in range(2):
+            # La segunda vez con el fragmento ya en cache
+            resp = await self.async_client.get(reverse('book-detail', args=[self.book.pk]))
+            self.assertAsyncView(resp, async_views.BookDetailView)
+            self.assertContains(resp, 'Book 6')
+            self.assertContains(resp, 'Fantasy')
+
+    async def test_detail_not_found(self):
+        resp = await self.async_client.get(reverse('author-detail', args=[9999]))
+        self.assertEqual(resp.status_code, 404)
+
+    async def test_author_detail(self):
+        resp = await self.async_client.get(reverse('author-detail', args=[self.author.pk]))
+        self.assertAsyncView(resp, async_views.AuthorDetailView)
+        self.assertContains(resp, 'Book 0')
+
+    async def test_loan_lists(self):
+        await self.login()
+        resp = await self.async_client.get(reverse('my-borrowed'))
+        self.assertAsyncView(resp, async_views.LoanedBooksByUserListView)
+        self.assertEqual(len(resp.context['bookinstance_list']), 7)
+        resp = await self.async_client.get(reverse('loanedbooks'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['bookinstance_list']), 7)
+
+    async def test_performance_middleware_counts_async_queries(self):
+        await self.login()
+        resp = await self.async_client.get(reverse('books'))
+        self.assertRegex(resp['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* consultas"')
+
+    async def test_librarian_list_requires_permission(self):
+        await self.login('reader')
+        resp = await self.async_client.get(reverse('loanedbooks'))
+        self.assertEqual(resp.status_code, 403)
@@ -0,0 +1,120 @@
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import autocomplete
+from catalog.forms import BookForm
+from catalog.models import Author, Book, Genre, Language
+
+
+class AuthorSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        names = [('Miguel', 'Cervantes'), ('Luis', 'Cernuda'), ('Camilo José', 'Cela'), ('Cesar', 'Vallejo'), ('Ana', 'Matute')]
+        cls.authors = {last: Author.objects.create(first_name=first, last_name=last) for first, last in names}
+
+    def names(self, authors):
+        return [author.last_name for author in authors]
+
+    def test_last_name_then_first_name(self):
+        authors, more = autocomplete.search_authors('CE')
+        self.assertEqual(self.names(authors), ['Cela', 'Cernuda', 'Cervantes', 'Vallejo'])
+        self.assertFalse(more)
+
+    def test_last_and_first_name(self):
+        authors, _ = autocomplete.search_authors('cer, lu')
+        self.assertEqual(self.names(authors), ['Cernuda'])
+
+    def test_accents(self):
+        alvarez = Author.objects.create(first_name='Íñigo', last_name='Álvarez')
+        for term in ('álv', 'Álv', 'ALV', 'alvarez iñi', 'alvarez inigo'):
+            with self.subTest(term=term):
+                self.assertEqual(autocomplete.search_authors(term)[0], [alvarez])
+        self.assertEqual(list(autocomplete.filter_authors(Author.objects.all(), 'ÍÑIGO')), [alvarez])
+        # bulk_create tambien calcula las claves
+        Author.objects.bulk_create([Author(first_name='José', last_name='Échegaray')])
+        self.assertEqual(self.names(autocomplete.search_authors('eche')[0]), ['Échegaray'])
+
+    def test_limit(self):
+        authors, more = autocomplete.search_authors('ce', limit=2)
+        self.assertEqual(self.names(authors), ['Cela', 'Cernuda'])
+        self.assertTrue(more)
+        self.assertEqual(autocomplete.search_authors('  '), ([], False))
+
+    def test_uses_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN de SQLite')
+        queryset = autocomplete.authors_queryset().filter(autocomplete._prefix('last_name_key', 'cer'))
+        sql, params = queryset.order_by('last_name_key').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('author_last_name_key_idx', plan)
+        self.assertNotIn('SCAN catalog_author', plan.replace('USING INDEX', ''))
+
+    def test_endpoint(self):
+        url = reverse('author-autocomplete')
+        self.assertEqual(self.client.get(url, {'q': 'cer'}).status_code, 302)
+        User.objects.create_user(username='user', password='12345')
+        self.client.login(username='user', password='12345')
+        data = self.client.get(url, {'q': 'cerv'}).json()
+        self.assertEqual(data, {'results': [{'id': self.authors['Cervantes'].pk, 'text': 'Cervantes, Miguel'}], 'more': False})
+
+
+class AuthorWidgetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = Author.objects.bulk_create(Author(first_name='First', last_name='Last %03d' % num) for num in range(100))
+        cls.language = Language.objects.create(name='English')
+        cls.genre = Genre.objects.create(name='Genre')
+        cls.book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=cls.authors[42], language=cls.language)
+
+    def test_renders_only_selected_author(self):
+        html = BookForm(instance=self.book).as_p()
+        self.assertIn('Last 042, First', html)
+        self.assertNotIn('Last 041', html)
+        self.assertIn('data-url="%s"' % reverse('author-autocomplete'), html)
+
+    def test_rerenders_invalid_author(self):
+        form = BookForm(data={'title': 'New', 'summary': 'Summary', 'isbn': '123', 'author': 'abc'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('author', form.errors)
+        self.assertIn('value="abc"', form.as_p())
+
+    def test_create_view(self):
+        user = User.objects.create_user(username='librarian', password='12345')
+        user.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        self.client.login(username='librarian', password='12345')
+        resp = self.client.get(reverse('book-create'))
+        self.assertContains(resp, 'js/autocomplete.js')
+        self.assertNotContains(resp, 'Last 000')
+        resp = self.client.post(reverse('book-create'), {
+            'title': 'New', 'summary': 'Summary', 'isbn': '123', 'author': self.authors[7].pk,
+            'language': self.language.pk, 'genre': [self.genre.pk],
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(Book.objects.get(title='New').author, self.authors[7])
+
+
+class AuthorAdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.author = Author.objects.create(first_name='Miguel', last_name='Cervantes')
+        Author.objects.create(first_name='Ana', last_name='Matute')
+        Book.objects.create(title='Quijote', summary='Summary', isbn='ABCDEFG', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_search(self):
+        resp = self.client.get(reverse('admin:catalog_author_changelist'), {'q': 'cerv'})
+        self.assertEqual(list(resp.context['cl'].result_list), [self.author])
+
+    def test_inline_genre_autocomplete(self):
+        resp = self.client.get(reverse('admin:catalog_author_change', args=[self.author.pk]))
+        self.assertContains(resp, 'admin-autocomplete')
@@ -0,0 +1,112 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import availability
+from catalog.models import Author, Book, BookInstance, Language
+
+
+class AvailabilityTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        language = Language.objects.create(name='English')
+        cls.book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=author, language=language)
+        cls.other = Book.objects.create(title='Other', summary='Summary', isbn='ABCDEFG', author=author, language=language)
+        cls.due = datetime.date.today() + datetime.timedelta(days=5)
+
+    def summary(self, book):
+        book.refresh_from_db()
+        return book.copies_total, book.copies_available, book.next_due_back
+
+    def test_create_and_delete_copies(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='o', due_back=self.due)
+        self.assertEqual(self.summary(self.book), (2, 1, self.due))
+        copy.delete()
+        self.assertEqual(self.summary(self.book), (1, 0, self.due))
+
+    def test_status_change(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        copy = BookInstance.objects.get(pk=copy.pk)
+        copy.status = 'o'
+        copy.due_back = self.due
+        copy.save()
+        self.assertEqual(self.summary(self.book), (1, 0, self.due))
+
+    def test_copy_moved_to_other_book(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        copy = BookInstance.objects.get(pk=copy.pk)
+        copy.book = self.other
+        copy.save()
+        self.assertEqual(self.summary(self.book), (0, 0, None))
+        self.assertEqual(self.summary(self.other), (1, 1, None))
+
+    def test_stale_book_does_not_overwrite_summary(self):
+        stale = Book.objects.get(pk=self.book.pk)
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(self.summary(self.book), (1, 1, None))
+        self.assertEqual(self.book.title, 'Renamed')
+
+    def test_copy_with_pk_none(self):
+        book = Book.objects.get(pk=self.book.pk)
+        book.pk = None
+        book.save()
+        self.assertNotEqual(book.pk, self.book.pk)
+        self.assertEqual(Book.objects.get(pk=book.pk).title, 'Book')
+
+    def test_save_deferred_book(self):
+        book = Book.objects.only('title').get(pk=self.book.pk)
+        book.title = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            book.save()
+        # Solo se escriben las columnas cargadas, sin leer antes las diferidas
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE'))
+        self.assertNotIn('summary', queries[0]['sql'])
+        self.assertEqual(Book.objects.get(pk=self.book.pk).title, 'Renamed')
+
+    def test_rebuild_fixes_drift(self):
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        Book.objects.update(copies_total=7, copies_available=7)
+        out = io.StringIO()
+        call_command('rebuild_availability', stdout=out)
+        self.assertIn('2 libros', out.getvalue())
+        self.assertEqual(self.summary(self.book), (1, 1, None))
+        self.assertEqual(self.summary(self.other), (0, 0, None))
+
+    def test_refresh_ignores_missing_ids(self):
+        self.assertEqual(availability.refresh(None), 0)
+
+
+class BookListAvailabilityOrderTest(TestCase):
+
+    def setUp(self):
+        User.objects.create_user(username='testuser', password='12345')
+        self.client.login(username='testuser', password='12345')
+        for num, available in enumerate((1, 3, 0, 2)):
+            book = Book.objects.create(title='Book %s' % num, summary='Summary', isbn='ABCDEFG')
+            for _ in range(available):
+                BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+
+    def test_order_by_availability(self):
+        resp = self.client.get(reverse('books') + '?order=availability')
+        self.assertEqual([book.copies_available for book in resp.context['book_list']], [3, 2, 1, 0])
+        self.assertFalse(resp.context['page_obj'].has_next())
+
+    def test_cursor_keeps_order(self):
+        for num in (4, 5):
+            Book.objects.create(title='Book %s' % num, summary='Summary', isbn='ABCDEFG')
+        resp = self.client.get(reverse('books') + '?order=availability')
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Book 1', 'Book 3', 'Book 0', 'Book 2', 'Book 4'])
+        cursor = resp.context['page_obj'].next_cursor
+        resp = self.client.get(reverse('books') + '?order=availability&cursor=' + cursor)
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Book 5'])
@@ -0,0 +1,56 @@
+from django.test import Client, TestCase
+
+from catalog import bench, search, urls
+from catalog.models import Book
+
+
+class BenchHarnessTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        bench.seed_catalog(num_instances=50, num_books=10, num_users=5, num_genres=3)
+        cls.user = bench.bench_user()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(bench.percentile(values, 50), 50)
+        self.assertEqual(bench.percentile(values, 99), 99)
+        self.assertEqual(bench.percentile([7], 95), 7)
+        self.assertIsNone(bench.percentile([], 50))
+
+    def test_routes_cover_catalog_urls(self):
+        routes = bench.catalog_routes()
+        self.assertEqual(set(routes), {pattern.name for pattern in urls.urlpatterns} - bench.POST_ONLY_ROUTES)
+
+    def test_client_benchmark(self):
+        client = Client()
+        client.force_login(self.user)
+        routes = bench.catalog_routes()
+        results = bench.bench_client(client, routes, iterations=2)
+        for name, row in results.items():
+            self.assertEqual(row['errors'], 0, name)
+            self.assertEqual(row['requests'], 2)
+            self.assertIsNotNone(row['queries'])
+
+    def test_compare_results(self):
+        old = {'client': {'books': {'p50_ms': 10.0, 'queries': 4}}}
+        new = {'client': {'books': {'p50_ms': 5.0, 'queries': 4}}}
+        self.assertEqual(bench.compare_results(old, new), [
+            ('client', 'books', 'p50_ms', 10.0, 5.0, -50.0),
+            ('client', 'books', 'queries', 4, 4, 0.0),
+        ])
+
+
+class SearchBenchTest(TestCase):
+
+    def test_search_benchmark(self):
+        vocabulary = bench.seed_search_books(50, vocabulary_size=100)
+        queries = bench.search_queries(vocabulary)
+        for backend in (search.FTS5Backend(), search.InMemoryBackend()):
+            backend.rebuild()
+            results = bench.bench_search(backend, queries, repeat=2)
+            self.assertEqual(set(results), set(queries))
+            # La palabra mas frecuente aparece en casi todos los libros
+            self.assertGreater(results['comun']['results'], 25)
+            self.assertGreaterEqual(results['prefijo']['results'], results['media']['results'])
+            self.assertEqual(bench.bench_search_updates(backend, [Book.objects.values_list('pk', flat=True).first()])['requests'], 1)
@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase, override_settings
+
+from catalog import checks
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+FILES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/catalog-cache'}}
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+
+    @override_settings(CATALOG_SHARED_CACHE_REQUIRED=True, CACHES=LOCMEM)
+    def test_process_local_cache_in_production(self):
+        self.assertEqual([error.id for error in checks.check_shared_cache(None)], ['catalog.E001'])
+
+    @override_settings(CATALOG_SHARED_CACHE_REQUIRED=False, CACHES=LOCMEM)
+    def test_process_local_cache_allowed(self):
+        self.assertEqual(checks.check_shared_cache(None), [])
+
+    @override_settings(CATALOG_SHARED_CACHE_REQUIRED=True, CACHES=FILES)
+    def test_shared_cache(self):
+        self.assertEqual(checks.check_shared_cache(None), [])
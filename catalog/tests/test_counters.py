@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from io import StringIO
+
+from catalog import counters
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class CountersTest(TestCase):
+
+    def setUp(self):
+        # La cache no se deshace con la transaccion de cada test
+        cache.clear()
+        self.author = Author.objects.create(first_name='John', last_name='Smith')
+        self.language = Language.objects.create(name='English')
+        self.book = Book.objects.create(title='Guerra y paz', summary='Resumen', isbn='ABCDEFG', author=self.author, language=self.language)
+        Genre.objects.create(name='Fantasy')
+        self.copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='m')
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+
+    def test_recount(self):
+        values = counters.get_counters()
+        self.assertEqual(values, {
+            'num_books': 1,
+            'num_instances': 2,
+            'num_instances_available': 1,
+            'num_authors': 1,
+            'num_generos': 1,
+            'num_libros_con_y': 1,
+        })
+
+    def test_cached_counters_need_no_queries(self):
+        counters.get_counters()
+        with self.assertNumQueries(0):
+            counters.get_counters()
+
+    def test_status_change_adjusts_available(self):
+        counters.get_counters()
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        copy.status = 'a'
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.get_counters()['num_instances_available'], 2)
+
+    def test_create_and_delete_adjust_counters(self):
+        counters.get_counters()
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(title='Tom y Jerry', summary='Resumen', isbn='1234567', author=self.author, language=self.language)
+            Author.objects.create(first_name='Ann', last_name='Other')
+        values = counters.get_counters()
+        self.assertEqual(values['num_books'], 2)
+        self.assertEqual(values['num_libros_con_y'], 2)
+        self.assertEqual(values['num_authors'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+            self.copy.delete()
+        values = counters.get_counters()
+        self.assertEqual(values['num_books'], 1)
+        self.assertEqual(values['num_libros_con_y'], 1)
+        self.assertEqual(values['num_instances'], 1)
+        self.assertEqual(values['num_instances_available'], 1)
+
+    def test_index_runs_no_count_queries(self):
+        counters.get_counters()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['num_books'], 1)
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_recount_command_fixes_drift(self):
+        counters.get_counters()
+        cache.set(counters.KEY_PREFIX + 'num_books', 99)
+        call_command('recount_counters', stdout=StringIO())
+        self.assertEqual(counters.get_counters()['num_books'], 1)
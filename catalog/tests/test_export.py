@@ -0,0 +1,155 @@
+import csv
+import datetime
+import json
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import refdata
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class ExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='Miguel', last_name='Cervantes')
+        language = Language.objects.create(name='Español')
+        cls.quijote = Book.objects.create(title='Don Quijote', summary='Hidalgo', isbn='1', author=author, language=language)
+        cls.quijote.genre.add(Genre.objects.create(name='Novela'))
+        cls.copies = [
+            BookInstance.objects.create(book=cls.quijote, imprint='Cátedra', status='a'),
+            BookInstance.objects.create(book=cls.quijote, imprint='Austral', status='o', due_back=datetime.date(2030, 1, 1)),
+        ]
+        cls.galatea = Book.objects.create(title='La Galatea', summary='Pastores', isbn='2', author=author, language=language)
+        # Todo lo anterior queda "antiguo" para probar la exportacion incremental
+        long_ago = timezone.now() - datetime.timedelta(days=30)
+        Book.objects.update(updated_at=long_ago)
+        BookInstance.objects.update(updated_at=long_ago)
+        Author.objects.update(updated_at=long_ago)
+
+        cls.librarian = User.objects.create_user(username='librarian', password='12345')
+        cls.librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+
+    def setUp(self):
+        # Los tests renombran generos e idiomas: copia en memoria limpia en cada uno
+        cache.clear()
+        refdata.genres.reset()
+        refdata.languages.reset()
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_catalog', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_jsonl_export(self):
+        records = [json.loads(line) for line in self.export('--format', 'jsonl').splitlines()]
+        self.assertEqual([record['title'] for record in records], ['Don Quijote', 'La Galatea'])
+        self.assertEqual(records[0]['author'], 'Cervantes, Miguel')
+        self.assertEqual(records[0]['genres'], ['Novela'])
+        self.assertEqual(sorted(copy['imprint'] for copy in records[0]['copies']), ['Austral', 'Cátedra'])
+        self.assertEqual(records[1]['copies'], [])
+
+    def test_csv_export_has_one_row_per_copy(self):
+        rows = list(csv.DictReader(StringIO(self.export('--format', 'csv'))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['copy_id'] for row in rows}, {str(copy.pk) for copy in self.copies} | {''})
+
+    def test_incremental_export_only_includes_changes(self):
+        since = timezone.now() - datetime.timedelta(days=1)
+        copy = BookInstance.objects.get(pk=self.copies[1].pk)
+        copy.status = 'a'
+        copy.save()
+        records = [json.loads(line) for line in self.export('--since', since.isoformat()).splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual([c['id'] for c in records[0]['copies']], [str(copy.pk)])
+
+    def test_incremental_export_includes_author_rename(self):
+        since = timezone.now() - datetime.timedelta(days=1)
+        author = Author.objects.get()
+        author.last_name = 'de Cervantes'
+        author.save()
+        records = [json.loads(line) for line in self.export('--since', since.isoformat()).splitlines()]
+        self.assertEqual([record['author'] for record in records], ['de Cervantes, Miguel'] * 2)
+
+    def test_incremental_export_includes_genre_changes(self):
+        since = timezone.now() - datetime.timedelta(days=1)
+        poesia = Genre.objects.create(name='Poesía')
+        self.galatea.genre.add(poesia)
+        records = [json.loads(line) for line in self.export('--since', since.isoformat()).splitlines()]
+        self.assertEqual([(record['title'], record['genres']) for record in records], [('La Galatea', ['Poesía'])])
+
+        # Desde el genero: al vaciarlo cambian los libros que lo tenian
+        Book.objects.update(updated_at=since - datetime.timedelta(days=1))
+        poesia.book_set.clear()
+        records = [json.loads(line) for line in self.export('--since', since.isoformat()).splitlines()]
+        self.assertEqual([(record['title'], record['genres']) for record in records], [('La Galatea', [])])
+
+    def test_incremental_export_includes_reference_renames(self):
+        since = timezone.now() - datetime.timedelta(days=1)
+        genre = Genre.objects.get()
+        genre.name = 'Narrativa'
+        genre.save()
+        records = [json.loads(line) for line in self.export('--since', since.isoformat()).splitlines()]
+        self.assertEqual([(record['title'], record['genres']) for record in records], [('Don Quijote', ['Narrativa'])])
+
+        Book.objects.update(updated_at=since - datetime.timedelta(days=1))
+        language = Language.objects.get()
+        language.name = 'Castellano'
+        language.save()
+        records = [json.loads(line) for line in self.export('--since', since.isoformat()).splitlines()]
+        self.assertEqual([record['language'] for record in records], ['Castellano'] * 2)
+
+        Book.objects.update(updated_at=since - datetime.timedelta(days=1))
+        language.delete()
+        records = [json.loads(line) for line in self.export('--since', since.isoformat()).splitlines()]
+        self.assertEqual([record['language'] for record in records], [None] * 2)
+
+    def test_incremental_export_includes_deletions(self):
+        since = timezone.now() - datetime.timedelta(days=1)
+        copy_id = self.copies[0].pk
+        self.copies[0].delete()
+        galatea_id = self.galatea.pk
+        self.galatea.delete()
+        records = [json.loads(line) for line in self.export('--since', since.isoformat()).splitlines()]
+        deletions = [{key: record[key] for key in ('deleted', 'id', 'book_id') if key in record} for record in records]
+        self.assertEqual(deletions, [
+            {'deleted': 'copy', 'id': str(copy_id), 'book_id': self.quijote.pk},
+            {'deleted': 'book', 'id': galatea_id},
+        ])
+
+        rows = list(csv.DictReader(StringIO(self.export('--since', since.isoformat(), '--format', 'csv'))))
+        self.assertEqual(
+            [(row['deleted'], row['book_id'], row['copy_id']) for row in rows],
+            [('copy', str(self.quijote.pk), str(copy_id)), ('book', str(galatea_id), '')],
+        )
+        # En la exportacion completa no hay borrados
+        self.assertNotIn('deleted', self.export())
+
+    def test_next_since_has_margin(self):
+        err = StringIO()
+        call_command('export_catalog', stdout=StringIO(), stderr=err)
+        marker = datetime.datetime.fromisoformat(err.getvalue().split(': ', 1)[1].strip())
+        self.assertLess(marker, timezone.now() - datetime.timedelta(seconds=250))
+
+    def test_streaming_view(self):
+        self.client.login(username='librarian', password='12345')
+        resp = self.client.get(reverse('export-catalog'), {'format': 'ndjson'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertIn('X-Export-Timestamp', resp)
+        self.assertEqual(len(b''.join(resp.streaming_content).splitlines()), 2)
+
+    def test_view_requires_permission(self):
+        resp = self.client.get(reverse('export-catalog'))
+        self.assertEqual(resp.status_code, 302)
+
+    def test_view_rejects_bad_since(self):
+        self.client.login(username='librarian', password='12345')
+        resp = self.client.get(reverse('export-catalog'), {'since': 'ayer'})
+        self.assertEqual(resp.status_code, 400)
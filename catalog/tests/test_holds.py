@@ -0,0 +1,166 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import counters, holds, loans
+from catalog.models import Author, Book, BookInstance, Hold
+
+
+class HoldQueueTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=author)
+        cls.other_book = Book.objects.create(title='Other', summary='Summary', isbn='HIJKLMN', author=author)
+        cls.patrons = [User.objects.create_user(username='patron%s' % num, password='12345') for num in range(3)]
+        cls.due = datetime.date.today() + datetime.timedelta(weeks=2)
+
+    def setUp(self):
+        cache.clear()
+        self.copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='o', due_back=self.due)
+
+    def give_back(self, copy):
+        copy.status = 'a'
+        copy.borrower = None
+        copy.due_back = None
+        copy.save()
+
+    def test_queue_order(self):
+        now = timezone.now()
+        late = Hold.objects.create(book=self.book, patron=self.patrons[0], requested_at=now)
+        early = Hold.objects.create(book=self.book, patron=self.patrons[1], requested_at=now - datetime.timedelta(days=1))
+        urgent = Hold.objects.create(book=self.book, patron=self.patrons[2], priority=Hold.URGENT, requested_at=now)
+        Hold.objects.create(book=self.other_book, patron=self.patrons[0])
+        self.assertEqual(list(Hold.objects.queue(self.book.pk)), [urgent, early, late])
+
+    def test_queue_uses_partial_index(self):
+        plan = Hold.objects.queue(self.book.pk)[:1].explain()
+        self.assertIn('hold_queue_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_place_waits_while_no_copy_is_available(self):
+        hold = holds.place(self.book, self.patrons[0])
+        self.assertEqual((hold.status, hold.copy), (Hold.WAITING, None))
+        with self.assertRaises(holds.HoldError):
+            holds.place(self.book, self.patrons[0])
+
+    def test_place_takes_an_available_copy(self):
+        self.give_back(self.copy)
+        hold = holds.place(self.book, self.patrons[0])
+        self.assertEqual((hold.status, hold.copy_id), (Hold.READY, self.copy.pk))
+        self.copy.refresh_from_db()
+        self.assertEqual((self.copy.status, self.copy.borrower), ('r', self.patrons[0]))
+
+    def test_returned_copy_goes_to_head_of_queue(self):
+        first = holds.place(self.book, self.patrons[0])
+        second = holds.place(self.book, self.patrons[1])
+        counters.recount()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.give_back(self.copy)
+
+        self.copy.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual((self.copy.status, self.copy.borrower), ('r', self.patrons[0]))
+        self.assertEqual((first.status, first.copy), (Hold.READY, self.copy))
+        self.assertEqual(self.copy.due_back, timezone.localdate(first.pickup_by))
+        self.assertEqual(Hold.objects.get(pk=second.pk).status, Hold.WAITING)
+        # La copia reservada no cuenta como disponible
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 0)
+        self.assertEqual(counters.get_counters()['num_instances_available'], 0)
+
+    def test_return_without_holds_leaves_copy_available(self):
+        self.give_back(self.copy)
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, 'a')
+
+    def test_allocation_queries_are_constant(self):
+        for patron in self.patrons:
+            holds.place(self.book, patron)
+        # Los dos save() de la copia con sus datos derivados, la cabeza de la
+        # cola, la comprobacion de la copia, el UPDATE de la reserva y los savepoints
+        with self.assertNumQueries(15):
+            self.give_back(self.copy)
+
+    def test_batch_return_allocates(self):
+        holds.place(self.book, self.patrons[0])
+        loans.apply(loans.RETURN, [self.copy.pk])
+        self.copy.refresh_from_db()
+        self.assertEqual((self.copy.status, self.copy.borrower), ('r', self.patrons[0]))
+
+    def test_cancel_passes_copy_to_next_hold(self):
+        first = holds.place(self.book, self.patrons[0])
+        second = holds.place(self.book, self.patrons[1])
+        self.give_back(self.copy)
+        first.refresh_from_db()
+        holds.cancel(first)
+
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.copy_id), (Hold.READY, self.copy.pk))
+        self.assertEqual(Hold.objects.get(pk=first.pk).status, Hold.CANCELLED)
+        with self.assertRaises(holds.HoldError):
+            holds.cancel(first)
+
+    def test_expire(self):
+        hold = holds.place(self.book, self.patrons[0])
+        self.give_back(self.copy)
+        self.assertEqual(holds.expire(), 0)
+        self.assertEqual(holds.expire(now=timezone.now() + datetime.timedelta(days=30)), 1)
+        hold.refresh_from_db()
+        self.copy.refresh_from_db()
+        self.assertEqual(hold.status, Hold.EXPIRED)
+        self.assertEqual((self.copy.status, self.copy.borrower), ('a', None))
+
+    def test_fulfil(self):
+        hold = holds.place(self.book, self.patrons[0])
+        self.give_back(self.copy)
+        hold.refresh_from_db()
+        holds.fulfil(hold, self.due)
+        self.copy.refresh_from_db()
+        self.assertEqual((self.copy.status, self.copy.borrower, self.copy.due_back), ('o', self.patrons[0], self.due))
+        self.assertEqual(hold.status, Hold.FULFILLED)
+
+    def test_one_active_hold_per_patron(self):
+        Hold.objects.create(book=self.book, patron=self.patrons[0])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Hold.objects.create(book=self.book, patron=self.patrons[0])
+        # Una reserva cerrada no impide volver a reservar
+        Hold.objects.filter(patron=self.patrons[0]).update(status=Hold.FULFILLED)
+        Hold.objects.create(book=self.book, patron=self.patrons[0])
+
+    def test_place_race_raises_hold_error(self):
+        Hold.objects.create(book=self.book, patron=self.patrons[0])
+        # La otra peticion crea su reserva entre la comprobacion y el INSERT
+        with mock.patch('django.db.models.query.QuerySet.exists', return_value=False):
+            with self.assertRaises(holds.HoldError):
+                holds.place(self.book, self.patrons[0])
+        self.assertEqual(Hold.objects.filter(patron=self.patrons[0]).count(), 1)
+
+
+class PlaceHoldViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=author)
+        cls.user = User.objects.create_user(username='patron', password='12345')
+
+    def test_requires_login_and_post(self):
+        url = reverse('book-hold', args=[self.book.pk])
+        self.assertEqual(self.client.post(url).status_code, 302)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_place_hold(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('book-hold', args=[self.book.pk]), follow=True)
+        self.assertRedirects(response, self.book.get_absolute_url())
+        self.assertContains(response, 'Reserva registrada')
+        self.assertTrue(Hold.objects.waiting().filter(book=self.book, patron=self.user).exists())
@@ -0,0 +1,82 @@
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from catalog import counters
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class ImportCatalogCommandTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Author.objects.create(first_name='Miguel', last_name='Cervantes')
+        Genre.objects.create(name='Novela')
+
+    def write(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_csv(self):
+        path = self.write('.csv', (
+            'title,summary,isbn,author_first_name,author_last_name,language,genres,copies,status\n'
+            'Don Quijote,Hidalgo,1,Miguel,Cervantes,Español,Novela|Clasico,3,a\n'
+            'La Galatea,Pastores,2,Miguel,Cervantes,Español,Novela,2,m\n'
+            'Hamlet,Principe,3,William,Shakespeare,English,Teatro,0,a\n'
+        ))
+        call_command('import_catalog', path, '--batch-size', '2', stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 3)
+        self.assertEqual(Language.objects.count(), 2)
+        quijote = Book.objects.get(title='Don Quijote')
+        self.assertEqual(quijote.author.last_name, 'Cervantes')
+        self.assertEqual(sorted(quijote.genre.values_list('name', flat=True)), ['Clasico', 'Novela'])
+        self.assertEqual(quijote.bookinstance_set.filter(status='a').count(), 3)
+        self.assertEqual(counters.get_counters()['num_instances_available'], 3)
+
+    def test_import_jsonl_with_copy_list(self):
+        row = {
+            'title': 'Novelas ejemplares', 'author_first_name': 'Miguel', 'author_last_name': 'Cervantes',
+            'genres': ['Novela'],
+            'copies': [{'imprint': 'Cátedra', 'status': 'o', 'due_back': '2030-01-01'}, {'imprint': 'Austral'}],
+        }
+        path = self.write('.jsonl', json.dumps(row) + '\n')
+        call_command('import_catalog', path, stdout=StringIO(), stderr=StringIO())
+        book = Book.objects.get()
+        self.assertEqual(book.author, Author.objects.get(last_name='Cervantes'))
+        self.assertEqual(sorted(book.bookinstance_set.values_list('imprint', 'status')), [('Austral', 'a'), ('Cátedra', 'o')])
+        self.assertEqual((book.copies_total, book.copies_available, book.next_due_back), (2, 1, datetime.date(2030, 1, 1)))
+
+    def test_invalid_row_reports_line(self):
+        path = self.write('.csv', 'title,copies\nBueno,1\n,1\n')
+        counters.get_counters()
+        with self.assertRaisesMessage(CommandError, 'Linea 3'):
+            call_command('import_catalog', path, '--batch-size', '1', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(BookInstance.objects.count(), 1)
+        # Los lotes ya confirmados cuentan en los contadores
+        self.assertEqual(counters.get_counters()['num_books'], 1)
+
+    def test_malformed_jsonl_reports_line(self):
+        lines = {
+            '[1, 2]': 'se esperaba un objeto',
+            '{"title": 5}': 'valor no valido',
+            '{"title": "Libro", "copies": [{"due_back": 20300101}]}': 'due_back',
+            '{"title": "Libro", "copies": ["x"]}': 'cada copia',
+            '{"title": "Libro", "copies": {"n": 2}}': 'copies debe ser un numero',
+        }
+        for line, message in lines.items():
+            with self.subTest(line=line):
+                path = self.write('.jsonl', '{"title": "Bueno"}\n' + line + '\n')
+                with self.assertRaisesMessage(CommandError, 'Linea 2: ' + message):
+                    call_command('import_catalog', path, stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,137 @@
+import datetime
+import uuid
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import counters, loans
+from catalog.forms import BatchLoanForm
+from catalog.models import Author, Book, BookInstance
+
+
+class LoanServiceTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron', password='12345')
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=author)
+        cls.due = datetime.date.today() + datetime.timedelta(weeks=2)
+
+    def setUp(self):
+        cache.clear()
+        self.copies = [BookInstance.objects.create(book=self.book, imprint='Imprint', status='a') for _ in range(5)]
+        self.ids = [copy.pk for copy in self.copies]
+
+    def test_check_out_and_return(self):
+        counters.recount()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(loans.apply(loans.CHECK_OUT, self.ids, borrower=self.patron, due_back=self.due), 5)
+        self.assertEqual(BookInstance.objects.filter(status='o', borrower=self.patron, due_back=self.due).count(), 5)
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.copies_available, self.book.next_due_back), (0, self.due))
+        self.assertEqual(counters.get_counters()['num_instances_available'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            loans.apply(loans.RETURN, self.ids[:2])
+        self.assertEqual(BookInstance.objects.filter(status='a', borrower=None, due_back=None).count(), 2)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 2)
+        self.assertEqual(counters.get_counters()['num_instances_available'], 2)
+
+    def test_renew(self):
+        loans.apply(loans.CHECK_OUT, self.ids, borrower=self.patron, due_back=self.due)
+        later = self.due + datetime.timedelta(days=3)
+        loans.apply(loans.RENEW, self.ids, due_back=later)
+        self.assertEqual(BookInstance.objects.filter(due_back=later, status='o').count(), 5)
+
+    def test_nothing_changes_if_one_copy_is_not_available(self):
+        BookInstance.objects.filter(pk=self.ids[3]).update(status='m')
+        missing = uuid.uuid4()
+        with self.assertRaises(loans.LoanError) as ctx:
+            loans.apply(loans.CHECK_OUT, self.ids + [missing], borrower=self.patron, due_back=self.due)
+        self.assertEqual([pk for pk, _ in ctx.exception.problems], [missing, self.ids[3]])
+        self.assertFalse(BookInstance.objects.filter(status='o').exists())
+
+    def test_cannot_lend_twice(self):
+        loans.apply(loans.CHECK_OUT, self.ids[:1], borrower=self.patron, due_back=self.due)
+        with self.assertRaises(loans.LoanError):
+            loans.apply(loans.CHECK_OUT, self.ids[:1], borrower=self.patron, due_back=self.due)
+
+    def test_constant_queries(self):
+        many = self.ids + [BookInstance.objects.create(book=self.book, imprint='Imprint', status='a').pk for _ in range(20)]
+        with self.assertNumQueries(6):
+            loans.apply(loans.CHECK_OUT, self.ids, borrower=self.patron, due_back=self.due)
+        # Mas la busqueda de reservas en espera de los libros devueltos
+        with self.assertNumQueries(7):
+            loans.apply(loans.RETURN, self.ids)
+        with self.assertNumQueries(6):
+            loans.apply(loans.CHECK_OUT, many, borrower=self.patron, due_back=self.due)
+
+
+class BatchLoanFormTest(TestCase):
+
+    def setUp(self):
+        User.objects.create_user(username='patron', password='12345')
+        self.ids = [str(uuid.uuid4()) for _ in range(3)]
+        self.due = datetime.date.today() + datetime.timedelta(weeks=1)
+
+    def test_parses_ids(self):
+        form = BatchLoanForm(data={'action': 'return', 'copies': '%s, %s\n%s\n%s' % (*self.ids, self.ids[0])})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['copies'], [uuid.UUID(pk) for pk in self.ids])
+
+    def test_invalid_id(self):
+        form = BatchLoanForm(data={'action': 'return', 'copies': self.ids[0] + ' nope'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('nope', form.errors['copies'][0])
+
+    def test_check_out_needs_borrower_and_date(self):
+        form = BatchLoanForm(data={'action': 'checkout', 'copies': self.ids[0]})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'borrower', 'due_back'})
+
+    def test_due_back_same_rules_as_renewal(self):
+        for due_back in (datetime.date.today() - datetime.timedelta(days=1), datetime.date.today() + datetime.timedelta(weeks=4, days=1)):
+            form = BatchLoanForm(data={'action': 'renew', 'copies': self.ids[0], 'due_back': due_back})
+            self.assertFalse(form.is_valid())
+            self.assertIn('due_back', form.errors)
+
+    def test_unknown_borrower(self):
+        form = BatchLoanForm(data={'action': 'checkout', 'copies': self.ids[0], 'borrower': 'nobody', 'due_back': self.due})
+        self.assertFalse(form.is_valid())
+        self.assertIn('borrower', form.errors)
+
+
+class BatchLoanViewTest(TestCase):
+
+    def setUp(self):
+        librarian = User.objects.create_user(username='librarian', password='12345')
+        librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        User.objects.create_user(username='patron', password='12345')
+        User.objects.create_user(username='reader', password='12345')
+        book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG')
+        self.ids = [BookInstance.objects.create(book=book, imprint='Imprint', status='a').pk for _ in range(3)]
+        self.due = datetime.date.today() + datetime.timedelta(weeks=1)
+
+    def post(self, **data):
+        return self.client.post(reverse('batch-loans'), data)
+
+    def test_requires_permission(self):
+        self.client.login(username='reader', password='12345')
+        self.assertEqual(self.client.get(reverse('batch-loans')).status_code, 302)
+
+    def test_check_out(self):
+        self.client.login(username='librarian', password='12345')
+        resp = self.post(action='checkout', copies='\n'.join(map(str, self.ids)), borrower='patron', due_back=self.due)
+        self.assertRedirects(resp, reverse('batch-loans'), fetch_redirect_response=False)
+        self.assertEqual(BookInstance.objects.filter(status='o', borrower__username='patron').count(), 3)
+        self.assertContains(self.client.get(reverse('batch-loans')), 'Prestar: 3 copias')
+
+    def test_conflict_is_reported(self):
+        self.client.login(username='librarian', password='12345')
+        resp = self.post(action='return', copies=str(self.ids[0]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('%s: esta en estado Available' % self.ids[0], resp.context['form'].errors['copies'])
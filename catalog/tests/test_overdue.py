@@ -0,0 +1,101 @@
+import datetime
+import io
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog.models import Book, BookInstance
+
+
+class OverdueTestData:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        cls.ana = User.objects.create_user(username='ana', password='12345', email='ana@example.com')
+        cls.luis = User.objects.create_user(username='luis', password='12345')
+        book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG')
+
+        def copy(days_ago, borrower, status='o'):
+            due_back = cls.today - datetime.timedelta(days=days_ago)
+            return BookInstance.objects.create(book=book, imprint='Imprint', status=status, due_back=due_back, borrower=borrower)
+
+        cls.ana_late = [copy(10, cls.ana), copy(3, cls.ana)]
+        cls.luis_late = copy(1, cls.luis)
+        cls.due_today = copy(0, cls.luis)
+        cls.not_due = copy(-5, cls.ana)
+        # Con fecha pasada pero ya no prestada
+        cls.maintenance = copy(20, None, status='m')
+
+
+class OverdueQuerySetTest(OverdueTestData, TestCase):
+
+    def test_overdue(self):
+        self.assertCountEqual(BookInstance.objects.overdue(), self.ana_late + [self.luis_late])
+        self.assertCountEqual(BookInstance.objects.overdue(min_days=3), self.ana_late)
+
+    def test_annotations_match_property(self):
+        copies = BookInstance.objects.with_overdue()
+        self.assertEqual(
+            {copy.pk: (copy.is_overdue, copy.days_overdue) for copy in copies},
+            {
+                self.ana_late[0].pk: (True, 10),
+                self.ana_late[1].pk: (True, 3),
+                self.luis_late.pk: (True, 1),
+                self.due_today.pk: (False, 0),
+                self.not_due.pk: (False, 0),
+                self.maintenance.pk: (False, 0),
+            },
+        )
+        for copy in BookInstance.objects.all():
+            self.assertEqual(copy.is_overdue, copy.pk in {c.pk for c in self.ana_late + [self.luis_late]})
+
+    def test_filter_on_annotation(self):
+        self.assertEqual(BookInstance.objects.with_overdue().filter(days_overdue__gte=3).count(), 2)
+
+    def test_by_borrower(self):
+        rows = list(BookInstance.objects.overdue_by_borrower().values_list('borrower__username', 'loans', 'max_days_overdue'))
+        self.assertEqual(rows, [('ana', 2, 10), ('luis', 1, 1)])
+
+
+class OverdueLoansViewTest(OverdueTestData, TestCase):
+
+    def setUp(self):
+        librarian = User.objects.create_user(username='librarian', password='12345')
+        librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        self.client.login(username='librarian', password='12345')
+
+    def test_requires_permission(self):
+        self.client.login(username='ana', password='12345')
+        self.assertEqual(self.client.get(reverse('overdue-loans')).status_code, 403)
+
+    def test_lists_most_overdue_first(self):
+        resp = self.client.get(reverse('overdue-loans'))
+        self.assertEqual(resp.context['num_overdue'], 3)
+        self.assertEqual(list(resp.context['bookinstance_list']), [self.ana_late[0], self.ana_late[1], self.luis_late])
+        self.assertContains(resp, '10 días')
+
+    def test_filters(self):
+        resp = self.client.get(reverse('overdue-loans'), {'borrower': 'luis'})
+        self.assertEqual(list(resp.context['bookinstance_list']), [self.luis_late])
+        resp = self.client.get(reverse('overdue-loans'), {'min_days': '5'})
+        self.assertEqual(list(resp.context['bookinstance_list']), [self.ana_late[0]])
+
+    def test_librarian_list_uses_annotation(self):
+        resp = self.client.get(reverse('loanedbooks'))
+        self.assertEqual(sum('_is_overdue' in copy.__dict__ for copy in resp.context['bookinstance_list']), 5)
+
+
+class OverdueReportCommandTest(OverdueTestData, TestCase):
+
+    def test_report(self):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('overdue_report', stdout=out, stderr=err)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'borrower_id,username,email,loans,oldest_due_back,max_days_overdue')
+        self.assertEqual(lines[1], '%d,ana,ana@example.com,2,%s,10' % (self.ana.pk, self.ana_late[0].due_back))
+        self.assertEqual(len(lines), 3)
+        self.assertIn('3 copias atrasadas de 2 usuarios', err.getvalue())
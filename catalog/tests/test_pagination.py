@@ -0,0 +1,87 @@
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance
+from catalog.pagination import InvalidCursor, KeysetPaginator
+
+
+class KeysetPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Apellidos repetidos para comprobar el desempate por pk
+        for num in range(7):
+            Author.objects.create(first_name='Name %s' % num, last_name='Surname %s' % (num // 2))
+        book = Book.objects.create(title='Book', summary='Summary', isbn='1')
+        today = datetime.date.today()
+        for num in range(7):
+            due_back = None if num % 3 == 0 else today + datetime.timedelta(days=num % 2)
+            BookInstance.objects.create(book=book, imprint='Imprint', due_back=due_back)
+
+    def walk(self, queryset, ordering, per_page=2):
+        """
+        Recorre todas las paginas hacia delante y luego hacia atras
+        """
+        paginator = KeysetPaginator(queryset, per_page, ordering)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        forward = [obj.pk for page in pages for obj in page]
+        backward = [[obj.pk for obj in pages[-1]]]
+        page = pages[-1]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            backward.insert(0, [obj.pk for obj in page])
+        self.assertEqual(backward, [[obj.pk for obj in page] for page in pages])
+        return forward
+
+    def test_matches_offset_ordering(self):
+        for ordering in (('last_name', 'pk'), ('-last_name', 'pk'), ('-pk',)):
+            expected = list(Author.objects.order_by(*ordering).values_list('pk', flat=True))
+            self.assertEqual(self.walk(Author.objects.all(), ordering), expected)
+
+    def test_nullable_field(self):
+        queryset = BookInstance.objects.all()
+        nulls = sorted(BookInstance.objects.filter(due_back__isnull=True).values_list('pk', flat=True))
+        dated = BookInstance.objects.filter(due_back__isnull=False).values_list('pk', flat=True)
+        # NULL primero en orden ascendente y al final en descendente
+        self.assertEqual(self.walk(queryset, ('due_back', 'pk')), nulls + list(dated.order_by('due_back', 'pk')))
+        self.assertEqual(self.walk(queryset, ('-due_back', 'pk'), per_page=3), list(dated.order_by('-due_back', 'pk')) + nulls)
+
+    def test_first_page_has_no_count_query(self):
+        paginator = KeysetPaginator(Author.objects.all(), 3, ('last_name', 'pk'))
+        with self.assertNumQueries(1):
+            page = paginator.page()
+            self.assertTrue(page.has_next())
+            self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Author.objects.all(), 3, ('last_name', 'pk'))
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+
+
+class AuthorListCursorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for num in range(13):
+            Author.objects.create(first_name='Christian %s' % num, last_name='Surname %02d' % num)
+
+    def test_next_cursor_link(self):
+        resp = self.client.get(reverse('authors'))
+        next_cursor = resp.context['page_obj'].next_cursor
+        self.assertContains(resp, '?cursor=%s' % next_cursor, count=1)
+        self.assertNotContains(resp, 'anterior')
+
+        resp = self.client.get(reverse('authors'), {'cursor': next_cursor})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['author_list']), 3)
+        self.assertFalse(resp.context['page_obj'].has_next())
+        self.assertContains(resp, '?cursor=%s' % resp.context['page_obj'].previous_cursor)
+
+    def test_invalid_cursor_is_404(self):
+        resp = self.client.get(reverse('authors'), {'cursor': '!!'})
+        self.assertEqual(resp.status_code, 404)
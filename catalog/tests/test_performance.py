@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import performance
+from catalog.models import Author, Book
+
+
+class PerformanceMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='staff', password='12345', is_staff=True)
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        for num in range(3):
+            Book.objects.create(title='Book %s' % num, summary='Summary', isbn='ABCDEFG', author=author)
+
+    def setUp(self):
+        performance.reset()
+        self.client.login(username='staff', password='12345')
+
+    def test_server_timing_header(self):
+        resp = self.client.get(reverse('books'))
+        timing = resp['Server-Timing']
+        self.assertRegex(timing, r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* consultas", tpl;dur=[\d.]+;desc="catalog/book_list.html"$')
+
+    def test_histograms_by_url_name(self):
+        for _ in range(3):
+            self.client.get(reverse('books'))
+        self.client.get(reverse('authors'))
+        stats = performance.snapshot()
+        self.assertEqual(stats['books']['total_ms']['count'], 3)
+        self.assertEqual(stats['authors']['queries']['count'], 1)
+        self.assertGreater(stats['books']['queries']['max'], 0)
+        self.assertGreater(stats['books']['template_ms']['max'], 0)
+
+    def test_stats_view(self):
+        self.client.get(reverse('books'))
+        resp = self.client.get(reverse('performance-stats'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('books', resp.json())
+
+    def test_stats_view_requires_staff(self):
+        User.objects.create_user(username='reader', password='12345')
+        self.client.login(username='reader', password='12345')
+        self.assertEqual(self.client.get(reverse('performance-stats')).status_code, 302)
+
+    @override_settings(CATALOG_SLOW_QUERY_MS=0)
+    def test_slow_queries_are_logged_with_stack(self):
+        with self.assertLogs('catalog.performance.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('books'))
+        self.assertIn('vista books', logs.output[0])
+        self.assertTrue(any('catalog/views.py' in line or 'catalog/mixins.py' in line for line in logs.output))
+
+    def test_profiles_one_request_in_n(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(CATALOG_PROFILE_EVERY=2, CATALOG_PROFILE_DIR=tmp):
+                for _ in range(4):
+                    self.client.get(reverse('books'))
+            profiles = os.listdir(tmp)
+        self.assertEqual(len(profiles), 2)
+        self.assertTrue(all(name.startswith('books-') and name.endswith('.prof') for name in profiles))
@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from catalog import refdata
+from catalog.forms import BookForm
+from catalog.models import Author, Book, Genre, Language
+
+
+@override_settings(CATALOG_REFDATA_CHECK_INTERVAL=0)
+class ReferenceTableTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.genres = [Genre.objects.create(name='Genre %s' % num) for num in range(3)]
+        cls.language = Language.objects.create(name='English')
+
+    def setUp(self):
+        cache.clear()
+        refdata.genres.reset()
+        refdata.languages.reset()
+
+    def test_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(refdata.genres.all(), self.genres)
+        with self.assertNumQueries(0):
+            self.assertEqual(refdata.genres.get(self.genres[1].pk), self.genres[1])
+            self.assertEqual(list(refdata.genres.in_bulk([self.genres[2].pk, 999])), [self.genres[2].pk])
+            self.assertIsNone(refdata.genres.get(999))
+
+    def test_signal_invalidates(self):
+        refdata.genres.all()
+        genre = Genre.objects.create(name='Genre new')
+        self.assertEqual(refdata.genres.get(genre.pk), genre)
+        genre.delete()
+        self.assertIsNone(refdata.genres.get(genre.pk))
+
+    def test_version_change_from_other_process(self):
+        refdata.genres.all()
+        Genre.objects.filter(pk=self.genres[0].pk).update(name='Renamed')
+        with self.assertNumQueries(0):
+            self.assertEqual(refdata.genres.get(self.genres[0].pk).name, 'Genre 0')
+        # Otro proceso confirma un cambio y cambia la version compartida
+        cache.set(refdata.genres.version_key, 'other', None)
+        self.assertEqual(refdata.genres.get(self.genres[0].pk).name, 'Renamed')
+
+    @override_settings(CATALOG_REFDATA_CHECK_INTERVAL=60)
+    def test_check_interval(self):
+        refdata.genres.all()
+        cache.set(refdata.genres.version_key, 'other', None)
+        with self.assertNumQueries(0):
+            refdata.genres.all()
+
+    @override_settings(CATALOG_REFDATA_MAX_ROWS=2)
+    def test_too_large_goes_to_database(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(refdata.genres.get(self.genres[0].pk), self.genres[0])
+        with self.assertNumQueries(1):
+            refdata.genres.get(self.genres[0].pk)
+
+
+class BookFormTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.genres = [Genre.objects.create(name='Genre %s' % num) for num in range(3)]
+        cls.language = Language.objects.create(name='English')
+
+    def setUp(self):
+        for table in (refdata.genres, refdata.languages):
+            table.reset()
+            table.all()
+
+    def data(self, **extra):
+        return {
+            'title': 'Book', 'summary': 'Summary', 'isbn': 'ABCDEFG', 'author': self.author.pk,
+            'language': self.language.pk, 'genre': [self.genres[0].pk, self.genres[2].pk], **extra,
+        }
+
+    def test_choices_from_memory(self):
+        form = BookForm()
+        with self.assertNumQueries(0):
+            html = form.as_p()
+        self.assertIn('Genre 2', html)
+        self.assertIn('English', html)
+
+    def test_save(self):
+        form = BookForm(data=self.data())
+        self.assertTrue(form.is_valid(), form.errors)
+        book = form.save()
+        self.assertEqual(list(book.genre.order_by('pk')), [self.genres[0], self.genres[2]])
+        self.assertEqual(book.language, self.language)
+
+        form = BookForm(instance=book)
+        self.assertEqual(sorted(genre.pk for genre in form.initial['genre']), [self.genres[0].pk, self.genres[2].pk])
+
+    def test_invalid_ids(self):
+        form = BookForm(data=self.data(language=999, genre=[self.genres[0].pk, 999]))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'language', 'genre'})
+
+
+class ReferenceDataUsersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.language = Language.objects.create(name='Español')
+        cls.genre = Genre.objects.create(name='Novela')
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=author, language=cls.language)
+        cls.book.genre.add(cls.genre)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_book_detail(self):
+        resp = self.client.get(self.book.get_absolute_url())
+        self.assertContains(resp, 'Español')
+        self.assertContains(resp, 'Novela')
+
+    def test_api_language(self):
+        resp = self.client.get('/catalog/api/books/%d/?fields=language' % self.book.pk)
+        self.assertEqual(resp.json(), {'language': 'Español'})
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth.models import Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from catalog import fragments, routers
+from catalog.middleware import ReplicaRoutingMiddleware
+from catalog.models import Author, Book
+
+
+@override_settings(CATALOG_READ_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def route(self, view, cookies=None):
+        """
+        Pasa una peticion por ReplicaRoutingMiddleware y devuelve
+        (base de datos de lectura dentro de la vista, respuesta)
+        """
+        seen = {}
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen['db'] = view(request)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        response = middleware(request)
+        self.assertIsNone(routers.current_state.get())
+        return seen['db'], response
+
+    def test_views_marked_for_replica(self):
+        for url in ('/catalog/', '/catalog/books/', '/catalog/book/1', '/catalog/authors/', '/catalog/author/1'):
+            with self.subTest(url=url):
+                self.assertTrue(routers.view_reads_from_replica(resolve(url).func))
+        for url in ('/catalog/mybooks/', '/catalog/book/1/hold/', '/catalog/book/create/'):
+            with self.subTest(url=url):
+                self.assertFalse(routers.view_reads_from_replica(resolve(url).func))
+
+    def test_replica_view_reads_from_replica(self):
+        view = routers.read_from_replica(lambda request: self.router.db_for_read(Book))
+        self.assertEqual(self.route(view)[0], 'replica')
+
+    def test_other_views_read_from_primary(self):
+        self.assertIsNone(self.route(lambda request: self.router.db_for_read(Book))[0])
+
+    def test_sessions_read_from_primary(self):
+        view = routers.read_from_replica(lambda request: self.router.db_for_read(Session))
+        self.assertIsNone(self.route(view)[0])
+
+    def test_auth_and_contenttypes_read_from_primary(self):
+        for model in (User, Permission, ContentType):
+            with self.subTest(model=model.__name__):
+                view = routers.read_from_replica(lambda request: self.router.db_for_read(model))
+                self.assertIsNone(self.route(view)[0])
+
+    def test_write_pins_rest_of_request_and_sets_cookie(self):
+        @routers.read_from_replica
+        def view(request):
+            before = self.router.db_for_read(Book)
+            self.assertEqual(self.router.db_for_write(Book), 'default')
+            return before, self.router.db_for_read(Book)
+
+        (before, after), response = self.route(view)
+        self.assertEqual((before, after), ('replica', None))
+        cookie = response.cookies[ReplicaRoutingMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertTrue(cookie['httponly'])
+
+    def test_session_write_does_not_pin(self):
+        @routers.read_from_replica
+        def view(request):
+            self.router.db_for_write(Session)
+            return self.router.db_for_read(Book)
+
+        db, response = self.route(view)
+        self.assertEqual(db, 'replica')
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+
+    def test_cookie_pins_to_primary(self):
+        view = routers.read_from_replica(lambda request: self.router.db_for_read(Book))
+        self.assertIsNone(self.route(view, {ReplicaRoutingMiddleware.cookie_name: '1'})[0])
+
+    def test_no_replicas(self):
+        view = routers.read_from_replica(lambda request: self.router.db_for_read(Book))
+        with override_settings(CATALOG_READ_REPLICAS=[]):
+            self.assertIsNone(self.route(view)[0])
+
+    def test_no_migrations_on_replicas(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'catalog'))
+        self.assertIsNone(self.router.allow_migrate('default', 'catalog'))
+
+
+class ReadYourWritesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=author)
+        cls.user = User.objects.create_user(username='patron', password='12345')
+
+    @override_settings(CATALOG_READ_REPLICAS=['replica'])
+    def test_write_then_read_from_primary(self):
+        self.client.login(username='patron', password='12345')
+        response = self.client.post(reverse('book-hold', args=[self.book.pk]))
+        self.assertIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+
+        # Con la cookie la ficha se lee del primario (aqui no existe la replica)
+        response = self.client.get(self.book.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CATALOG_READ_REPLICAS=['replica'])
+    def test_fragment_miss_reads_from_primary_and_is_stored(self):
+        # Sin el fragmento la vista lee del primario (aqui no existe la replica)
+        cache.clear()
+        self.assertEqual(self.client.get(self.book.get_absolute_url()).status_code, 200)
+        key = fragments.fragment_key('book_detail', self.book.pk)
+        self.assertIsNotNone(cache.get(key))
+
+    def test_no_cookie_without_replicas(self):
+        self.client.login(username='patron', password='12345')
+        response = self.client.post(reverse('book-hold', args=[self.book.pk]))
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+
+
+class SyncSqliteTest(SimpleTestCase):
+
+    def test_sync(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source, target = os.path.join(tmp, 'primary.sqlite3'), os.path.join(tmp, 'replica.sqlite3')
+            db = sqlite3.connect(source)
+            db.execute('CREATE TABLE t (x INTEGER)')
+            db.execute('INSERT INTO t VALUES (1)')
+            db.commit()
+            routers.sync_sqlite(source, target)
+            db.execute('INSERT INTO t VALUES (2)')
+            db.commit()
+            db.close()
+
+            replica = sqlite3.connect(target)
+            self.assertEqual(replica.execute('SELECT x FROM t').fetchall(), [(1,)])
+            replica.close()
+            routers.sync_sqlite(source, target)
+            replica = sqlite3.connect(target)
+            self.assertEqual(replica.execute('SELECT x FROM t ORDER BY x').fetchall(), [(1,), (2,)])
+            replica.close()
@@ -0,0 +1,164 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import search
+from catalog.models import Author, Book, Genre, Language
+
+
+class SearchTestMixin:
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(first_name='Miguel', last_name='Cervantes')
+        language = Language.objects.create(name='Español')
+        self.novel = Genre.objects.create(name='Novela')
+        self.quijote = Book.objects.create(title='Don Quijote de la Mancha', summary='Un hidalgo lee demasiados libros de caballerías', isbn='1', author=self.author, language=language)
+        self.quijote.genre.add(self.novel)
+        self.other = Book.objects.create(title='Novelas ejemplares', summary='Doce novelas cortas sobre la Mancha', isbn='2', author=self.author, language=language)
+
+    def ids(self, query):
+        return [book.pk for book in search.SearchResults(query, backend=self.backend)[:10]]
+
+    def test_title_match_ranks_first(self):
+        self.assertEqual(self.ids('mancha'), [self.quijote.pk, self.other.pk])
+
+    def test_prefix_and_accents(self):
+        self.assertEqual(self.ids('quij'), [self.quijote.pk])
+        self.assertEqual(self.ids('caballerias'), [self.quijote.pk])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.ids('cervantes hidalgo'), [self.quijote.pk])
+        self.assertEqual(self.ids('hidalgo doce'), [])
+
+    def test_index_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.last_name = 'Saavedra'
+            self.author.save()
+            self.novel.name = 'Clasico'
+            self.novel.save()
+            self.other.delete()
+        self.assertEqual(self.ids('saavedra'), [self.quijote.pk])
+        self.assertEqual(self.ids('clasico'), [self.quijote.pk])
+        self.assertEqual(self.ids('ejemplares'), [])
+
+
+class FTS5SearchTest(SearchTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.backend = search.get_backend()
+
+    def test_uses_fts5(self):
+        self.assertIsInstance(self.backend, search.FTS5Backend)
+
+    def test_raw_save_does_not_index(self):
+        # loaddata guarda con raw=True: el indice se reconstruye con rebuild_search_index
+        book = Book(title='La Galatea', summary='Pastores', isbn='3', author=self.author, updated_at=timezone.now())
+        with self.assertNumQueries(1):
+            book.save_base(raw=True)
+        self.assertEqual(self.ids('galatea'), [])
+
+
+class InMemorySearchTest(SearchTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.backend = search.InMemoryBackend()
+
+    def test_incremental_updates(self):
+        # Las señales usan el indice en memoria como si no hubiera FTS5
+        self.assertEqual(self.ids('mancha'), [self.quijote.pk, self.other.pk])
+        version = self.backend.version
+        patcher = mock.patch('catalog.search.get_backend', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quijote.title = 'El ingenioso hidalgo'
+            self.quijote.save()
+            poetry = Genre.objects.create(name='Poesia')
+            self.other.genre.add(poetry)
+            self.novel.book_set.clear()
+        # Cada cambio se aplica sobre el indice cargado, sin reconstruirlo
+        rebuild = mock.patch.object(self.backend, '_clear', side_effect=AssertionError('reconstruido'))
+        with rebuild:
+            self.assertEqual(self.ids('ingenioso'), [self.quijote.pk])
+            self.assertEqual(self.ids('quijote'), [])
+            self.assertEqual(self.ids('novela'), [self.other.pk])
+            self.assertEqual(self.ids('poesia'), [self.other.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            third = Book.objects.create(title='La Galatea', summary='Pastores', isbn='3', author=self.author)
+            self.other.delete()
+        with rebuild:
+            self.assertEqual(self.ids('galatea'), [third.pk])
+            self.assertEqual(self.ids('poesia'), [])
+        self.assertEqual(self.backend.version, version + 5)
+
+    def test_changes_from_other_process(self):
+        # Otro proceso, que no ha cargado su indice, cambia un libro
+        self.assertEqual(self.ids('quijote'), [self.quijote.pk])
+        other_process = search.InMemoryBackend()
+        with mock.patch('catalog.search.get_backend', return_value=other_process):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.quijote.title = 'La Galatea'
+                self.quijote.save()
+        self.assertIsNone(other_process.version)
+        self.assertEqual(self.ids('quijote'), [])
+        self.assertEqual(self.ids('galatea'), [self.quijote.pk])
+
+    def test_concurrent_change_forces_reload(self):
+        self.assertEqual(self.ids('quijote'), [self.quijote.pk])
+        version = self.backend.version
+        with mock.patch('catalog.search.get_backend', return_value=self.backend):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.quijote.title = 'La Galatea'
+                self.quijote.save()
+                # Otro proceso confirma un cambio antes que este
+                search.InMemoryBackend()._bump_version()
+        # El cambio propio no se aplica sobre una copia que ya no es la actual
+        self.assertEqual(self.backend.version, version)
+        self.assertEqual(self.ids('galatea'), [self.quijote.pk])
+        self.assertEqual(self.backend.version, version + 2)
+
+
+class BookSearchViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        for num in range(12):
+            Book.objects.create(title='Dragon %s' % num, summary='Summary', isbn=str(num), author=author)
+
+    def test_search_is_paginated(self):
+        resp = self.client.get(reverse('book-search'), {'q': 'drag'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'catalog/book_search.html')
+        self.assertEqual(resp.context['paginator'].count, 12)
+        self.assertFalse(resp.context['paginator'].object_list.truncated)
+        self.assertEqual(len(resp.context['book_list']), 10)
+        self.assertContains(resp, '?q=drag&amp;page=2')
+
+    @override_settings(CATALOG_SEARCH_MAX_COUNT=5)
+    def test_count_is_capped(self):
+        resp = self.client.get(reverse('book-search'), {'q': 'drag'})
+        self.assertEqual(resp.context['paginator'].count, 5)
+        self.assertEqual(len(resp.context['book_list']), 5)
+        self.assertContains(resp, 'Más de 5 resultados')
+        self.assertNotContains(resp, 'page=2')
+
+    def test_capped_count_per_backend(self):
+        for backend in (search.get_backend(), search.InMemoryBackend()):
+            with self.subTest(backend=type(backend).__name__):
+                self.assertEqual(backend.count(['drag'], 5), 5)
+                self.assertEqual(backend.count(['drag'], 50), 12)
+                self.assertEqual(backend.count(['drag']), 12)
+
+    def test_empty_query(self):
+        resp = self.client.get(reverse('book-search'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['book_list']), 0)
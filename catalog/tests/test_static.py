@@ -0,0 +1,112 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import assets, storage
+from catalog.management.commands.vendor_static import sri_hash
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'catalog.storage.CompressedManifestStaticFilesStorage'},
+}
+
+
+class CollectStaticTest(TestCase):
+    """
+    collectstatic con el almacenamiento de produccion en un STATIC_ROOT temporal
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.root, STORAGES=STORAGES, CATALOG_STATIC_ACCEL_REDIRECT=None))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(cls.root, 'staticfiles.json')) as f:
+            cls.manifest = json.load(f)['paths']
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def setUp(self):
+        assets._is_vendored.cache_clear()
+        self.addCleanup(assets._is_vendored.cache_clear)
+
+    def test_hashed_names_and_precompressed_variants(self):
+        hashed = self.manifest['js/autocomplete.js']
+        self.assertRegex(hashed, assets.HASHED_NAME)
+        path = os.path.join(self.root, hashed)
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as compressed:
+            self.assertEqual(original.read(), compressed.read())
+        self.assertEqual(os.path.exists(path + '.br'), storage.brotli is not None)
+        # Los ficheros pequeños o ya comprimidos se dejan tal cual
+        self.assertFalse(any(name.endswith(('.png.gz', '.woff2.gz')) for name in os.listdir(self.root)))
+
+    def test_hashed_file_is_cached_forever(self):
+        url = reverse('static', args=[self.manifest['js/autocomplete.js']])
+        response = self.client.get(url, headers={'accept-encoding': 'gzip, deflate, br'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+        self.assertEqual(response['Content-Encoding'], 'br' if storage.brotli else 'gzip')
+
+    def test_identity_encoding(self):
+        response = self.client.get(reverse('static', args=[self.manifest['js/autocomplete.js']]))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        with open(os.path.join(self.root, self.manifest['js/autocomplete.js']), 'rb') as f:
+            self.assertEqual(b''.join(response.streaming_content), f.read())
+
+    def test_unhashed_file_revalidates(self):
+        url = reverse('static', args=['js/autocomplete.js'])
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        response = self.client.get(url, headers={'if-modified-since': response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_and_outside_root(self):
+        self.assertEqual(self.client.get(reverse('static', args=['nope.css'])).status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+        self.assertEqual(self.client.post(reverse('static', args=['js/autocomplete.js'])).status_code, 405)
+
+    @override_settings(CATALOG_STATIC_ACCEL_REDIRECT='/protected-static/')
+    def test_accel_redirect(self):
+        hashed = self.manifest['js/autocomplete.js']
+        response = self.client.get(reverse('static', args=[hashed]), headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-static/%s.gz' % hashed)
+        self.assertEqual(response.content, b'')
+
+    def test_vendor_url(self):
+        for path in assets.VENDOR_ASSETS:
+            self.assertEqual(assets.vendor_url(path), staticfiles_storage.url(path))
+        # Las fuentes se referencian desde el CSS con su nombre con hash
+        with staticfiles_storage.open(self.manifest['vendor/bootstrap/3.3.7/css/bootstrap.min.css']) as f:
+            css = f.read().decode()
+        self.assertIn(os.path.basename(self.manifest['vendor/bootstrap/3.3.7/fonts/glyphicons-halflings-regular.woff2']), css)
+
+    def test_vendored_files_match_published_hashes(self):
+        for path, (url, integrity) in assets.VENDOR_ASSETS.items():
+            location = finders.find(path)
+            self.assertIsNotNone(location, path)
+            if integrity:
+                with open(location, 'rb') as f:
+                    self.assertEqual(sri_hash(f.read()), integrity, path)
+
+    def test_base_template_uses_hashed_urls(self):
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, staticfiles_storage.url('css/styles.css'))
+        self.assertContains(response, staticfiles_storage.url('admin/js/vendor/jquery/jquery.min.js'))
+        self.assertNotContains(response, 'googleapis')
+        self.assertNotContains(response, 'maxcdn')
+        self.assertContains(response, staticfiles_storage.url('vendor/bootstrap/3.3.7/css/bootstrap.min.css'))
@@ -0,0 +1,62 @@
+from django.template import Context, Engine, engines
+from django.template.base import NodeList
+from django.test import TestCase
+
+from catalog import templating
+from catalog.models import Author, Book
+
+
+class TemplateLoadingTest(TestCase):
+
+    def setUp(self):
+        self.engine = engines.all()[0].engine
+        self.loader = self.engine.template_loaders[0]
+
+    def test_cached_loader(self):
+        self.assertEqual(type(self.loader).__module__, 'django.template.loaders.cached')
+        self.assertIs(self.engine.get_template('base_generic.html'), self.engine.get_template('base_generic.html'))
+
+    def test_precompile(self):
+        self.loader.reset()
+        self.assertGreater(templating.precompile(), 10)
+        self.assertIn('catalog/book_detail.html', self.loader.get_template_cache)
+        self.assertIn('base_generic.html', self.loader.get_template_cache)
+        with self.assertNumQueries(0):
+            self.engine.get_template('catalog/book_detail.html')
+
+
+class TemplateProfilerTest(TestCase):
+
+    def setUp(self):
+        self.original = NodeList.render
+        templating.profiler.reset()
+        templating.profiler.enable()
+        self.addCleanup(templating.profiler.reset)
+        self.addCleanup(templating.profiler.disable)
+
+    def test_disable_restores_nodelist(self):
+        templating.profiler.disable()
+        self.assertIs(NodeList.render, self.original)
+
+    def test_blocks_count_for_the_template_that_defines_them(self):
+        engine = Engine(loaders=[('django.template.loaders.locmem.Loader', {
+            'base.html': '<html>{% block content %}{% endblock %}{% include "row.html" %}</html>',
+            'page.html': '{% extends "base.html" %}{% block content %}{% for i in items %}{{ i }}{% endfor %}{% endblock %}',
+            'row.html': '<p>{{ title }}</p>',
+        })])
+        engine.get_template('page.html').render(Context({'items': range(20000), 'title': 'x'}))
+
+        rows = {row['template']: row for row in templating.profiler.snapshot()}
+        self.assertEqual(set(rows), {'base.html', 'page.html', 'row.html'})
+        self.assertEqual(rows['row.html']['renders'], 1)
+        # El bucle del bloque es de page.html aunque se renderice dentro de base.html
+        self.assertGreater(rows['page.html']['self_ms'], rows['base.html']['self_ms'])
+        self.assertAlmostEqual(sum(row['share'] for row in rows.values()), 1.0)
+
+    def test_views(self):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=author)
+        self.client.get(book.get_absolute_url())
+        names = [row['template'] for row in templating.profiler.snapshot()]
+        self.assertIn('base_generic.html', names)
+        self.assertIn('catalog/book_detail.html', names)
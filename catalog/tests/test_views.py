@@ -5,6 +5,12 @@ from django.utils import timezone
 from catalog.models import BookInstance, Book, Genre, Language
 from django.contrib.auth.models import User
 from catalog.forms import RenewBookForm
+from catalog.tests.utils import QueryBudgetMixin
+from django.core.cache import cache
+from catalog import fragments, refdata, visits
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import Permission
 import datetime
 
@@ -323,4 +329,137 @@ class AuthorCreateViewTest(TestCase):
                                     {'first_name': 'Christian', 'last_name': 'Surname'})
         # Verificamos la redirección a la vista de detalles del autor
         self.assertEqual(response.status_code, 302)
-        self.assertTrue(response.url.startswith('/catalog/author/'))
\ No newline at end of file
+        self.assertTrue(response.url.startswith('/catalog/author/'))
+
+class QueryBudgetTest(TestCase):
+    """
+    Cada vista debe costar un numero constante de consultas, tenga los datos que
+    tenga: se cuenta con 3 libros y con 30 y el numero debe ser el mismo
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian', password='12345')
+        cls.librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.language = Language.objects.create(name='English')
+        cls.genres = [Genre.objects.create(name='Genre %s' % num) for num in range(3)]
+        cls.add_books(3, copies=1, genres=1)
+        cls.book = Book.objects.order_by('pk').first()
+
+    @classmethod
+    def add_books(cls, count, copies, genres):
+        due_back = datetime.date.today() + datetime.timedelta(days=3)
+        for book_num in range(count):
+            book = Book.objects.create(title='Book %s' % book_num, summary='Summary', isbn='ABCDEFG', author=cls.author, language=cls.language)
+            book.genre.set(cls.genres[:genres])
+            for copy_num in range(copies):
+                BookInstance.objects.create(book=book, imprint='Imprint', due_back=due_back, borrower=cls.librarian, status='o')
+
+    def setUp(self):
+        self.client.login(username='librarian', password='12345')
+
+    def count_queries(self, url):
+        cache.clear()
+        # Generos e idiomas se cargan una vez por proceso (catalog.refdata), no por peticion
+        for table in (refdata.genres, refdata.languages):
+            table.reset()
+            table.all()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(ctx)
+
+    def assertConstantQueries(self, budget, url):
+        small = self.count_queries(url)
+        # 30 libros con mas copias y generos, tambien en el libro de la ficha
+        self.add_books(27, copies=3, genres=3)
+        self.book.genre.set(self.genres)
+        for copy_num in range(5):
+            BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        large = self.count_queries(url)
+        self.assertEqual(small, large, 'GET %s: %d consultas con 3 libros y %d con 30' % (url, small, large))
+        self.assertLessEqual(large, budget, 'GET %s hizo %d consultas (presupuesto %d)' % (url, large, budget))
+
+    def test_book_list_budget(self):
+        self.assertConstantQueries(6, reverse('books'))
+
+    def test_book_detail_budget(self):
+        self.assertConstantQueries(7, reverse('book-detail', args=[self.book.pk]))
+
+    def test_author_detail_budget(self):
+        self.assertConstantQueries(6, reverse('author-detail', args=[self.author.pk]))
+
+    def test_loaned_books_by_user_budget(self):
+        self.assertConstantQueries(6, reverse('my-borrowed'))
+
+    def test_loaned_books_librarian_budget(self):
+        self.assertConstantQueries(6, reverse('loanedbooks'))
+
+
+class DetailFragmentCacheTest(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book Title', summary='My book summary', isbn='ABCDEFG', author=cls.author)
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Imprint', status='m')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_render_is_served_from_cache(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        first = self.client.get(url)
+        second = self.assertQueryBudget(1, url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(fragments.stats()['book_detail'], {'hit': 1, 'miss': 1, 'ratio': 0.5})
+
+    def test_copy_status_change_invalidates_book_and_author(self):
+        book_url = reverse('book-detail', args=[self.book.pk])
+        author_url = reverse('author-detail', args=[self.author.pk])
+        self.assertContains(self.client.get(book_url), 'Maintenance')
+        self.assertContains(self.client.get(author_url), '(1)')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.copy.status = 'a'
+            self.copy.save()
+            BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        self.assertNotContains(self.client.get(book_url), 'Maintenance')
+        self.assertContains(self.client.get(author_url), '(2)')
+
+    def test_genre_change_invalidates_book(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.genre.add(Genre.objects.create(name='Fantasy'))
+        self.assertContains(self.client.get(url), 'Fantasy')
+
+
+class IndexVisitsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_visits_counted_without_database_writes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('index'))
+            resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_visits'], 2)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, resp.cookies)
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(writes, [])
+
+    def test_tampered_cookie_restarts_count(self):
+        self.client.cookies['num_visits'] = '41'
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_visits'], 1)
+
+    def test_visit_buffer_flushes_in_batches(self):
+        buffer = visits.VisitBuffer(flush_every=3, flush_interval=3600)
+        buffer.add()
+        buffer.add()
+        self.assertIsNone(cache.get(visits.TOTAL_KEY))
+        self.assertEqual(buffer.total(), 2)
+        buffer.add()
+        self.assertEqual(cache.get(visits.TOTAL_KEY), 3)
+        self.assertEqual(buffer.total(), 3)
@@ -0,0 +1,38 @@
+import gc
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import get_resolver
+
+from catalog import refdata, warmup
+from catalog.models import Genre
+
+
+class WarmUpTest(SimpleTestCase):
+
+    def test_default_steps(self):
+        with override_settings(CATALOG_WARMUP=True):
+            self.assertEqual(warmup.default_steps(), [name for name, func in warmup.STEPS])
+        with override_settings(CATALOG_WARMUP=False, CATALOG_PRECOMPILE_TEMPLATES=True):
+            self.assertEqual(warmup.default_steps(), ['templates'])
+        with override_settings(CATALOG_WARMUP=False, CATALOG_PRECOMPILE_TEMPLATES=False):
+            self.assertEqual(warmup.warm_up(), {})
+
+    def test_imports_and_urls(self):
+        timings = warmup.warm_up(['imports', 'urls'])
+        self.assertEqual(list(timings), ['imports', 'urls'])
+        self.assertTrue(get_resolver()._populated)
+
+    def test_gc_freeze(self):
+        self.addCleanup(gc.unfreeze)
+        warmup.warm_up(['gc_freeze'])
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+
+class WarmUpReferenceDataTest(TransactionTestCase):
+
+    def test_loads_reference_data(self):
+        Genre.objects.create(name='Fantasy')
+        refdata.genres.reset()
+        warmup.warm_up(['refdata'])
+        with self.assertNumQueries(0):
+            self.assertEqual([genre.name for genre in refdata.genres.all()], ['Fantasy'])
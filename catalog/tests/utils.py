@@ -0,0 +1,19 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Mixin para TestCase que comprueba el presupuesto de consultas de una vista
+    """
+
+    def assertQueryBudget(self, budget, url, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url, **extra)
+        self.assertEqual(resp.status_code, 200)
+        queries = '\n'.join(q['sql'] for q in ctx.captured_queries)
+        self.assertLessEqual(
+            len(ctx), budget,
+            'GET %s hizo %d consultas (presupuesto %d):\n%s' % (url, len(ctx), budget, queries),
+        )
+        return resp
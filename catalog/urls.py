@@ -1,15 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
+
+if getattr(settings, 'CATALOG_ASYNC_VIEWS', False):
+    # Vistas de solo lectura asincronas (para servir con ASGI, ver catalog/async_views.py)
+    from . import async_views as read_views
+else:
+    read_views = views
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('books/', views.BookListView.as_view(), name='books'),
-    path('book/<int:pk>', views.BookDetailView.as_view(), name='book-detail'),
-    path('authors/', views.AuthorListView.as_view(), name='authors'),
-    path('author/<int:pk>', views.AuthorDetailView.as_view(), name='author-detail'),
-    path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
-    path('loanedbooks/', views.LoanedBooksLibrarianView.as_view(), name='loanedbooks'),
+    path('', read_views.index, name='index'),
+    path('books/', read_views.BookListView.as_view(), name='books'),
+    path('book/<int:pk>', read_views.BookDetailView.as_view(), name='book-detail'),
+    path('search/', views.BookSearchView.as_view(), name='book-search'),
+    path('authors/', read_views.AuthorListView.as_view(), name='authors'),
+    path('author/<int:pk>', read_views.AuthorDetailView.as_view(), name='author-detail'),
+    path('authors/autocomplete/', views.author_autocomplete, name='author-autocomplete'),
+    path('mybooks/', read_views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
+    path('loanedbooks/', read_views.LoanedBooksLibrarianView.as_view(), name='loanedbooks'),
+    path('overdue/', views.OverdueLoansView.as_view(), name='overdue-loans'),
+    path('api/<slug:resource>/', api.resource_list, name='api-list'),
+    path('api/<slug:resource>/<str:pk>/', api.resource_detail, name='api-detail'),
+    path('export/', views.export_catalog, name='export-catalog'),
+    path('performance/', views.performance_stats, name='performance-stats'),
     path('book/<uuid:pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
+    path('book/<int:pk>/hold/', views.place_hold, name='book-hold'),
+    path('loans/batch/', views.batch_loans, name='batch-loans'),
     path('author/create/', views.AuthorCreate.as_view(), name='author-create'),
     path('author/<int:pk>/update/', views.AuthorUpdate.as_view(), name='author-update'),
     path('author/<int:pk>/delete/', views.AuthorDelete.as_view(), name='author-delete'),
@@ -0,0 +1,26 @@
+"""
+Utilidades genericas del catalogo.
+"""
+import unicodedata
+
+
+def fold(text):
+    """
+    Minusculas y sin acentos ("Álvarez" -> "alvarez")
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def batched(iterable, size):
+    """
+    Agrupa un iterable en listas de como mucho size elementos
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
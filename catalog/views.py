@@ -1,12 +1,19 @@
 from django.shortcuts import render
-from .models import Book, Author, BookInstance, Genre, Language
+from .models import Book, Author, BookInstance, Language
 from django.views import generic
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.urls import reverse
-from .forms import RenewBookForm
+from django.views.decorators.http import require_POST
+from .forms import BatchLoanForm, BookForm, RenewBookForm
+from .counters import get_counters
+from .mixins import FragmentCacheMixin, KeysetPaginationMixin, RelationLoadingMixin
+from . import autocomplete, export, holds, loans, performance, refdata, routers, search, visits
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 import datetime
@@ -16,84 +23,164 @@ import datetime
 #@login_required
 #@permission_required('catalog.can_mark_returned')
 #@permission_required('catalog.can_edit')
+@routers.read_from_replica
 def index(request):
     """
     Funcion vista para la pagina de inicio de la web
     """
 
-    #Genera contadores de algunos de los objetos principales
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
+    # Contadores de los objetos principales (libros, copias, disponibles, autores,
+    # generos y libros con "y"), servidos desde cache y mantenidos por señales
+    counters = get_counters()
 
-    # Libros disponibles (Estatus 'a')
-    num_instances_available = BookInstance.objects.filter(status__exact='a').count()
-    num_authors = Author.objects.count() #All implicito por defecto
-
-    # Contador generos
-    num_generos = Genre.objects.all().count()
-
-    # Contador libros con palabra "y"
-    num_libros_con_y = Book.objects.filter(title__contains=' y ').count()
-
-    # Numero de visitas al index, como está contado en la variable de sesion
-    num_visits = request.session.get('num_visits', 0)
-    num_visits += 1
-    request.session['num_visits'] = num_visits
+    # Numero de visitas al index, contado en una cookie firmada (sin escribir la sesion en la BD)
+    num_visits = visits.visitor_count(request)
+    visits.buffer.add()
 
     # Renderiza la plantilla HTML index.html con los datos en la variable contexto
-    return render(
+    response = render(
         request,
         'index.html',
         context = {
-            'num_books':num_books, 'num_instances':num_instances, 'num_instances_available':num_instances_available, 'num_authors':num_authors, 'num_generos':num_generos, 'num_libros_con_y':num_libros_con_y, 'num_visits':num_visits,
+            **counters, 'num_visits':num_visits, 'num_visits_total':visits.buffer.total(),
         }
     )
+    visits.remember_visitor_count(response, num_visits)
+    return response
 
 # Lista y Detalles Libros, La lista tiene un loginrequiredmixin
-class BookListView(LoginRequiredMixin, generic.ListView):
+class BookListView(LoginRequiredMixin, RelationLoadingMixin, KeysetPaginationMixin, generic.ListView):
     model = Book
     paginate_by = 5
+    ordering = ['id']
+    select_related = ('author',)
+    # Solo lectura: lee de una replica si hay (catalog.routers)
+    read_from_replica = True
+    # ?order=availability: primero los libros con mas copias disponibles (columna indexada)
+    orderings = {
+        'availability': ('-copies_available', 'pk'),
+    }
+
+    def get_keyset_ordering(self):
+        return self.orderings.get(self.request.GET.get('order'), super().get_keyset_ordering())
+
+    def get_ordering(self):
+        ordering = self.orderings.get(self.request.GET.get('order'))
+        return list(ordering) if ordering else super().get_ordering()
     # context_object_name = 'my_book_list' #propio nombre para la lista como variable de plantilla
     # queryset = Book.objects.filter(title__contains='war')[:5] #Query para obtener 5 libros que contengan war
     # template_name = 'books/my_arbitrary_template_name_list.html' #nombre y ubicacion variables
 
-class BookDetailView(generic.DetailView):
+class BookDetailView(FragmentCacheMixin, RelationLoadingMixin, generic.DetailView):
     model = Book
+    fragment_name = 'book_detail'
+    read_from_replica = True
+    select_related = ('author',)
+    prefetch_related = ('bookinstance_set',)
+
+    def get_object(self, queryset=None):
+        return self.load_reference_data(super().get_object(queryset))
+
+    def load_reference_data(self, book):
+        # Idioma y generos desde catalog.refdata (si el fragmento no esta en cache)
+        if self.cached_fragment is None:
+            refdata.attach_languages([book])
+            refdata.prefetch_genres([book])
+        return book
+
+# Busqueda de libros por titulo, resumen, autor y genero
+class BookSearchView(generic.ListView):
+    """
+    Resultados ordenados por relevancia del indice de busqueda (catalog.search)
+    """
+    template_name = 'catalog/book_search.html'
+    context_object_name = 'book_list'
+    paginate_by = 10
+
+    def get_queryset(self):
+        return search.search(self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
 
 # Lista y Detalles Autores
-class AuthorListView(generic.ListView):
+class AuthorListView(KeysetPaginationMixin, generic.ListView):
     model = Author
     paginate_by = 10
+    keyset_ordering = ('last_name', 'pk')
+    read_from_replica = True
 
-class AuthorDetailView(generic.DetailView):
+class AuthorDetailView(FragmentCacheMixin, RelationLoadingMixin, generic.DetailView):
     model = Author
+    fragment_name = 'author_detail'
+    read_from_replica = True
+    # El numero de copias de cada libro es una columna de Book (copies_total)
+    prefetch_related = ('book_set',)
 
 # Vista para libros alquilados por un usuario loggedin
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+class LoanedBooksByUserListView(LoginRequiredMixin, RelationLoadingMixin, KeysetPaginationMixin, generic.ListView):
     """
     Vista generica basada en clases que enumera los libros prestados al usuario actual
     """
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_user.html'
     paginate_by = 10
+    select_related = ('book',)
+    keyset_ordering = ('due_back', 'pk')
 
     def get_queryset(self):
-        return BookInstance.objects.filter(borrower=self.request.user).filter(status__exact='o').order_by('due_back')
+        return super().get_queryset().filter(borrower=self.request.user).on_loan().with_overdue().order_by('due_back')
     
 # Vista para ver todos los libros alquilados por los librarians
-class LoanedBooksLibrarianView(LoginRequiredMixin, PermissionRequiredMixin, generic.ListView):
+class LoanedBooksLibrarianView(LoginRequiredMixin, PermissionRequiredMixin, RelationLoadingMixin, KeysetPaginationMixin, generic.ListView):
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_librarian.html'
     paginate_by = 10
     permission_required = ('catalog.can_mark_returned')
+    select_related = ('book', 'borrower')
+    keyset_ordering = ('due_back', 'pk')
 
     def get_queryset(self):
-        return BookInstance.objects.filter(status__exact='o').order_by('due_back')
+        return super().get_queryset().on_loan().with_overdue().order_by('due_back')
+
+# Informe de prestamos atrasados, filtrable por usuario (?borrower=username) y dias de retraso (?min_days=N)
+class OverdueLoansView(LoginRequiredMixin, PermissionRequiredMixin, RelationLoadingMixin, KeysetPaginationMixin, generic.ListView):
+    model = BookInstance
+    template_name = 'catalog/bookinstance_list_overdue.html'
+    paginate_by = 20
+    permission_required = ('catalog.can_mark_returned')
+    select_related = ('book', 'borrower')
+    keyset_ordering = ('due_back', 'pk')
+
+    def get_min_days(self):
+        try:
+            return max(int(self.request.GET.get('min_days', 1)), 1)
+        except ValueError:
+            return 1
+
+    def get_queryset(self):
+        queryset = super().get_queryset().overdue(min_days=self.get_min_days()).with_overdue()
+        if self.request.GET.get('borrower'):
+            queryset = queryset.filter(borrower__username=self.request.GET['borrower'])
+        return queryset.order_by('due_back', 'pk')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'borrower': self.request.GET.get('borrower', ''),
+            'min_days': self.get_min_days(),
+            # Total y usuarios con mas retraso, contados en SQL
+            'num_overdue': self.object_list.count(),
+            'borrower_summary': BookInstance.objects.overdue_by_borrower(min_days=self.get_min_days())[:20],
+        })
+        return context
     
 # Vista para que los librarians puedan cambiar las fechas de libros
 @permission_required('catalog.can_mark_returned')
 def renew_book_librarian(request, pk):
-    book_inst = get_object_or_404(BookInstance, pk = pk)
+    book_inst = get_object_or_404(BookInstance.objects.select_related('book', 'borrower'), pk = pk)
 
     #Si la request es post, procesamos los datos del formulario
     if request.method == 'POST':
@@ -122,6 +209,79 @@ def renew_book_librarian(request, pk):
 
         return render(request, 'catalog/book_renew_librarian.html', context = {'form':form, 'bookinst':book_inst})
     
+# Prestar, devolver o renovar varias copias en una sola operacion (ver catalog/loans.py)
+@permission_required('catalog.can_mark_returned')
+def batch_loans(request):
+    if request.method == 'POST':
+        form = BatchLoanForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            try:
+                updated = loans.apply(data['action'], data['copies'], borrower=data['borrower'], due_back=data['due_back'])
+            except loans.LoanError as e:
+                for pk, problem in e.problems:
+                    form.add_error('copies', '%s: %s' % (pk, problem) if pk else problem)
+            else:
+                messages.success(request, '%s: %d copias' % (dict(loans.ACTIONS)[data['action']], updated))
+                return HttpResponseRedirect(reverse('batch-loans'))
+    else:
+        form = BatchLoanForm(initial={'due_back': datetime.date.today() + datetime.timedelta(weeks=3)})
+
+    return render(request, 'catalog/batch_loans.html', {'form': form})
+
+# Reservar un libro: el usuario entra en su cola (ver catalog/holds.py)
+@login_required
+@require_POST
+def place_hold(request, pk):
+    book = get_object_or_404(Book, pk=pk)
+    try:
+        hold = holds.place(book, request.user)
+    except holds.HoldError:
+        messages.info(request, 'Ya tienes una reserva de este libro')
+    else:
+        if hold.status == hold.READY:
+            messages.success(request, 'Hay una copia reservada para ti; recógela antes del %s' % timezone.localtime(hold.pickup_by).date())
+        else:
+            messages.success(request, 'Reserva registrada: te asignaremos la próxima copia que se devuelva')
+    return HttpResponseRedirect(book.get_absolute_url())
+
+# Sugerencias para el selector de autor de los formularios de libro (ver catalog/autocomplete.py)
+@login_required
+def author_autocomplete(request):
+    try:
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        return HttpResponseBadRequest('limit no valido')
+    authors, more = autocomplete.search_authors(request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'results': [{'id': author.pk, 'text': str(author)} for author in authors],
+        'more': more,
+    })
+
+# Exportacion del catalogo para otros sistemas (ver catalog/export.py)
+@permission_required('catalog.can_mark_returned')
+def export_catalog(request):
+    format = request.GET.get('format', 'csv')
+    if format not in export.FORMATS:
+        return HttpResponseBadRequest('Formato no soportado: %s' % format)
+    try:
+        since = export.parse_since(request.GET.get('since'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    # El cliente puede usar esta marca como since de la siguiente exportacion
+    # incremental (el inicio menos un margen, ver catalog/export.py)
+    started = export.next_since(timezone.now())
+    response = StreamingHttpResponse(export.export_lines(format, since), content_type=export.FORMATS[format])
+    response['Content-Disposition'] = 'attachment; filename="catalog.%s"' % format
+    response['X-Export-Timestamp'] = started.isoformat()
+    return response
+
+# Histogramas de rendimiento de este proceso (ver catalog/performance.py)
+@staff_member_required
+def performance_stats(request):
+    return JsonResponse(performance.snapshot())
+    
 # Modificar Autores
 class AuthorCreate(PermissionRequiredMixin, CreateView):
     model = Author
@@ -142,13 +302,13 @@ class AuthorDelete(PermissionRequiredMixin, DeleteView):
 # Modificar Books
 class BookCreate(PermissionRequiredMixin, CreateView):
     model = Book
-    fields = '__all__'
+    form_class = BookForm
     # initial = 
     permission_required = ('catalog.can_mark_returned')
 
 class BookUpdate(PermissionRequiredMixin, UpdateView):
     model = Book
-    fields = '__all__'
+    form_class = BookForm
     permission_required = ('catalog.can_mark_returned')
 
 class BookDelete(PermissionRequiredMixin, DeleteView):
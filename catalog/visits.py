@@ -0,0 +1,77 @@
+"""
+Contador de visitas de la pagina de inicio sin escrituras en la base de datos.
+
+Las visitas de cada visitante se guardan en una cookie firmada (antes iban en
+la sesion, lo que obligaba a guardarla en la BD en cada peticion). El total del
+sitio se acumula en memoria del proceso y se vuelca a la cache por lotes.
+"""
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+COOKIE_NAME = 'num_visits'
+COOKIE_SALT = 'catalog.visits'
+COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+TOTAL_KEY = 'catalog:visits:total'
+
+
+def visitor_count(request):
+    """
+    Numero de visitas de este visitante, incluida la actual
+    """
+    try:
+        previous = int(request.get_signed_cookie(COOKIE_NAME, default=0, salt=COOKIE_SALT))
+    except ValueError:
+        previous = 0
+    return previous + 1
+
+
+def remember_visitor_count(response, count):
+    response.set_signed_cookie(
+        COOKIE_NAME, count, salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE, httponly=True, samesite='Lax',
+    )
+
+
+class VisitBuffer:
+    """
+    Acumula visitas en memoria y las suma a la cache cada flush_every visitas o
+    cada flush_interval segundos, lo que ocurra antes
+    """
+
+    def __init__(self, flush_every=None, flush_interval=None):
+        self.flush_every = flush_every or getattr(settings, 'CATALOG_VISITS_FLUSH_EVERY', 100)
+        self.flush_interval = flush_interval or getattr(settings, 'CATALOG_VISITS_FLUSH_INTERVAL', 10.0)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, visits=1):
+        with self.lock:
+            self.pending += visits
+            if self.pending < self.flush_every and time.monotonic() - self.last_flush < self.flush_interval:
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, 0
+            self.last_flush = time.monotonic()
+        if pending:
+            if not cache.add(TOTAL_KEY, pending, None):
+                try:
+                    cache.incr(TOTAL_KEY, pending)
+                except ValueError:
+                    cache.set(TOTAL_KEY, pending, None)
+
+    def total(self):
+        """
+        Total del sitio: lo ya volcado a la cache mas lo pendiente en este proceso
+        """
+        return cache.get(TOTAL_KEY, 0) + self.pending
+
+
+buffer = VisitBuffer()
+atexit.register(buffer.flush)
@@ -0,0 +1,123 @@
+"""
+Calentamiento del proceso al arrancar (locallibrary/wsgi.py y asgi.py).
+
+Sin esto cada worker importa las vistas, construye el resolver de URLs,
+compila las plantillas y carga generos e idiomas en su primera peticion, que
+tras cada despliegue es mucho mas lenta que las demas. warm_up() lo hace antes
+de aceptar peticiones y termina con gc.freeze(): los objetos creados hasta
+entonces pasan a la generacion permanente y el recolector de basura no los
+vuelve a recorrer.
+
+Con un servidor que hace fork de los workers tras cargar la aplicacion
+(gunicorn --preload, uWSGI sin lazy-apps) esto se hace una sola vez en el
+proceso maestro. Los workers comparten esas paginas de memoria (copy-on-write)
+mientras nadie las escriba, y gc.freeze() evita precisamente que las escriba el
+recolector, que actualiza la cabecera de cada objeto que recorre.
+
+Se controla con CATALOG_WARMUP (por defecto fuera de DEBUG); si esta
+desactivado solo se precompilan las plantillas si CATALOG_PRECOMPILE_TEMPLATES.
+El comando bench_startup mide el tiempo de arranque, la primera peticion y la
+memoria privada de cada worker con y sin calentamiento.
+"""
+import gc
+import importlib
+import logging
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from . import refdata, templating
+
+logger = logging.getLogger(__name__)
+
+# Modulos que no importa la URLconf y que se usan en las peticiones
+MODULES = (
+    'catalog.views',
+    'catalog.async_views',
+    'catalog.api',
+    'catalog.admin',
+    'catalog.forms',
+    'catalog.widgets',
+    'catalog.templatetags.catalog_fragments',
+    'catalog.templatetags.catalog_static',
+    'django.contrib.auth.views',
+    'django.contrib.admin.views.main',
+)
+
+
+def import_modules():
+    importlib.import_module(settings.ROOT_URLCONF)
+    for name in MODULES:
+        importlib.import_module(name)
+
+
+def _compile_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        # La expresion regular de cada patron se compila la primera vez que se usa
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            _compile_patterns(pattern)
+        elif isinstance(pattern, URLPattern):
+            pattern.lookup_str
+
+
+def load_urls():
+    """
+    Construye el resolver, sus tablas de reverse() y las expresiones de todos los patrones
+    """
+    resolver = get_resolver()
+    resolver.reverse_dict
+    _compile_patterns(resolver)
+
+
+def load_reference_data():
+    try:
+        for table in refdata.TABLES.values():
+            table.snapshot()
+    except DatabaseError as e:
+        # Base de datos aun sin migrar, o no disponible: se cargara en la primera peticion
+        logger.warning('No se han cargado los datos de referencia: %s', e)
+    finally:
+        # Un proceso maestro no debe pasar conexiones abiertas a los workers
+        connections.close_all()
+
+
+def freeze():
+    gc.collect()
+    gc.freeze()
+
+
+STEPS = (
+    ('imports', import_modules),
+    ('urls', load_urls),
+    ('templates', templating.precompile),
+    ('refdata', load_reference_data),
+    ('gc_freeze', freeze),
+)
+
+
+def default_steps():
+    if getattr(settings, 'CATALOG_WARMUP', False):
+        return [name for name, func in STEPS]
+    if getattr(settings, 'CATALOG_PRECOMPILE_TEMPLATES', False):
+        return ['templates']
+    return []
+
+
+def warm_up(steps=None):
+    """
+    Ejecuta los pasos indicados (por defecto segun la configuracion) y devuelve
+    {paso: ms}
+    """
+    steps = default_steps() if steps is None else steps
+    timings = {}
+    for name, func in STEPS:
+        if name in steps:
+            start = time.perf_counter()
+            func()
+            timings[name] = (time.perf_counter() - start) * 1000
+    if timings:
+        logger.info('Calentamiento: %s', ', '.join('%s %.0f ms' % item for item in timings.items()))
+    return timings
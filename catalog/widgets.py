@@ -0,0 +1,42 @@
+"""
+Widgets de formulario del catalogo.
+"""
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Widget):
+    """
+    Sustituye al <select> de un ModelChoiceField con muchas filas: solo se
+    renderiza la opcion elegida y las sugerencias se piden a url_name
+    (JSON {'results': [{'id', 'text'}], 'more': bool}) mientras se escribe
+    """
+    template_name = 'catalog/widgets/autocomplete.html'
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['url'] = reverse(self.url_name)
+        context['widget']['label'] = self.label_for(value)
+        return context
+
+    def label_for(self, value):
+        # ModelChoiceField deja su iterador en self.choices: una consulta por pk
+        if value in (None, ''):
+            return ''
+        queryset = getattr(getattr(self, 'choices', None), 'queryset', None)
+        if queryset is None:
+            return str(value)
+        try:
+            obj = queryset.filter(pk=value).first()
+        except (ValueError, TypeError, ValidationError):
+            # Formulario enviado con un valor que no es una pk: el campo ya muestra el error
+            return ''
+        return str(obj) if obj is not None else ''
@@ -26,7 +26,8 @@ SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-dv3v@x7so&(v=4
 
 # SECURITY WARNING: don't run with debug turned on in production!
 # DEBUG = True
-DEBUG = bool( os.environ.get('DJANGO_DEBUG', True) )
+# DJANGO_DEBUG=False (o 0, o vacio) lo desactiva; bool() de cualquier texto no vacio era True
+DEBUG = os.environ.get('DJANGO_DEBUG', 'True') not in ('', '0', 'false', 'False')
 
 
 ALLOWED_HOSTS = []
@@ -45,12 +46,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que sus tiempos incluyan al resto de middlewares
+    'catalog.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Lecturas de las vistas marcadas a replicas (catalog/routers.py)
+    'catalog.middleware.ReplicaRoutingMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -58,9 +63,9 @@ ROOT_URLCONF = 'locallibrary.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que ademas mide el tiempo de renderizado (Server-Timing)
+        'BACKEND': 'catalog.templating.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates'),],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -68,22 +73,136 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Cada plantilla se lee y compila una vez por proceso (en desarrollo el
+            # autoreload de runserver vacia la cache cuando cambia un fichero)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Compilar todas las plantillas al arrancar el servidor (locallibrary/wsgi.py y asgi.py)
+CATALOG_PRECOMPILE_TEMPLATES = os.environ.get('CATALOG_PRECOMPILE_TEMPLATES', '' if DEBUG else '1') not in ('', '0', 'false', 'False')
+# Calentamiento completo al arrancar (imports, URLs, plantillas, datos de referencia
+# y gc.freeze(), ver catalog/warmup.py)
+CATALOG_WARMUP = os.environ.get('CATALOG_WARMUP', '' if DEBUG else '1') not in ('', '0', 'false', 'False')
+# Tiempo de renderizado por plantilla (catalog.templating.profiler); tiene coste, solo para diagnostico
+CATALOG_TEMPLATE_PROFILE = os.environ.get('CATALOG_TEMPLATE_PROFILE', '') not in ('', '0', 'false', 'False')
+
 WSGI_APPLICATION = 'locallibrary.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# PRAGMAs aplicados a cada conexion nueva de SQLite. WAL permite leer mientras
+# otro proceso escribe y busy_timeout espera al bloqueo en lugar de fallar con
+# "database is locked". cache_size negativo es en KiB.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Las transacciones reservan el bloqueo de escritura al empezar: sin esto
+            # una transaccion de lectura que luego escribe falla al momento si hay otra
+            'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+        },
+        # Conexiones persistentes (segundos; 0 cierra al final de cada peticion)
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Replica de solo lectura. En local, una copia del fichero SQLite que mantiene
+# al dia manage.py sync_replica; en produccion, la replica del servidor.
+if os.environ.get('DJANGO_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DJANGO_REPLICA_DB'],
+        # En los tests se usa la base de datos de pruebas del primario
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['catalog.routers.ReplicaRouter']
+CATALOG_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Segundos que un navegador lee del primario tras escribir (read-your-writes)
+CATALOG_REPLICA_PIN_SECONDS = int(os.environ.get('CATALOG_REPLICA_PIN_SECONDS', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Los contadores de la pagina de inicio, las versiones de la cache de fragmentos y
+# las de los datos de referencia los actualiza el proceso que escribe: la cache
+# tiene que ser compartida por todos los procesos o el resto servira datos
+# obsoletos. Fuera de DEBUG la cache por defecto son ficheros en
+# DJANGO_CACHE_LOCATION (compartida por los procesos de una misma maquina); con
+# varias maquinas, DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# o memcached. Con CATALOG_SHARED_CACHE_REQUIRED (por defecto fuera de DEBUG) una
+# cache local del proceso es un error de manage.py check y de runserver
+# (catalog.E001, ver catalog/checks.py); desactivarlo solo con un unico proceso.
+
+if DEBUG:
+    DEFAULT_CACHE_BACKEND, DEFAULT_CACHE_LOCATION = 'django.core.cache.backends.locmem.LocMemCache', ''
+else:
+    DEFAULT_CACHE_BACKEND, DEFAULT_CACHE_LOCATION = 'django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', DEFAULT_CACHE_BACKEND),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', DEFAULT_CACHE_LOCATION),
+        # FileBasedCache recorta la cache al pasar de MAX_ENTRIES (300 por defecto)
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 10000))},
     }
 }
+CATALOG_SHARED_CACHE_REQUIRED = os.environ.get('CATALOG_SHARED_CACHE_REQUIRED', str(not DEBUG)) not in ('', '0', 'false', 'False')
+
+# Segundos que viven los contadores de la pagina de inicio antes de recontarse
+CATALOG_COUNTERS_TIMEOUT = int(os.environ.get('CATALOG_COUNTERS_TIMEOUT', 60 * 60))
+
+# Generos e idiomas en memoria de cada proceso (catalog.refdata): cada cuantos
+# segundos se compara la version con la de la cache, vida maxima de la copia y
+# numero maximo de filas por tabla para guardarla
+CATALOG_REFDATA_CHECK_INTERVAL = float(os.environ.get('CATALOG_REFDATA_CHECK_INTERVAL', 1))
+CATALOG_REFDATA_TIMEOUT = int(os.environ.get('CATALOG_REFDATA_TIMEOUT', 300))
+CATALOG_REFDATA_MAX_ROWS = int(os.environ.get('CATALOG_REFDATA_MAX_ROWS', 1000))
+
+# Numero maximo de resultados que se cuentan en una busqueda (catalog.search)
+CATALOG_SEARCH_MAX_COUNT = int(os.environ.get('CATALOG_SEARCH_MAX_COUNT', 1000))
+
+# Segundos que se restan al inicio de una exportacion para el since de la
+# siguiente: transacciones abiertas al empezar (catalog.export)
+CATALOG_EXPORT_SINCE_MARGIN = int(os.environ.get('CATALOG_EXPORT_SINCE_MARGIN', 300))
+
+# Dias que tiene un usuario para recoger la copia asignada a su reserva (catalog.holds)
+CATALOG_HOLD_PICKUP_DAYS = int(os.environ.get('CATALOG_HOLD_PICKUP_DAYS', 3))
+
+
+# Vistas de solo lectura asincronas (catalog/async_views.py), para servir con ASGI
+CATALOG_ASYNC_VIEWS = os.environ.get('CATALOG_ASYNC_VIEWS', '') not in ('', '0', 'false', 'False')
+
+
+# Instrumentacion de rendimiento (catalog.middleware.PerformanceMiddleware)
+# Consultas a partir de estos milisegundos van al log catalog.performance.slow_queries
+CATALOG_SLOW_QUERY_MS = float(os.environ.get('CATALOG_SLOW_QUERY_MS', 100))
+# Perfila con cProfile una de cada N peticiones (0 desactiva)
+CATALOG_PROFILE_EVERY = int(os.environ.get('CATALOG_PROFILE_EVERY', 0))
+# Directorio para los .prof; sin el, el resumen va al log catalog.performance.profile
+CATALOG_PROFILE_DIR = os.environ.get('CATALOG_PROFILE_DIR') or None
 
 
 # Password validation
@@ -122,6 +241,30 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Destino de collectstatic, servido por catalog.assets.serve
+STATIC_ROOT = os.environ.get('DJANGO_STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# En produccion, nombres con hash del contenido y variantes .gz/.br generadas
+# por collectstatic (catalog.storage); en desarrollo los ficheros tal cual
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': os.environ.get(
+            'DJANGO_STATICFILES_STORAGE',
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'catalog.storage.CompressedManifestStaticFilesStorage',
+        ),
+    },
+}
+
+# Vida en cache del navegador (segundos) de los estaticos con hash en el nombre
+CATALOG_STATIC_MAX_AGE = int(os.environ.get('CATALOG_STATIC_MAX_AGE', 365 * 24 * 60 * 60))
+# Con nginx delante: prefijo de la location interna a la que se delega el envio
+# (X-Accel-Redirect), p. ej. /protected-static/
+CATALOG_STATIC_ACCEL_REDIRECT = os.environ.get('CATALOG_STATIC_ACCEL_REDIRECT') or None
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
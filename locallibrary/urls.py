@@ -34,11 +34,14 @@ urlpatterns += [
     path('', RedirectView.as_view(url='/catalog/', permanent=True)),
 ]
 
-# Use static() to add url mapping to serve static files during development (only)
+# Serve the collected static files (hashed names get far-future caching, see catalog/assets.py).
+# During development runserver serves them from the apps before reaching this URL
 from django.conf import settings
-from django.conf.urls.static import static
+from catalog import assets
 
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+urlpatterns += [
+    path(settings.STATIC_URL.lstrip('/') + '<path:path>', assets.serve, name='static'),
+]
 
 # Add Django site authentication urls (login, logout, password management)
 urlpatterns += [path('accounts/', include('django.contrib.auth.urls')),
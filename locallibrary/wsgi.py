@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'locallibrary.settings')
 
 application = get_wsgi_application()
+
+# Import views, build the URL resolver, compile templates and load reference data
+# now instead of on the first request (see catalog/warmup.py)
+from catalog.warmup import warm_up
+
+warm_up()